@@ -0,0 +1,415 @@
+import math
+import numbers
+from collections import Counter
+from fractions import Fraction
+from functools import lru_cache
+from itertools import combinations
+from operator import add
+from typing import Dict, Iterable, Tuple
+
+
+def _orbit_size(exponents) -> int:
+    """
+    Number of distinct re-arrangements of an exponent vector (size of its orbit under S_n).
+    """
+    size = math.factorial(len(exponents))
+    for mult in Counter(exponents).values():
+        size = size // math.factorial(mult)
+    return size
+
+
+def _distinct_arrangements(exponents):
+    """
+    Yield each distinct re-arrangement of an exponent vector once
+    (placing the non-zero values, so the work is the orbit size, not factorial(len(exponents))).
+    """
+    n = len(exponents)
+    counts = sorted(Counter([e for e in exponents if e != 0]).items())
+
+    def place(i, free, vec):
+        if i >= len(counts):
+            yield tuple(vec)
+            return
+        value, mult = counts[i]
+        for chosen in combinations(free, mult):
+            for j in chosen:
+                vec[j] = value
+            chosen_set = set(chosen)
+            yield from place(i + 1, [j for j in free if j not in chosen_set], vec)
+            for j in chosen:
+                vec[j] = 0
+
+    yield from place(0, list(range(n)), [0] * n)
+
+
+@lru_cache(maxsize=None)
+def _elementary_monomial_count(nu: Tuple[int, ...], mu: Tuple[int, ...]) -> int:
+    """
+    Coefficient of m_mu in the product of elementary symmetric polynomials e_nu[0] * e_nu[1] * ...
+    (the number of 0/1 matrices with row sums nu and column sums mu).
+    """
+    if len(nu) == 0:
+        return 1 if all([m == 0 for m in mu]) else 0
+    count = 0
+    for chosen in combinations(range(len(mu)), nu[0]):
+        if all([mu[j] > 0 for j in chosen]):
+            rest = list(mu)
+            for j in chosen:
+                rest[j] = rest[j] - 1
+            count = count + _elementary_monomial_count(nu[1:], tuple(rest))
+    return count
+
+
+def _conjugate_partition(lam: Tuple[int, ...]) -> Tuple[int, ...]:
+    if len(lam) == 0:
+        return ()
+    return tuple([sum([part > i for part in lam]) for i in range(lam[0])])
+
+
+def monomial_symmetric_to_elementary(coefs: Dict[Tuple[int, ...], object], n: int) -> Dict[Tuple[int, ...], object]:
+    """
+    Re-write a combination of monomial symmetric polynomials in n variables as products of
+    elementary symmetric polynomials (repeatedly cancel the lexicographically largest m_lambda with e_{lambda'}).
+
+    :param coefs: dictionary from partition lambda to coefficient of m_lambda
+    :param n: number of variables
+    :return: dictionary from non-increasing tuple of elementary polynomial indices to coefficient
+    """
+    n = int(n)
+    remaining = {lam: coef for lam, coef in coefs.items() if coef != 0}
+    assert all([len(lam) <= n for lam in remaining.keys()])
+    result = {}
+    while len(remaining) > 0:
+        lam = max(remaining.keys())
+        coef = remaining[lam]
+        nu = _conjugate_partition(lam)
+        result[nu] = result.get(nu, 0) + coef
+        degree = sum(lam)
+        for mu in [tuple(mu) for mu in partitions(degree)] if degree > 0 else [()]:
+            if (len(mu) > n) or (mu > lam):
+                continue
+            count = _elementary_monomial_count(nu, mu)
+            if count != 0:
+                updated = remaining.get(mu, 0) - coef * count
+                if updated == 0:
+                    remaining.pop(mu, None)
+                else:
+                    remaining[mu] = updated
+    return {nu: coef for nu, coef in result.items() if coef != 0}
+
+
+def partitions(n, m=None):
+    """Partition n with a maximum part size of m. Yield non-increasing
+    lists in decreasing lexicographic order. The default for m is
+    effectively n, so the second argument is not needed to create the
+    generator unless you do want to limit part sizes.
+    https://stackoverflow.com/a/47848961
+    """
+    if m is None or m >= n:
+        yield [n]
+    for f in range(n - 1 if (m is None or m >= n) else m, 0, -1):
+        for p in partitions(n - f, f):
+            yield [f] + p
+
+
+def _set_partitions(k: int):
+    """
+    Yield the set partitions of range(k) as lists of blocks.
+    """
+    if k <= 0:
+        yield []
+        return
+    for blocks in _set_partitions(k - 1):
+        # place k - 1 into each existing block, or into a new block
+        for i in range(len(blocks)):
+            yield blocks[:i] + [blocks[i] + [k - 1]] + blocks[i + 1:]
+        yield blocks + [[k - 1]]
+
+
+@lru_cache(maxsize=None)
+def _selection_pattern_weights(support: Tuple[int, ...]) -> Tuple[Tuple[Tuple[int, ...], int], ...]:
+    """
+    For a monomial with non-zero exponents support, the sum over all maps of its positions into the variables,
+    grouped by which positions land on the same variable (set partitions of the positions):
+    pairs (lambda, weight) with the sum equal to sum of weight * m_lambda (before dividing by n**len(support)).
+    """
+    weights = {}
+    for blocks in _set_partitions(len(support)):
+        merged = tuple(sorted([sum([support[i] for i in block]) for block in blocks], reverse=True))
+        # blocks with equal merged exponents can trade variables, each such arrangement is a distinct map
+        mult = 1
+        for count in Counter(merged).values():
+            mult = mult * math.factorial(count)
+        weights[merged] = weights.get(merged, 0) + mult
+    return tuple(sorted(weights.items()))
+
+
+class RationalPoly:
+    """
+    Sparse polynomial with exact rational coefficients: a dictionary from exponent tuples
+    (one entry per variable) to Fraction. Sympy is only used to convert at the boundary
+    (to_sympy(), from_sympy()).
+    """
+
+    __slots__ = ("n_vars", "terms")
+
+    def __init__(self, n_vars: int, terms: Dict[Tuple[int, ...], object] = None):
+        """
+        :param n_vars: number of variables
+        :param terms: dictionary from exponent tuple to coefficient
+        """
+        self.n_vars = int(n_vars)
+        self.terms: Dict[Tuple[int, ...], Fraction] = dict()
+        if terms is not None:
+            for exponents, coef in terms.items():
+                exponents = tuple([int(e) for e in exponents])
+                assert len(exponents) == self.n_vars
+                assert all([e >= 0 for e in exponents])
+                coef = Fraction(coef)
+                if coef != 0:
+                    self.terms[exponents] = self.terms.get(exponents, 0) + coef
+            self.terms = {e: c for e, c in self.terms.items() if c != 0}
+
+    @classmethod
+    def _from_terms(cls, n_vars: int, terms: Dict[Tuple[int, ...], Fraction]) -> "RationalPoly":
+        """wrap an already checked dictionary of non-zero Fraction coefficients"""
+        res = cls.__new__(cls)
+        res.n_vars = n_vars
+        res.terms = terms
+        return res
+
+    @classmethod
+    def constant(cls, n_vars: int, value) -> "RationalPoly":
+        return cls(n_vars, {(0,) * int(n_vars): value})
+
+    @classmethod
+    def variable(cls, n_vars: int, i: int) -> "RationalPoly":
+        """the polynomial y_i"""
+        n_vars = int(n_vars)
+        assert 0 <= i < n_vars
+        exponents = [0] * n_vars
+        exponents[i] = 1
+        return cls._from_terms(n_vars, {tuple(exponents): Fraction(1)})
+
+    @classmethod
+    def variables(cls, n_vars: int):
+        """the polynomials y_0, ..., y_{n_vars - 1}"""
+        return [cls.variable(n_vars, i) for i in range(int(n_vars))]
+
+    @classmethod
+    def elementary_symmetric(cls, n_vars: int, k: int) -> "RationalPoly":
+        """the k-th elementary symmetric polynomial in n_vars variables"""
+        n_vars = int(n_vars)
+        if k <= 0:
+            return cls.constant(n_vars, 1)
+        return cls._from_terms(
+            n_vars, {e: Fraction(1) for e in _distinct_arrangements([1] * k + [0] * (n_vars - k))}
+        )
+
+    def _coerce(self, other) -> "RationalPoly":
+        if isinstance(other, RationalPoly):
+            assert other.n_vars == self.n_vars
+            return other
+        if isinstance(other, numbers.Rational):
+            return RationalPoly.constant(self.n_vars, other)
+        return NotImplemented
+
+    def is_zero(self) -> bool:
+        return len(self.terms) == 0
+
+    def degree(self) -> int:
+        """total degree, -1 for the zero polynomial"""
+        if len(self.terms) == 0:
+            return -1
+        return max([sum(e) for e in self.terms.keys()])
+
+    def __add__(self, other) -> "RationalPoly":
+        other = self._coerce(other)
+        if other is NotImplemented:
+            return other
+        terms = dict(self.terms)
+        for exponents, coef in other.terms.items():
+            updated = terms.get(exponents, 0) + coef
+            if updated == 0:
+                terms.pop(exponents, None)
+            else:
+                terms[exponents] = updated
+        return RationalPoly._from_terms(self.n_vars, terms)
+
+    __radd__ = __add__
+
+    def __neg__(self) -> "RationalPoly":
+        return RationalPoly._from_terms(self.n_vars, {e: -c for e, c in self.terms.items()})
+
+    def __sub__(self, other) -> "RationalPoly":
+        other = self._coerce(other)
+        if other is NotImplemented:
+            return other
+        return self + (-other)
+
+    def __rsub__(self, other) -> "RationalPoly":
+        return (-self) + other
+
+    def __mul__(self, other) -> "RationalPoly":
+        if isinstance(other, numbers.Rational):
+            other = Fraction(other)
+            if other == 0:
+                return RationalPoly(self.n_vars)
+            return RationalPoly._from_terms(self.n_vars, {e: c * other for e, c in self.terms.items()})
+        other = self._coerce(other)
+        if other is NotImplemented:
+            return other
+        # multiply integer numerators over a common denominator, Fraction arithmetic per product is the cost
+        d1, ints1 = self._integer_terms()
+        d2, ints2 = other._integer_terms()
+        terms = dict()
+        for e1, c1 in ints1:
+            for e2, c2 in ints2:
+                exponents = tuple(map(add, e1, e2))
+                terms[exponents] = terms.get(exponents, 0) + c1 * c2
+        denominator = d1 * d2
+        return RationalPoly._from_terms(
+            self.n_vars, {e: Fraction(c, denominator) for e, c in terms.items() if c != 0}
+        )
+
+    def _integer_terms(self):
+        """common denominator d and list of (exponents, integer numerator over d)"""
+        d = 1
+        for coef in self.terms.values():
+            d = math.lcm(d, coef.denominator)
+        return d, [(e, c.numerator * (d // c.denominator)) for e, c in self.terms.items()]
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other) -> "RationalPoly":
+        if not isinstance(other, numbers.Rational):
+            return NotImplemented
+        return self * (1 / Fraction(other))
+
+    def __pow__(self, k: int) -> "RationalPoly":
+        """power by repeated squaring"""
+        k = int(k)
+        assert k >= 0
+        result = RationalPoly.constant(self.n_vars, 1)
+        base = self
+        while k > 0:
+            if k & 1:
+                result = result * base
+            k = k >> 1
+            if k > 0:
+                base = base * base
+        return result
+
+    def __eq__(self, other) -> bool:
+        other = self._coerce(other)
+        if other is NotImplemented:
+            return False
+        return self.terms == other.terms
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"RationalPoly({self.n_vars}, {self.terms!r})"
+
+    def substitute(self, mapping: Dict[int, object], *, n_vars: int = None) -> "RationalPoly":
+        """
+        Substitute polynomials (or rationals) for variables.
+
+        :param mapping: dictionary from variable index to RationalPoly in n_vars variables or rational number
+        :param n_vars: number of variables of the result, default self.n_vars; un-mapped variables keep their index
+        :return: RationalPoly in n_vars variables
+        """
+        n_vars = self.n_vars if n_vars is None else int(n_vars)
+        values = []
+        for i in range(self.n_vars):
+            if i in mapping:
+                value = mapping[i]
+                if not isinstance(value, RationalPoly):
+                    value = RationalPoly.constant(n_vars, value)
+                assert value.n_vars == n_vars
+            else:
+                value = RationalPoly.variable(n_vars, i)
+            values.append(value)
+        powers: Dict[Tuple[int, int], RationalPoly] = dict()  # (variable, exponent) -> power of value
+        result = RationalPoly(n_vars)
+        for exponents, coef in self.terms.items():
+            term = RationalPoly.constant(n_vars, coef)
+            for i, e in enumerate(exponents):
+                if e > 0:
+                    key = (i, e)
+                    if key not in powers:
+                        powers[key] = values[i] ** e
+                    term = term * powers[key]
+            result = result + term
+        return result
+
+    def monomial_symmetric_coefficients(self) -> Dict[Tuple[int, ...], Fraction]:
+        """
+        Average over all permutations of the variables, written as monomial symmetric polynomials:
+        each monomial averages to m_lambda divided by its orbit size.
+
+        :return: dictionary from partition lambda to coefficient of m_lambda
+        """
+        # the orbit size only depends on lambda, so sum (integer numerators) per orbit and divide once
+        d, ints = self._integer_terms()
+        sums = dict()
+        for exponents, coef in ints:
+            lam = tuple(sorted([e for e in exponents if e > 0], reverse=True))
+            sums[lam] = sums.get(lam, 0) + coef
+        return {
+            lam: Fraction(coef, d * _orbit_size(lam + (0,) * (self.n_vars - len(lam))))
+            for lam, coef in sums.items()
+            if coef != 0
+        }
+
+    def symmetrize(self) -> "RationalPoly":
+        """average over all permutations of the variables"""
+        terms = dict()
+        for lam, coef in self.monomial_symmetric_coefficients().items():
+            for exponents in _distinct_arrangements(list(lam) + [0] * (self.n_vars - len(lam))):
+                terms[exponents] = coef
+        return RationalPoly._from_terms(self.n_vars, terms)
+
+    def elementary_symmetric_coefficients(self) -> Dict[Tuple[int, ...], Fraction]:
+        """
+        Average over all permutations of the variables, written in elementary symmetric polynomials.
+
+        :return: dictionary from non-increasing tuple of elementary polynomial indices to coefficient
+        """
+        return monomial_symmetric_to_elementary(self.monomial_symmetric_coefficients(), self.n_vars)
+
+    def to_sympy(self, p_vars: Iterable):
+        """
+        Convert to a sympy expression.
+
+        :param p_vars: sympy variables, one per variable
+        """
+        from sympy import Poly, Rational
+
+        p_vars = list(p_vars)
+        assert len(p_vars) == self.n_vars
+        if len(self.terms) == 0:
+            return 0
+        terms = {e: Rational(c.numerator, c.denominator) for e, c in self.terms.items()}
+        if self.n_vars == 0:
+            return terms[()]
+        return Poly.from_dict(terms, *p_vars).as_expr()
+
+    @classmethod
+    def from_sympy(cls, expr, p_vars: Iterable) -> "RationalPoly":
+        """
+        Convert a sympy polynomial with rational coefficients.
+
+        :param expr: sympy expression, polynomial in p_vars
+        :param p_vars: sympy variables
+        """
+        from sympy import Poly
+
+        p_vars = list(p_vars)
+        if len(p_vars) == 0:
+            return cls.constant(0, Fraction(str(expr)))
+        terms = dict()
+        for exponents, coef in Poly(expr, *p_vars).terms():
+            assert coef.is_Rational
+            terms[exponents] = Fraction(int(coef.p), int(coef.q))
+        return cls(len(p_vars), terms)
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import sqlite3
+from typing import Callable, Iterable, Optional
+
+import pandas as pd
+from sympy import srepr, sympify
+
+import rational_poly
+import sym_calc
+
+
+def code_version() -> str:
+    """
+    Hash of the source of the modules the cached results are computed by,
+    editing either one starts a fresh set of keys.
+    """
+    h = hashlib.sha256()
+    for module in (sym_calc, rational_poly):
+        with open(module.__file__, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+class SymResultCache:
+    """
+    Content addressed store of symbolic results (SQLite file, WAL mode so several processes can share it).
+    Rows are keyed by a hash of the function name, its arguments and code_version(),
+    results are stored as sympy srepr() text.
+    """
+
+    def __init__(self, path: str, *, version: Optional[str] = None):
+        """
+        :param path: SQLite file to use, created if missing
+        :param version: code version to key on, default code_version()
+        """
+        assert isinstance(path, str)
+        self._path = path
+        self._version = code_version() if version is None else version
+        self._memo = dict()  # key -> result, for results already read or computed
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(path, timeout=60.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results"
+                " (key TEXT PRIMARY KEY, fn TEXT NOT NULL, args TEXT NOT NULL, version TEXT NOT NULL, result TEXT NOT NULL)"
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _key(self, fn: str, args: str) -> str:
+        return hashlib.sha256(json.dumps([fn, args, self._version]).encode("utf-8")).hexdigest()
+
+    def lookup(self, fn: str, args, compute: Callable):
+        """
+        Return the stored result for fn on args, or compute(), store and return it.
+
+        :param fn: function name
+        :param args: JSON serializable (canonical) arguments
+        :param compute: no argument function computing the result
+        """
+        args = json.dumps(args, sort_keys=True)
+        key = self._key(fn, args)
+        try:
+            res = self._memo[key]
+            self.hits = self.hits + 1
+            return res
+        except KeyError:
+            pass
+        row = self._conn.execute("SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self.hits = self.hits + 1
+            res = sympify(row[0])
+        else:
+            self.misses = self.misses + 1
+            res = compute()
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO results (key, fn, args, version, result) VALUES (?, ?, ?, ?, ?)",
+                    (key, fn, args, self._version, srepr(sympify(res))),
+                )
+        self._memo[key] = res
+        return res
+
+    def identify_variance_fn(self, partition: Iterable[int]):
+        """
+        sym_calc.identify_variance_fn(partition), the result does not depend on the order of the groups
+        so re-orderings of a partition share an entry.
+        """
+        partition = sorted([int(p) for p in partition], reverse=True)
+        return self.lookup(
+            "identify_variance_fn", partition, lambda: sym_calc.identify_variance_fn(partition)
+        )
+
+    def identify_variance_fn_regular_blocks(self, *, n_blocks: int, block_size: int, detect_support: bool = True):
+        """sym_calc.identify_variance_fn_regular_blocks()"""
+        n_blocks = int(n_blocks)
+        block_size = int(block_size)
+        detect_support = bool(detect_support)
+        return self.lookup(
+            "identify_variance_fn_regular_blocks",
+            {"n_blocks": n_blocks, "block_size": block_size, "detect_support": detect_support},
+            lambda: sym_calc.identify_variance_fn_regular_blocks(
+                n_blocks=n_blocks, block_size=block_size, detect_support=detect_support
+            ),
+        )
+
+    def solve_for_block_size_poly(self, n_blocks: int):
+        """sym_calc.solve_for_block_size_poly()"""
+        n_blocks = int(n_blocks)
+        return self.lookup(
+            "solve_for_block_size_poly", n_blocks, lambda: sym_calc.solve_for_block_size_poly(n_blocks)
+        )
+
+    def variance_table(self, max_n: int, *, min_n: int = 1) -> pd.DataFrame:
+        """
+        Compute (or read) identify_variance_fn() for all partitions of min_n through max_n.
+
+        :param max_n: largest number of cells
+        :param min_n: smallest number of cells
+        :return: data frame with columns n, partition, variance polynomial
+        """
+        rows = []
+        for n in range(int(min_n), int(max_n) + 1):
+            for part in sym_calc.partitions(n):
+                rows.append({"n": n, "partition": part, "variance polynomial": self.identify_variance_fn(part)})
+        return pd.DataFrame(rows, columns=["n", "partition", "variance polynomial"])
@@ -1,12 +1,15 @@
 import numbers
-from typing import Iterable, Optional
+from fractions import Fraction
+from typing import Dict, Iterable, Optional, Tuple
 from itertools import combinations, permutations, product
 from sympy import (
     binomial,
     factorial,
     fraction,
+    Mul,
     poly,
     Poly,
+    Rational,
     symbols,
     Symbol,
     symmetrize,
@@ -18,6 +21,14 @@ from sympy.ntheory.continued_fraction import (
 from sympy.solvers import solve
 import pandas as pd
 import numpy as np
+from rational_poly import (
+    RationalPoly,
+    _distinct_arrangements,
+    _orbit_size,
+    _selection_pattern_weights,
+    monomial_symmetric_to_elementary,
+    partitions,
+)
 
 
 def is_infinitesimal_poly(p, *, tol: float = 1e-8):
@@ -128,6 +139,43 @@ def sq_loss_polynomial(
     return result, p_vars
 
 
+def sq_loss_rational_poly(groups) -> RationalPoly:
+    """
+    Build the square loss polynomial of sq_loss_polynomial(groups) as an exact RationalPoly
+    (variable i is y_i).
+
+    :param groups: iterable of a partition group variable indices
+    :return: RationalPoly
+    """
+    groups = [list(g) for g in groups if len(g) > 0]
+    variable_names = sorted(set().union(*groups)) if len(groups) > 0 else []
+    n_variables = len(variable_names)
+    assert variable_names == list(range(n_variables))
+    seen = set()
+    for group in groups:
+        assert len(seen.intersection(group)) == 0
+        seen.update(group)
+    y = RationalPoly.variables(n_variables)
+    result = RationalPoly(n_variables)
+    if n_variables <= 0:
+        return result
+    for group in groups:
+        group_size = len(group)
+        if group_size > 1:
+            mean_i = sum([y[i] for i in group], RationalPoly(n_variables)) / group_size
+            terms_i = sum([(y[i] - mean_i) ** 2 for i in group], RationalPoly(n_variables))
+            result = result + terms_i * Fraction(group_size, group_size - 1)
+    result = result / n_variables
+    n_singleton_groups = sum([len(group) == 1 for group in groups])
+    if (
+        (n_singleton_groups > 0)
+        and (n_singleton_groups < n_variables)
+        and (n_singleton_groups < len(groups))
+    ):
+        result = result * Fraction(n_variables, n_variables - n_singleton_groups)
+    return result
+
+
 def symmetrize_poly_by_summing_out_permutations(p, p_vars):
     """
     Symmetrize a polynomial by averaging it evaluated over all permutations of its variables.
@@ -152,6 +200,104 @@ def symmetrize_poly_by_summing_out_permutations(p, p_vars):
     return (sym_result / sym_count).expand()
 
 
+def monomial_symmetric_coefficients(p, p_vars) -> Dict[Tuple[int, ...], object]:
+    """
+    Symmetrize a polynomial (average over all permutations of its variables) per monomial.
+    Each monomial averages to its monomial symmetric polynomial m_lambda divided by its orbit size,
+    so no permutations are enumerated.
+
+    :param p: polynomial
+    :param p_vars: variables
+    :return: dictionary from partition lambda (non-increasing positive exponents) to coefficient of m_lambda
+    """
+    p_vars = list(p_vars)
+    assert all([isinstance(v, Symbol) for v in p_vars])
+    if (p == 0) or isinstance(p, numbers.Number) or (len(p_vars) == 0):
+        return {(): p} if p != 0 else {}
+    result = {}
+    for exponents, coef in Poly(p, *p_vars).terms():
+        lam = tuple(sorted([e for e in exponents if e > 0], reverse=True))
+        result[lam] = result.get(lam, 0) + coef / _orbit_size(exponents)
+    return {lam: coef for lam, coef in result.items() if coef != 0}
+
+
+def monomial_symmetric_polynomial(lam: Iterable[int], p_vars):
+    """
+    Build the monomial symmetric polynomial m_lambda: the sum of the distinct monomials with exponents a re-arrangement of lambda.
+
+    :param lam: partition (exponents)
+    :param p_vars: variables
+    :return: polynomial
+    """
+    p_vars = list(p_vars)
+    lam = [e for e in lam if e > 0]
+    assert len(lam) <= len(p_vars)
+    exponents = lam + [0] * (len(p_vars) - len(lam))
+    terms = {perm: 1 for perm in _distinct_arrangements(exponents)}
+    return Poly.from_dict(terms, *p_vars).as_expr()
+
+
+def symmetrize_poly_by_orbit_sums(p, p_vars):
+    """
+    Symmetrize a polynomial by averaging it over all permutations of its variables,
+    same result as symmetrize_poly_by_summing_out_permutations() with work polynomial in the
+    number of terms instead of factorial in the number of variables.
+
+    :param p: polynomial
+    :param p_vars: variables
+    :return: polynomial
+    """
+    p_vars = list(p_vars)
+    return _monomial_symmetric_sum(monomial_symmetric_coefficients(p, p_vars), p_vars)
+
+
+def _monomial_symmetric_sum(coefs: Dict[Tuple[int, ...], object], p_vars):
+    """
+    Expand sum of coef * m_lambda over p_vars.
+    """
+    coefs = {lam: coef for lam, coef in coefs.items() if coef != 0}
+    if len(coefs) == 0:
+        return 0
+    if len(p_vars) == 0:
+        return coefs[()]
+    terms = {}
+    for lam, coef in coefs.items():
+        assert len(lam) <= len(p_vars)
+        exponents = list(lam) + [0] * (len(p_vars) - len(lam))
+        for perm in _distinct_arrangements(exponents):
+            terms[perm] = coef
+    return Poly.from_dict(terms, *p_vars).as_expr()
+
+
+def elementary_symmetric_form(p, p_vars):
+    """
+    Average a polynomial over all permutations of its variables and write the result in the
+    elementary symmetric polynomials s1, s2, ... (as the formal output of sympy symmetrize()),
+    without enumerating permutations or expanding the symmetric result.
+
+    :param p: polynomial
+    :param p_vars: variables
+    :return: polynomial in symbols s1, s2, ...
+    """
+    p_vars = list(p_vars)
+    n = len(p_vars)
+    e_coefs = monomial_symmetric_to_elementary(monomial_symmetric_coefficients(p, p_vars), n)
+    return _elementary_sum(e_coefs, n)
+
+
+def _elementary_sum(e_coefs: Dict[Tuple[int, ...], object], n: int):
+    """
+    Write sum of coef * e_nu[0] * e_nu[1] * ... in symbols s1, s2, ... (Fraction coefficients become sympy Rationals).
+    """
+    s = symbols(" ".join([f"s{i}" for i in range(n + 1)]))
+    result = 0
+    for nu, coef in e_coefs.items():
+        if isinstance(coef, Fraction):
+            coef = Rational(coef.numerator, coef.denominator)
+        result = result + coef * Mul(*[s[i] for i in nu])  # Mul() of nothing is Integer 1, keeping constants exact
+    return result
+
+
 def groups_from_partition(partition):
     """
     Build a grouping matching a given partition specification.
@@ -173,12 +319,12 @@ def calculate_symmetric_loss_poly_from_partition(part):
     """
     n = sum(part)
     groups = groups_from_partition(part)
-    loss_poly, p_vars = sq_loss_polynomial(groups)
-    if loss_poly != 0:
-        sym_loss_poly = symmetrize_poly_by_summing_out_permutations(loss_poly, p_vars)
-        sym_loss_decomp = symmetrize(sym_loss_poly, formal=True)
-        assert is_infinitesimal_poly(sym_loss_decomp[1])
-        sym_loss_s = sym_loss_decomp[0]
+    # exact rational arithmetic, symmetrized per monomial orbit
+    # (sq_loss_polynomial() and symmetrize_poly_by_summing_out_permutations() are the sympy, n! reference)
+    loss_poly = sq_loss_rational_poly(groups)
+    if not loss_poly.is_zero():
+        sym_loss_poly = loss_poly.symmetrize()
+        sym_loss_s = _elementary_sum(loss_poly.elementary_symmetric_coefficients(), n)
         res = pd.DataFrame(
             {
                 "n": [n],
@@ -187,12 +333,7 @@ def calculate_symmetric_loss_poly_from_partition(part):
             }
         )
         # calculate variance over full group
-        sym_var_poly = symmetrize_poly_by_summing_out_permutations(
-            (loss_poly - sym_loss_poly) ** 2, p_vars
-        )
-        sym_var_decomp = symmetrize(sym_var_poly, formal=True)
-        assert is_infinitesimal_poly(sym_var_decomp[1])
-        sym_var_s = sym_var_decomp[0]
+        sym_var_s = _elementary_sum(((loss_poly - sym_loss_poly) ** 2).elementary_symmetric_coefficients(), n)
         res["loss variance polynomial"] = [sym_var_s]
         return res
     return None
@@ -219,20 +360,6 @@ def pair_poly(n: int):
     return result / (n * (n - 1))
 
 
-def partitions(n, m=None):
-    """Partition n with a maximum part size of m. Yield non-increasing
-    lists in decreasing lexicographic order. The default for m is
-    effectively n, so the second argument is not needed to create the
-    generator unless you do want to limit part sizes.
-    https://stackoverflow.com/a/47848961
-    """
-    if m is None or m >= n:
-        yield [n]
-    for f in range(n - 1 if (m is None or m >= n) else m, 0, -1):
-        for p in partitions(n - f, f):
-            yield [f] + p
-
-
 def elementary_symmetric_polynomial(i: int, p_vars):
     """build the i-th elementary symmetric polynomial on p_vars"""
     if i < 1:
@@ -358,10 +485,10 @@ def _fill_in_generator_pick_k(
 
 def identify_variance_fn(partition: Iterable[int]):
     """
-    Identify the variance function by evaluating on a mostly zero example that
-    is symmetrized on a set of states smaller than the full symmetric group.
-    Works on a factorial(n_cells) = binomial(n_cells, 4) * factorial(4) * factorial(n_cells - 4) decomposition.
-    Another approach would be to build a map of all possible monomials to symmetrized versions.
+    Identify the variance function by averaging the squared deviation of the loss from its
+    theoretical mean over all permutations, with exact rational polynomials (RationalPoly)
+    symmetrized per monomial orbit. _identify_variance_fn_through_sym() with _fill_in_generator_pick_k()
+    is the sympy reference, working on a factorial(n_cells) = binomial(n_cells, 4) * factorial(4) * factorial(n_cells - 4) decomposition.
 
     :param partition: partition of group sizes to work with
     :return: variance polynomial as elementary symmetric polynomials
@@ -380,12 +507,13 @@ def identify_variance_fn(partition: Iterable[int]):
         return s[1] ** 4 / 18 - s[1] ** 2 * s[2] / 3 + s[2] ** 2 / 2
     n = sum(partition)
     assert n >= 4
-    return _identify_variance_fn_through_sym(
-        partition,
-        symmetry_fn=_fill_in_generator_pick_k,
-        symmetry_args={"n_set_positions": 4},
-        detect_support=False,
-    )
+    # exact rational arithmetic, symmetrized per monomial orbit instead of evaluating
+    # _identify_variance_fn_through_sym() over the n pick 4 placements
+    p = sq_loss_rational_poly(groups_from_partition(partition))
+    s1 = RationalPoly.elementary_symmetric(n, 1)
+    s2 = RationalPoly.elementary_symmetric(n, 2)
+    eval_p = (p - (s1**2 / n - s2 * Fraction(2, n - 1))) ** 2
+    return _elementary_sum(eval_p.elementary_symmetric_coefficients(), n)
 
 
 def s_binomial(n, k: int):
@@ -523,24 +651,18 @@ def identify_variance_fn_regular_blocks(
     detect_support: bool = True,
 ):
     """
-    Identify the variance function by evaluating on a mostly zero example that
-    is symmetrized on a set of states smaller than the full symmetric group.
-    Works on a factorial(n_cells) = binomial(n_cells, 4) * factorial(4) * factorial(n_cells - 4) decomposition.
-    Another approach would be to build a map of all possible monomials to symmetrized versions.
+    Identify the variance function for n_blocks blocks of block_size cells. Computed exactly
+    as identify_variance_fn([block_size] * n_blocks) (RationalPoly, symmetrized per monomial orbit);
+    _identify_variance_fn_through_sym() with _fill_in_list_regular_blocks() is the sympy reference.
 
     :param n_blocks: number of blocks
     :param block_size: size of each block
-    :param detect_support: if True try to remove non-supported variables (never set by symmetry_fn) from calculation.
+    :param detect_support: only used by the sympy reference, kept for callers
     :return: variance polynomial as elementary symmetric polynomials
     """
     if (n_blocks <= 1) or (block_size <= 1):
         return 0
-    return _identify_variance_fn_through_sym(
-        [block_size] * n_blocks,
-        symmetry_fn=_fill_in_list_regular_blocks,
-        symmetry_args={"n_set_positions": 4, "block_size": block_size},
-        detect_support=detect_support,
-    )
+    return identify_variance_fn([int(block_size)] * int(n_blocks))
 
 
 def identify_variance_fn_regular_blocks_e(
@@ -552,6 +674,8 @@ def identify_variance_fn_regular_blocks_e(
     """
     Identify the variance function by working on a 4,4 system and substituting in different counts.
     Another approach would be to build a map of all possible monomials to symmetrized versions.
+    Stays on sympy: n_blocks and block_size may be symbols, so coefficients are rational functions
+    of them, not the rationals RationalPoly holds.
 
     :param n_blocks: number of blocks
     :param block_size: size of each block >=4 or variable
@@ -659,6 +783,8 @@ def solve_for_block_size_poly(n_blocks: int):
     """
     Solve for the symmetric polynomial yielding the symmetric fn
     in s for the n_blocks, by block_size=s variance function.
+    Stays on sympy (through identify_variance_fn_regular_blocks_e()) as the block size is the symbol b,
+    use sym_cache.SymResultCache to avoid recomputing it.
     """
     n_blocks = int(n_blocks)
     block_size = symbols("b")
@@ -700,3 +826,40 @@ def symmetrize_poly_by_summing_out_selections(p, p_vars):
         sym_result = sym_result + r_sample
         sym_count = sym_count + 1
     return (sym_result / sym_count).expand()
+
+
+def selection_symmetric_coefficients(p, p_vars) -> Dict[Tuple[int, ...], object]:
+    """
+    Average a polynomial over all selections (maps of variable positions to variables, bootstrap style) per monomial,
+    as symmetrize_poly_by_summing_out_selections() but grouping the n**n selections by occupancy pattern.
+
+    :param p: polynomial
+    :param p_vars: variables
+    :return: dictionary from partition lambda (non-increasing positive exponents) to coefficient of m_lambda
+    """
+    p_vars = list(p_vars)
+    assert all([isinstance(v, Symbol) for v in p_vars])
+    n = len(p_vars)
+    if (p == 0) or isinstance(p, numbers.Number) or (n == 0):
+        return {(): p} if p != 0 else {}
+    result = {}
+    for exponents, coef in Poly(p, *p_vars).terms():
+        support = tuple(sorted([e for e in exponents if e > 0], reverse=True))
+        for lam, weight in _selection_pattern_weights(support):
+            if len(lam) <= n:
+                result[lam] = result.get(lam, 0) + coef * weight / n ** len(support)
+    return {lam: coef for lam, coef in result.items() if coef != 0}
+
+
+def symmetrize_poly_by_selection_patterns(p, p_vars):
+    """
+    Symmetrize a polynomial by averaging it evaluated over all selections (bootstrap style),
+    same result as symmetrize_poly_by_summing_out_selections() with work depending on the
+    polynomial's terms and degree instead of n**n.
+
+    :param p: polynomial
+    :param p_vars: variables
+    :return: polynomial
+    """
+    p_vars = list(p_vars)
+    return _monomial_symmetric_sum(selection_symmetric_coefficients(p, p_vars), p_vars)
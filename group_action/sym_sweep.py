@@ -0,0 +1,155 @@
+import glob
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterable, List, Optional
+
+import pandas as pd
+from sympy import sympify
+
+from sym_calc import calculate_symmetric_loss_poly_from_partition, partitions
+
+
+_POLY_COLUMNS = ["expected loss polynomial", "loss variance polynomial"]
+
+
+def expected_cost(partition: Iterable[int]) -> int:
+    """
+    Rough cost of calculate_symmetric_loss_poly_from_partition(partition): the square of the
+    number of terms of the loss polynomial (n squares plus the within group cross terms)
+    minus its symmetrization (all n + binomial(n, 2) degree 2 monomials).
+    """
+    partition = list(partition)
+    n = sum(partition)
+    loss_terms = n + sum([g * (g - 1) // 2 for g in partition])
+    return (loss_terms + n + n * (n - 1) // 2) ** 2
+
+
+def _sweep_one(partition: List[int]) -> Optional[dict]:
+    """run in a worker, polynomials travel (and are stored) as text"""
+    res = calculate_symmetric_loss_poly_from_partition(partition)
+    if res is None:
+        return None
+    row = {"n": int(res["n"][0]), "partition": [int(p) for p in partition]}
+    for c in _POLY_COLUMNS:
+        row[c] = str(res[c][0])
+    return row
+
+
+def _part_files(path: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(path, "part-*.parquet")))
+
+
+def _write_part(path: str, rows: List[dict]) -> None:
+    """write rows as the next part file, renamed into place so readers never see a partial file"""
+    index = len(_part_files(path))
+    name = os.path.join(path, f"part-{index:05d}.parquet")
+    while os.path.exists(name):
+        index = index + 1
+        name = os.path.join(path, f"part-{index:05d}.parquet")
+    tmp = os.path.join(path, f".part-{index:05d}.parquet.tmp")  # dot files are skipped by parquet readers
+    pd.DataFrame(rows, columns=["n", "partition"] + _POLY_COLUMNS).to_parquet(tmp, index=False)
+    os.replace(tmp, name)
+
+
+def completed_partitions(path: str) -> set:
+    """partitions (as tuples) with rows already in the sweep directory path"""
+    done = set()
+    for f in _part_files(path):
+        for part in pd.read_parquet(f, columns=["partition"])["partition"]:
+            done.add(tuple([int(p) for p in part]))
+    return done
+
+
+def pending_partitions(max_n: int, path: str, *, min_n: int = 1) -> List[List[int]]:
+    """
+    Partitions of min_n through max_n a sweep into path still has to compute, largest expected_cost() first.
+    Partitions with zero loss (all singletons, no row) are never pending.
+    """
+    done = completed_partitions(path) if os.path.isdir(path) else set()
+    todo = [
+        part
+        for n in range(int(min_n), int(max_n) + 1)
+        for part in partitions(n)
+        if (max(part) > 1) and (tuple(part) not in done)
+    ]
+    todo.sort(key=expected_cost, reverse=True)  # slowest start first, so they don't finish last alone
+    return todo
+
+
+def sweep_symmetric_loss_polys(
+    max_n: int,
+    path: str,
+    *,
+    min_n: int = 1,
+    workers: Optional[int] = None,
+    rows_per_file: int = 16,
+) -> int:
+    """
+    Run calculate_symmetric_loss_poly_from_partition() over all partitions of min_n through max_n on a process pool,
+    largest expected_cost() first, writing finished rows into a parquet dataset directory path as they arrive
+    (a part file each rows_per_file rows). Partitions already in path are skipped, so an interrupted
+    sweep resumes. Partitions with zero loss (all singletons) have no row and are not computed,
+    so the sweep is complete when pending_partitions() is empty.
+    Read the table with read_sweep(path).
+
+    :param max_n: largest number of cells
+    :param path: directory to write part files into, created if missing
+    :param min_n: smallest number of cells
+    :param workers: number of processes, 0 to work in this process, None for one per CPU
+    :param rows_per_file: rows to collect before writing a part file
+    :return: number of rows written
+    """
+    assert isinstance(workers, int | None)
+    assert rows_per_file >= 1
+    os.makedirs(path, exist_ok=True)
+    todo = pending_partitions(max_n, path, min_n=min_n)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    buffer = []
+    n_written = 0
+
+    def collect(row):
+        nonlocal n_written
+        if row is not None:
+            buffer.append(row)
+        if len(buffer) >= rows_per_file:
+            _write_part(path, buffer)
+            n_written = n_written + len(buffer)
+            buffer.clear()
+
+    try:
+        if workers <= 0:
+            for part in todo:
+                collect(_sweep_one(part))
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers)
+            try:
+                pending = {pool.submit(_sweep_one, part) for part in todo}
+                while len(pending) > 0:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        collect(future.result())
+            finally:
+                # on interruption drop queued partitions instead of running them
+                pool.shutdown(wait=True, cancel_futures=True)
+    finally:
+        # keep what finished, even if interrupted
+        if len(buffer) > 0:
+            _write_part(path, buffer)
+            n_written = n_written + len(buffer)
+    return n_written
+
+
+def read_sweep(path: str) -> pd.DataFrame:
+    """
+    Read the rows written by sweep_symmetric_loss_polys(), polynomials parsed back to sympy, ordered by n and partition.
+    """
+    files = _part_files(path)
+    if len(files) == 0:
+        return pd.DataFrame(columns=["n", "partition"] + _POLY_COLUMNS)
+    res = pd.concat([pd.read_parquet(f) for f in files], ignore_index=True)
+    res["partition"] = [[int(p) for p in part] for part in res["partition"]]
+    for c in _POLY_COLUMNS:
+        res[c] = [sympify(v) for v in res[c]]
+    order = sorted(range(len(res)), key=lambda i: (res["n"][i], [-p for p in res["partition"][i]]))
+    return res.iloc[order].reset_index(drop=True)
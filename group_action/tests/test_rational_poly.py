@@ -0,0 +1,46 @@
+from fractions import Fraction
+from sympy import Rational, expand, symbols
+from rational_poly import RationalPoly, _set_partitions
+
+
+def test_arithmetic():
+    y = RationalPoly.variables(3)
+    p = (y[0] + 2 * y[1]) ** 3 - Fraction(1, 3) * y[2]
+    assert p.degree() == 3
+    assert p.terms[(1, 2, 0)] == 12
+    assert p.terms[(0, 0, 1)] == Fraction(-1, 3)
+    assert (p - p).is_zero()
+    assert p * 0 == 0
+    assert (y[0] + 1) * (y[0] - 1) == y[0] ** 2 - 1
+    assert (y[0] / 2) * 4 == 2 * y[0]
+    assert 1 - y[1] == -(y[1] - 1)
+    # y_0 -> y_1 + y_2, y_1 -> 1/2
+    q = (y[0] * y[1]).substitute({0: y[1] + y[2], 1: Fraction(1, 2)})
+    assert q == (y[1] + y[2]) / 2
+
+
+def test_sympy_round_trip():
+    p_vars = symbols("y_0 y_1 y_2")
+    expr = p_vars[0] ** 2 * p_vars[1] / 3 - 5 * p_vars[2] + Rational(7, 2)
+    p = RationalPoly.from_sympy(expr, p_vars)
+    assert p.terms[(0, 0, 0)] == Fraction(7, 2)
+    assert expand(p.to_sympy(p_vars) - expr) == 0
+
+
+def test_symmetrize():
+    y = RationalPoly.variables(3)
+    # y_0**2 * y_1 averages to m_(2, 1) / 6
+    p = y[0] ** 2 * y[1] + y[0] * y[1]
+    assert p.monomial_symmetric_coefficients() == {(2, 1): Fraction(1, 6), (1, 1): Fraction(1, 3)}
+    assert p.symmetrize() == p.symmetrize().symmetrize()
+    assert p.symmetrize().terms[(0, 1, 2)] == Fraction(1, 6)
+    e1 = RationalPoly.elementary_symmetric(3, 1)
+    e2 = RationalPoly.elementary_symmetric(3, 2)
+    # e1 * e2 = m_(2, 1) + 3 m_(1, 1, 1)
+    assert (e1 * e2 - 3 * y[0] * y[1] * y[2]).symmetrize() == (6 * (y[0] ** 2 * y[1])).symmetrize()
+    assert (e1**2 - e2).elementary_symmetric_coefficients() == {(1, 1): 1, (2,): -1}
+
+
+def test_set_partitions():
+    # Bell numbers
+    assert [len(list(_set_partitions(k))) for k in range(6)] == [1, 1, 2, 5, 15, 52]
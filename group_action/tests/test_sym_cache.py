@@ -0,0 +1,28 @@
+from sympy import expand
+from sym_cache import SymResultCache
+from sym_calc import identify_variance_fn, identify_variance_fn_regular_blocks
+
+
+def test_cache_round_trip(tmp_path):
+    path = str(tmp_path / "sym_results.sqlite")
+    with SymResultCache(path) as cache:
+        table = cache.variance_table(6)
+        assert cache.hits == 0
+        assert len(table) == 29  # partitions of 1 through 6
+        # re-orderings share an entry
+        cache.identify_variance_fn([1, 3, 2])
+        assert cache.hits == 1
+        blocks = cache.identify_variance_fn_regular_blocks(n_blocks=2, block_size=4)
+    with SymResultCache(path) as cache:
+        again = cache.variance_table(6)
+        assert cache.misses == 0
+        for part, stored in zip(again["partition"], again["variance polynomial"]):
+            assert expand(stored - identify_variance_fn(part)) == 0
+        stored = cache.identify_variance_fn_regular_blocks(n_blocks=2, block_size=4)
+        assert expand(stored - blocks) == 0
+        assert expand(stored - identify_variance_fn_regular_blocks(n_blocks=2, block_size=4)) == 0
+        assert cache.misses == 0
+    # results are keyed by code version
+    with SymResultCache(path, version="other") as cache:
+        cache.identify_variance_fn([3, 2])
+        assert cache.misses == 1
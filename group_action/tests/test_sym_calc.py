@@ -0,0 +1,124 @@
+from sympy import Mul, Rational, expand, symbols, symmetrize
+from sym_calc import (
+    _fill_in_generator_pick_k,
+    _fill_in_list_regular_blocks,
+    _identify_variance_fn_through_sym,
+    calculate_symmetric_loss_poly_from_partition,
+    elementary_symmetric_form,
+    groups_from_partition,
+    identify_variance_fn,
+    identify_variance_fn_regular_blocks,
+    monomial_symmetric_coefficients,
+    partitions,
+    sq_loss_polynomial,
+    sq_loss_rational_poly,
+    selection_symmetric_coefficients,
+    symmetrize_poly_by_orbit_sums,
+    symmetrize_poly_by_selection_patterns,
+    symmetrize_poly_by_summing_out_permutations,
+    symmetrize_poly_by_summing_out_selections,
+)
+
+
+def _example_polys(p_vars):
+    y = p_vars
+    return [
+        y[0],
+        y[0] ** 2 * y[1] - 3 * y[1] * y[2] + Rational(1, 7),
+        (y[0] - y[1]) ** 2 * (y[0] + 2 * y[2]) + y[1] ** 4,
+        Mul(*y) + y[0] ** 3,
+    ]
+
+
+def test_orbit_sums_match_permutation_sums():
+    for n in range(3, 6):
+        p_vars = list(symbols(" ".join([f"y_{i}" for i in range(n)])))
+        polys = _example_polys(p_vars) + [sq_loss_polynomial(groups_from_partition([n - 1, 1]))[0]]
+        for p in polys:
+            expected = symmetrize_poly_by_summing_out_permutations(p, p_vars)
+            assert expand(symmetrize_poly_by_orbit_sums(p, p_vars) - expected) == 0
+            assert expand(elementary_symmetric_form(p, p_vars) - symmetrize(expected, formal=True)[0]) == 0
+
+
+def test_monomial_symmetric_coefficients():
+    y = symbols("y_0 y_1 y_2")
+    # y_0**2 * y_1 averages to m_(2, 1) / 6, y_0 * y_1 to m_(1, 1) / 3
+    assert monomial_symmetric_coefficients(y[0] ** 2 * y[1] + y[0] * y[1], y) == {
+        (2, 1): Rational(1, 6),
+        (1, 1): Rational(1, 3),
+    }
+
+
+def test_loss_poly_from_partition():
+    s1, s2, s3, s4 = symbols("s1 s2 s3 s4")
+    res = calculate_symmetric_loss_poly_from_partition([3, 2])
+    assert expand(res["expected loss polynomial"][0] - (s1**2 / 5 - s2 / 2)) == 0
+    assert (
+        expand(
+            res["loss variance polynomial"][0]
+            - (-6 * s1 * s3 / 125 + 9 * s2**2 / 500 + 3 * s4 / 25)
+        )
+        == 0
+    )
+
+
+def test_selection_patterns_match_brute_force():
+    for n in range(3, 6):
+        p_vars = list(symbols(" ".join([f"y_{i}" for i in range(n)])))
+        # n**n brute force selections, keep the n = 5 case to one polynomial
+        polys = _example_polys(p_vars) if n < 5 else []
+        polys = polys + [sq_loss_polynomial(groups_from_partition([n - 1, 1]))[0]]
+        for p in polys:
+            expected = symmetrize_poly_by_summing_out_selections(p, p_vars)
+            assert expand(symmetrize_poly_by_selection_patterns(p, p_vars) - expected) == 0
+
+
+def test_selection_symmetric_coefficients():
+    y = symbols("y_0 y_1 y_2")
+    # y_0 * y_1 under selection: 3 of 9 maps land on one variable (m_(2) / 9), 6 on two (2 m_(1, 1) / 9)
+    assert selection_symmetric_coefficients(y[0] * y[1], y) == {(2,): Rational(1, 9), (1, 1): Rational(2, 9)}
+
+
+def test_identify_variance_fn_matches_sympy_reference():
+    for n in range(4, 7):
+        for part in partitions(n):
+            if (len(part) <= 1) or (max(part) <= 1):
+                continue
+            expected = _identify_variance_fn_through_sym(
+                part,
+                symmetry_fn=_fill_in_generator_pick_k,
+                symmetry_args={"n_set_positions": 4},
+                detect_support=False,
+            )
+            assert expand(identify_variance_fn(part) - expected) == 0
+
+
+def test_elementary_symmetric_form_keeps_rational_constants():
+    y = symbols("y_0 y_1 y_2")
+    res = elementary_symmetric_form(y[0] + Rational(1, 7), y)
+    s1 = symbols("s1")
+    assert res - s1 / 3 == Rational(1, 7)
+    assert res.as_coeff_Add()[0].is_Rational
+    v = identify_variance_fn([2, 2])
+    assert all([coef.is_Rational for coef in v.as_coefficients_dict().values()])
+
+
+def test_identify_variance_fn_regular_blocks_matches_sympy_reference():
+    for n_blocks, block_size in [(2, 4), (3, 4)]:
+        expected = _identify_variance_fn_through_sym(
+            [block_size] * n_blocks,
+            symmetry_fn=_fill_in_list_regular_blocks,
+            symmetry_args={"n_set_positions": 4, "block_size": block_size},
+            detect_support=True,
+        )
+        res = identify_variance_fn_regular_blocks(n_blocks=n_blocks, block_size=block_size)
+        assert expand(res - expected) == 0
+
+
+def test_sq_loss_rational_poly_matches_sq_loss_polynomial():
+    groupings = [groups_from_partition(part) for n in range(2, 8) for part in partitions(n)]
+    groupings = groupings + [[[0, 3], [1], [2, 4, 5]], [[4], [0, 1, 2, 3]], [[2], [1], [0]]]
+    for groups in groupings:
+        expected, p_vars = sq_loss_polynomial(groups)
+        res = sq_loss_rational_poly(groups)
+        assert expand(res.to_sympy(p_vars) - expected).is_zero
@@ -0,0 +1,36 @@
+import os
+from sympy import expand
+from sym_calc import calculate_symmetric_loss_poly_from_partition, partitions
+from sym_sweep import (
+    completed_partitions,
+    expected_cost,
+    pending_partitions,
+    read_sweep,
+    sweep_symmetric_loss_polys,
+)
+
+
+def test_sweep_and_resume(tmp_path):
+    path = str(tmp_path / "sweep")
+    assert pending_partitions(2, path) == [[2]]
+    # an interrupted sweep: only n up to 4 on disk
+    assert sweep_symmetric_loss_polys(4, path, workers=0, rows_per_file=3) == 7
+    assert len(completed_partitions(path)) == 7
+    # resume computes only the missing partitions
+    assert sweep_symmetric_loss_polys(6, path, workers=2, rows_per_file=3) == 16
+    assert sweep_symmetric_loss_polys(6, path, workers=2) == 0
+    # zero loss partitions (all singletons) are never pending, so a finished sweep shows nothing left
+    assert pending_partitions(6, path) == []
+    assert sorted(pending_partitions(7, path)) == sorted([p for p in partitions(7) if max(p) > 1])
+    assert not any([f.startswith(".") for f in os.listdir(path)])
+    res = read_sweep(path)
+    expected_parts = [p for n in range(1, 7) for p in partitions(n) if max(p) > 1]
+    assert list(res["partition"]) == expected_parts
+    for i in [0, 5, len(res) - 1]:
+        direct = calculate_symmetric_loss_poly_from_partition(res["partition"][i])
+        for c in ["expected loss polynomial", "loss variance polynomial"]:
+            assert expand(res[c][i] - direct[c][0]) == 0
+
+
+def test_expected_cost():
+    assert expected_cost([6]) > expected_cost([3, 3]) > expected_cost([5])
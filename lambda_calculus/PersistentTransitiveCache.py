@@ -0,0 +1,210 @@
+
+import hashlib
+import sqlite3
+from typing import Callable, Iterable
+
+from TransitiveCache import TransitiveCache
+
+
+class PersistentTransitiveCache(TransitiveCache):
+    """TransitiveCache backed by a SQLite file (WAL mode, so several processes can read while one writes).
+    With preload stored entries are loaded into memory on open, otherwise the stored fingerprints are
+    read on open and entries are fetched by fingerprint as they are asked for (so a miss costs no query).
+    New entries are written back by flush(). The default fingerprint is the 64 bit structural hash of a Term."""
+    _path: str
+    _serialize: Callable
+    _deserialize: Callable
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        max_size : int = 1000000,
+        max_bytes : int | None = None,
+        size_fn : Callable | None = None,
+        serialize : Callable | None = None,
+        deserialize : Callable | None = None,
+        fingerprint : Callable | None = None,
+        preload : bool = True,
+        flush_every : int = 10000,
+    ):
+        super().__init__(max_size=max_size, max_bytes=max_bytes, size_fn=size_fn)
+        assert isinstance(path, str)
+        assert isinstance(preload, bool)
+        assert isinstance(flush_every, int)
+        self._memo_deserialize = deserialize is None  # loads_term() accepts a memo
+        if (serialize is None) or (deserialize is None):
+            from lambda_calc import dumps_term, loads_term
+
+            serialize = dumps_term if serialize is None else serialize
+            deserialize = loads_term if deserialize is None else deserialize
+        self._path = path
+        self._serialize = serialize
+        self._deserialize = deserialize
+        # the structural hash is all the column keeps, fingerprint() would also compute the alpha half
+        self._fingerprint = (lambda item: item._hash_val) if fingerprint is None else fingerprint
+        self._preload = preload
+        self._absent = set()  # stored fingerprints whose rows hold other items (preload=False)
+        self._stored_fingerprints = set()  # fingerprints in the file as of the last refresh (preload=False)
+        self._fingerprints_rowid = 0
+        self._flush_every = flush_every
+        self._dirty = dict()  # items stored since the last flush
+        self._loaded_rowid = 0
+        self._loading = False
+        self._conn = sqlite3.connect(path, timeout=60.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS transitions"
+                " (key TEXT PRIMARY KEY, fingerprint INTEGER NOT NULL, start TEXT NOT NULL, result TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS transitions_fingerprint ON transitions (fingerprint)")
+        self.refresh()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _stored_fingerprint(self, item) -> int:
+        """fingerprint as a signed 64 bit SQLite integer"""
+        fp = self._fingerprint(item) & 0xFFFFFFFFFFFFFFFF
+        return fp - (1 << 64) if fp >= (1 << 63) else fp
+
+    def refresh(self) -> int:
+        """load entries written (by any process) since the last refresh, returns number loaded
+        (with preload=False only their fingerprints are read, entries are fetched when asked for)"""
+        self._absent = set()
+        if not self._preload:
+            rows = self._conn.execute(
+                "SELECT rowid, fingerprint FROM transitions WHERE rowid > ?", (self._fingerprints_rowid,)
+            ).fetchall()
+            for rowid, fp in rows:
+                self._fingerprints_rowid = max(self._fingerprints_rowid, rowid)
+                self._stored_fingerprints.add(fp)
+            return len(rows)
+        rows = self._conn.execute(
+            "SELECT rowid, start, result FROM transitions WHERE rowid > ? ORDER BY rowid", (self._loaded_rowid,)
+        ).fetchall()
+        parsed = dict()  # text -> item, shares repeated results
+        memo = dict() if self._memo_deserialize else None  # sub-terms shared between rows
+
+        def load(text: str):
+            try:
+                return parsed[text]
+            except KeyError:
+                item = self._deserialize(text) if memo is None else self._deserialize(text, memo=memo)
+                parsed[text] = item
+                return item
+
+        self._loading = True
+        try:
+            for rowid, start, result in rows:
+                self._loaded_rowid = max(self._loaded_rowid, rowid)
+                if result is None:
+                    self.store_absorbing(load(start))
+                else:
+                    item = load(start)
+                    if item not in self._absorbing_states:
+                        self.store_transition(item, load(result))
+        finally:
+            self._loading = False
+        return len(rows)
+
+    def _fetch(self, item) -> bool:
+        """load the stored entry for item, matching fingerprints then comparing terms"""
+        fp = self._stored_fingerprint(item)
+        if (fp not in self._stored_fingerprints) or (fp in self._absent):
+            return False
+        rows = self._conn.execute("SELECT start, result FROM transitions WHERE fingerprint = ?", (fp,)).fetchall()
+        for start, result in rows:
+            if self._deserialize(start) == item:
+                self._loading = True
+                try:
+                    if result is None:
+                        self.store_absorbing(item)
+                    else:
+                        self.store_transition(item, self._deserialize(result))
+                finally:
+                    self._loading = False
+                return True
+        self._absent.add(fp)
+        return False
+
+    def __contains__(self, item):
+        if super().__contains__(item):
+            return True
+        if self._preload:
+            return False
+        return self._fetch(item)
+
+    def store_absorbing(self, item) -> None:
+        super().store_absorbing(item)
+        self._mark(item)
+
+    def store_transition(self, start, end) -> None:
+        super().store_transition(start, end)
+        self._mark(start)
+
+    def _mark(self, item) -> None:
+        if self._loading:
+            return
+        self._dirty[item] = True
+        if len(self._dirty) >= self._flush_every:
+            self.flush()
+
+    def flush(self) -> int:
+        """write entries stored since the last flush (transitions resolved to their furthest known result),
+        returns number written"""
+        rows = []
+        for item in self._dirty.keys():
+            if item in self._absorbing_states:
+                result = None
+            elif item in self._transitions:
+                result = self._serialize(self.lookup_result(item))
+            else:
+                continue  # evicted before it was written
+            start = self._serialize(item)
+            rows.append((self._key(start), self._stored_fingerprint(item), start, result))
+        self._dirty = dict()
+        self._stored_fingerprints.update([row[1] for row in rows])  # evicted entries can be fetched back
+        if len(rows) > 0:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO transitions (key, fingerprint, start, result) VALUES (?, ?, ?, ?)", rows
+                )
+        return len(rows)
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def prepopulate(path: str, exprs: Iterable, *, max_steps: int | None = None, engine: str = "named") -> int:
+    """reduce each expression to normal form, recording the results in the cache file at path,
+    returns the number of stored entries"""
+    with PersistentTransitiveCache(path) as tc:
+        for expr in exprs:
+            expr.nf(max_steps=max_steps, tc=tc, engine=engine)
+        tc.flush()
+        return tc._conn.execute("SELECT COUNT(*) FROM transitions").fetchone()[0]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from lambda_calc import parse_l
+
+    parser = argparse.ArgumentParser(description="pre-populate a persistent lambda calculus normal form cache")
+    parser.add_argument("path", help="SQLite cache file")
+    parser.add_argument("exprs", nargs="+", help='expressions in parse_l() form, e.g. "v(DIV, N(14), N(3))"')
+    parser.add_argument("--max-steps", type=int, default=None)
+    parser.add_argument("--engine", default="named")
+    args = parser.parse_args()
+    n = prepopulate(args.path, [parse_l(e) for e in args.exprs], max_steps=args.max_steps, engine=args.engine)
+    print(f"{args.path}: {n} entries")
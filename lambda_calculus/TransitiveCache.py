@@ -1,45 +1,116 @@
 
-from typing import Dict, Set
+import sys
+from typing import Callable, Dict, Set
 from collections import OrderedDict
 
 
+# bytes held per node of a freshly built Term (the dataclass with its names and free_names frozensets),
+# measured with tracemalloc (see benchmarks/bench_store.py), shared sub-terms make real use lower
+_TERM_NODE_BYTES = 600
+
+
+def estimated_size(item) -> int:
+    """estimated bytes held by a cache item: node count times _TERM_NODE_BYTES for Terms
+    (sys.getsizeof() would only see the top dataclass), sys.getsizeof() otherwise"""
+    from lambda_calc import Term, _size_and_depth
+
+    if isinstance(item, Term):
+        return _size_and_depth(item)[0] * _TERM_NODE_BYTES
+    return sys.getsizeof(item)
+
+
 class TransitiveCache:
     """cache that store start->end _transitions and compute transitive closure on lookup"""
-    _absorbing_states: OrderedDict
-    _transitions: OrderedDict
+    _absorbing_states: OrderedDict  # item -> size
+    _transitions: OrderedDict  # start -> (end, size of start, size of end)
     _max_size: int
+    _max_bytes: int | None
+    _size_fn: Callable
 
-    def __init__(self, *, max_size : int = 1000000):
+    def __init__(self, *, max_size : int = 1000000, max_bytes : int | None = None, size_fn : Callable | None = None):
+        """max_size bounds the entries in each table, max_bytes (if set) bounds the total size_fn() of stored
+        items (transitions are charged for both their start and end), default size_fn is estimated_size().
+        Sizes are only measured (and reported by stats()) when max_bytes or size_fn is given."""
         assert isinstance(max_size, int)
+        assert isinstance(max_bytes, int | None)
         self._absorbing_states = OrderedDict()
         self._transitions = OrderedDict()
         self._max_size = max_size
+        self._max_bytes = max_bytes
+        self._size_fn = estimated_size if size_fn is None else size_fn
+        self._measure = (max_bytes is not None) or (size_fn is not None)  # sizing a Term walks all of it
+        self._absorbing_bytes = 0
+        self._transition_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._lookups = 0
+        self._compressed_hops = 0
+        self._evictions = 0
+        self._chain_lengths: Dict[int, int] = dict()  # hops followed -> number of lookups
 
     def lookup_result(self, start):
         assert start is not None
         if (start in self._absorbing_states) or (start not in self._transitions):
             return start
-        seen = set()
+        self._lookups = self._lookups + 1
+        path = []
+        seen: Set = set()
         end = start
-        try:
-            while end not in self._absorbing_states:
-                if end in seen:
-                    raise ValueError("cycle")
-                seen.add(end)
-                end = self._transitions[end]
-        except KeyError:
-            pass
+        while end not in self._absorbing_states:
+            step = self._transitions.get(end)
+            if step is None:
+                break
+            if end in seen:
+                raise ValueError("cycle")
+            seen.add(end)
+            path.append(end)
+            end = step[0]
+        self._chain_lengths[len(path)] = self._chain_lengths.get(len(path), 0) + 1
         # short circuit all visited states to end
-        for s in reversed(list(seen)):
-            if s != end:
-                self.store_transition(s, end)
-                self._transitions.move_to_end(s)
+        for s in path:
+            entry = self._transitions[s]
+            if entry[0] is not end:
+                self._compressed_hops = self._compressed_hops + 1
+                end_size = self._item_size(end)
+                self._transition_bytes = self._transition_bytes + end_size - entry[2]
+                self._transitions[s] = (end, entry[1], end_size)
+            self._transitions.move_to_end(s)
         return end
 
-    def store_absorbing(self, item) -> None:
-        self._absorbing_states[item] = True
+    def _item_size(self, item) -> int:
+        return self._size_fn(item) if self._measure else 0
+
+    def _shrink(self) -> None:
+        """evict least recently used entries until within budget"""
         while len(self._absorbing_states) > self._max_size:
-            self._absorbing_states.popitem(last=False)
+            self._pop_absorbing()
+        while len(self._transitions) > self._max_size:
+            self._pop_transition()
+        if self._max_bytes is not None:
+            while self._absorbing_bytes + self._transition_bytes > self._max_bytes:
+                if self._transition_bytes >= self._absorbing_bytes:
+                    self._pop_transition()
+                else:
+                    self._pop_absorbing()
+
+    def _pop_absorbing(self) -> None:
+        _, size = self._absorbing_states.popitem(last=False)
+        self._absorbing_bytes = self._absorbing_bytes - size
+        self._evictions = self._evictions + 1
+
+    def _pop_transition(self) -> None:
+        _, (_, start_size, end_size) = self._transitions.popitem(last=False)
+        self._transition_bytes = self._transition_bytes - start_size - end_size
+        self._evictions = self._evictions + 1
+
+    def store_absorbing(self, item) -> None:
+        if item in self._absorbing_states:
+            self._absorbing_states.move_to_end(item)
+            return
+        size = self._item_size(item)
+        self._absorbing_states[item] = size
+        self._absorbing_bytes = self._absorbing_bytes + size
+        self._shrink()
 
     def store_transition(self, start, end) -> None:
         assert start is not None
@@ -48,16 +119,48 @@ class TransitiveCache:
         # try to avoid a -> b overwrittig a -> c (from earlier a -> b -> c)
         if end in self._transitions:
             end = self.lookup_result(end)
-        self._transitions[start] = end
-        while len(self._transitions) > self._max_size:
-            self._transitions.popitem(last=False)
-    
+        previous = self._transitions.get(start)
+        if previous is not None:
+            start_size = previous[1]
+            self._transition_bytes = self._transition_bytes - previous[2]
+            self._transitions.move_to_end(start)
+        else:
+            start_size = self._item_size(start)
+            self._transition_bytes = self._transition_bytes + start_size
+        end_size = self._item_size(end)
+        self._transition_bytes = self._transition_bytes + end_size
+        self._transitions[start] = (end, start_size, end_size)
+        self._shrink()
+
     def __contains__(self, item):
         assert item is not None
         if item in self._absorbing_states:
             self._absorbing_states.move_to_end(item)
+            self._hits = self._hits + 1
             return True
         if item in self._transitions:
             self._transitions.move_to_end(item)
+            self._hits = self._hits + 1
             return True
+        self._misses = self._misses + 1
         return False
+
+    def stats(self) -> Dict:
+        """counters: hits/misses of membership tests, evictions, hops removed by path compression,
+        entry counts, estimated bytes, and a histogram of chain lengths followed by lookups"""
+        n_chains = sum(self._chain_lengths.values())
+        total_hops = sum(k * v for k, v in self._chain_lengths.items())
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self._hits / max(1, self._hits + self._misses),
+            "lookups": self._lookups,
+            "compressed_hops": self._compressed_hops,
+            "evictions": self._evictions,
+            "absorbing_states": len(self._absorbing_states),
+            "transitions": len(self._transitions),
+            "bytes": self._absorbing_bytes + self._transition_bytes,
+            "mean_chain_length": total_hops / max(1, n_chains),
+            "max_chain_length": max(self._chain_lengths.keys(), default=0),
+            "chain_lengths": dict(sorted(self._chain_lengths.items())),
+        }
@@ -0,0 +1,96 @@
+"""
+Compare cache hit rates of TransitiveCache (exact terms) and AlphaTransitiveCache
+(terms equal up to renaming of bound variables) on repeated fixed point unrolling.
+
+Run from the lambda_calculus directory:
+
+    python benchmarks/bench_alpha_cache.py [--copies 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from lambda_calc import (  # noqa: E402
+    DIV,
+    FACTORIALstep,
+    MULT,
+    PRED,
+    TRUE,
+    AlphaTransitiveCache,
+    N,
+    Term,
+    Y,
+    _Abstraction,
+    _Variable,
+    isZERO,
+    v,
+    λ,
+    Λ,
+)
+from TransitiveCache import TransitiveCache  # noqa: E402
+
+
+def renamed(t: Term, suffix: str, bound=None) -> Term:
+    """copy of t with every bound variable name extended by suffix"""
+    bound = frozenset() if bound is None else bound
+    if type(t) is _Variable:
+        return v(t.name + suffix) if t.name in bound else t
+    if type(t) is _Abstraction:
+        factory = Λ if t.eager else λ
+        name = t.variable.name
+        return factory[name + suffix](renamed(t.term, suffix, bound | {name}))
+    return renamed(t.left, suffix, bound) | renamed(t.right, suffix, bound)
+
+
+# factorial step with a free parameter x, substituting it under Y's λx forces a fresh
+# bound name on every unrolling
+FACTORIALstep_x = λ["g"](Λ["n"](isZERO, "n", (TRUE, N(1), "x"), (MULT, "n", ("g", (PRED, "n")))))
+
+
+def workloads(copies: int):
+    """(label, terms normalized in sequence against one cache)"""
+    suffixes = [""] + [f"_{i}" for i in range(1, copies)]
+    return [
+        ("FACTORIAL 3, renamed copies", [renamed(Y | FACTORIALstep | N(3), s) for s in suffixes]),
+        ("DIV 14 3, renamed copies", [renamed(DIV | N(14) | N(3), s) for s in suffixes]),
+        ("FACTORIAL 1..4, free parameter", [Y | FACTORIALstep_x | N(k) for k in range(1, 5)]),
+    ]
+
+
+def run(terms, cache_type):
+    """seconds, final cache stats, and hit rate over the terms after the first"""
+    tc = cache_type()
+    start = time.perf_counter()
+    terms[0].nf(tc=tc)
+    first = tc.stats()
+    for t in terms[1:]:
+        t.nf(tc=tc)
+    elapsed = time.perf_counter() - start
+    stats = tc.stats()
+    hits = stats["hits"] - first["hits"]
+    misses = stats["misses"] - first["misses"]
+    return elapsed, stats, hits / max(1, hits + misses)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--copies", type=int, default=3)
+    args = parser.parse_args()
+    print(
+        f"{'workload':<32} {'cache':<22} {'time':>8} {'hits':>6} {'misses':>7} {'hit rate':>9} {'repeat hit rate':>16}"
+    )
+    for label, terms in workloads(args.copies):
+        for cache_type in (TransitiveCache, AlphaTransitiveCache):
+            elapsed, stats, repeat_hit_rate = run(terms, cache_type)
+            print(
+                f"{label:<32} {cache_type.__name__:<22} {elapsed:>7.3f}s {stats['hits']:>6} "
+                f"{stats['misses']:>7} {stats['hit_rate']:>9.3f} {repeat_hit_rate:>16.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Time `import lambda_calc` and turning on presentation aliases, each in a fresh interpreter.
+
+Run from the lambda_calculus directory:
+
+    python benchmarks/bench_import.py [--repeats 5]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+
+_lambda_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# run in a child process, prints a JSON dict of measurements
+_probe = """
+import json, time, tracemalloc
+tracemalloc.start()
+start = time.perf_counter()
+import lambda_calc
+imported = time.perf_counter()
+import_peak = tracemalloc.get_traced_memory()[1]
+lambda_calc.load_common_aliases(add_reps=True)
+aliased = time.perf_counter()
+text = str(lambda_calc.PLUS | lambda_calc.N(3) | lambda_calc.N(999))
+rendered = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "import_peak_bytes": import_peak,
+    "load_common_aliases": aliased - imported,
+    "render": rendered - aliased,
+    "modules": len(__import__("sys").modules),
+}))
+"""
+
+
+def measure() -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", _probe], cwd=_lambda_dir, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    runs = [measure() for _ in range(args.repeats)]
+    print(f"{'measurement':<22} {'best':>12} {'worst':>12}")
+    for key in ("import", "load_common_aliases", "render"):
+        values = [r[key] for r in runs]
+        print(f"{key:<22} {min(values):>11.4f}s {max(values):>11.4f}s")
+    print(f"{'import peak memory':<22} {min(r['import_peak_bytes'] for r in runs) / 1e6:>10.2f}MB")
+    print(f"{'modules loaded':<22} {runs[0]['modules']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Compare the original recursive normal order reducer (engine="recursive") with
+the explicit stack reducer (engine="named").
+
+Run from the lambda_calculus directory:
+
+    python benchmarks/bench_iterative.py [--recursion-limit 100000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from lambda_calc import MULT, N, SUCC  # noqa: E402
+
+
+def workloads():
+    """(label, term builder, expected normal form builder)"""
+    return [
+        ("N(5000)", lambda: N(5000), lambda: N(5000)),
+        ("SUCC | N(5000)", lambda: SUCC | N(5000), lambda: N(5001)),
+        ("MULT | N(60) | N(60)", lambda: MULT | N(60) | N(60), lambda: N(3600)),
+    ]
+
+
+def time_nf(term, expect, *, engine: str):
+    """seconds to normalize, or the exception name on failure"""
+    start = time.perf_counter()
+    try:
+        res, steps = term.nf(engine=engine)
+    except RecursionError:
+        return "RecursionError", None
+    elapsed = time.perf_counter() - start
+    assert res == expect
+    return f"{elapsed:.3f}s", steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--recursion-limit", type=int, default=None)
+    args = parser.parse_args()
+    if args.recursion_limit is not None:
+        sys.setrecursionlimit(args.recursion_limit)
+    print(f"recursion limit {sys.getrecursionlimit()}")
+    print(f"{'workload':<24} {'engine':<10} {'time':>16} {'steps':>6}")
+    for label, build, build_expect in workloads():
+        term = build()
+        expect = build_expect()
+        for engine in ("recursive", "named"):
+            elapsed, steps = time_nf(term, expect, engine=engine)
+            print(f"{label:<24} {engine:<10} {elapsed:>16} {steps if steps is not None else '':>6}")
+
+
+if __name__ == "__main__":
+    main()
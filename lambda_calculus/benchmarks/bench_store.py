@@ -0,0 +1,57 @@
+"""
+Memory per node of Church numerals held as Terms versus in a lambda_store.TermStore.
+
+Run from the lambda_calculus directory:
+
+    python benchmarks/bench_store.py [--k 10000]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from lambda_calc import N, _size_and_depth  # noqa: E402
+from lambda_store import TermStore  # noqa: E402
+
+
+def measure(build):
+    """(result, bytes allocated and still held, seconds)"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    res = build()
+    elapsed = time.perf_counter() - start
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return res, held, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--k", type=int, default=10000)
+    args = parser.parse_args()
+    t, term_bytes, term_seconds = measure(lambda: N(args.k))
+    nodes = _size_and_depth(t)[0]
+    store = TermStore()
+    stored, store_bytes, store_seconds = measure(lambda: store.numeral(args.k))
+    assert stored.to_term() == t
+    copy_store = TermStore()
+    _, copy_bytes, copy_seconds = measure(lambda: copy_store.add(t))
+    print(f"N({args.k}): {nodes} nodes as a Term tree, {len(store)} distinct nodes in the store")
+    print(f"{'representation':<22} {'bytes':>12} {'bytes/node':>11} {'seconds':>9}")
+    for label, held, seconds in (
+        ("Term", term_bytes, term_seconds),
+        ("TermStore.numeral", store_bytes, store_seconds),
+        ("TermStore.add", copy_bytes, copy_seconds),
+    ):
+        print(f"{label:<22} {held:>12} {held / nodes:>11.1f} {seconds:>9.4f}")
+    print("(bytes per node of the Term tree, the store shares repeated variables)")
+
+
+if __name__ == "__main__":
+    main()
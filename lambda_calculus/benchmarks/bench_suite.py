@@ -0,0 +1,192 @@
+"""
+Performance suite for the lambda_calculus package: parsing, construction, equality and
+hashing, nf() with and without a TransitiveCache, compiled evaluation (lambda_compile) and
+rendering, at increasing numeral sizes.
+
+Run from the lambda_calculus directory:
+
+    python benchmarks/bench_suite.py [--filter nf/] [--quick] [--output results.json]
+    python benchmarks/bench_suite.py --compare old.json new.json [--threshold 0.2]
+
+Each benchmark is timed over repeated runs (set up afresh, untimed, before each run);
+the JSON output records best and median seconds so runs can be compared over time.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from lambda_calc import (  # noqa: E402
+    DIV,
+    FACTORIALstep,
+    GCD,
+    MULT,
+    PLUS,
+    PRED,
+    Y,
+    Z,
+    N,
+    Θ,
+    dumps_term,
+    loads_term,
+    parse_l,
+)
+from TransitiveCache import TransitiveCache  # noqa: E402
+
+
+def _fresh(t):
+    """structurally equal copy sharing no nodes (so no memoized hashes, renderings or identity shortcuts)"""
+    return loads_term(dumps_term(t))
+
+
+def _nf_cases() -> List[Tuple[str, Callable]]:
+    cases = []
+    for k in (10, 50, 200):
+        cases.append((f"PLUS {k} {k}", lambda k=k: PLUS | N(k) | N(k)))
+    for k in (5, 15, 30):
+        cases.append((f"MULT {k} {k}", lambda k=k: MULT | N(k) | N(k)))
+    for k in (10, 50, 200):
+        cases.append((f"PRED {k}", lambda k=k: PRED | N(k)))
+    for m, n in ((14, 3), (30, 4)):
+        cases.append((f"DIV {m} {n}", lambda m=m, n=n: DIV | N(m) | N(n)))
+    cases.append(("GCD 12 18", lambda: GCD | N(12) | N(18)))
+    for name, fix in (("Y", Y), ("Z", Z), ("Θ", Θ)):
+        for k in (2, 3):
+            cases.append((f"FACTORIAL {name} {k}", lambda fix=fix, k=k: fix | FACTORIALstep | N(k)))
+    return cases
+
+
+def benchmarks() -> Dict[str, Callable]:
+    """name -> setup(), setup returns the zero argument function to time"""
+    res = dict()
+    for k in (10, 100, 1000):
+        text = repr(DIV | N(k) | N(k // 2))
+        res[f"parse/repr DIV {k}"] = lambda text=text: (lambda: parse_l(text))
+        lam_text = f"DIV {k} {k // 2}"
+        res[f"parse/lambda DIV {k}"] = lambda lam_text=lam_text: (lambda: parse_l(lam_text, syntax="lambda"))
+    for k in (100, 1000, 5000):
+        res[f"construct/N {k}"] = lambda k=k: (lambda: N(k))
+        text = dumps_term(N(k))
+        res[f"construct/loads_term N {k}"] = lambda text=text: (lambda: loads_term(text))
+    for k in (100, 1000, 5000):
+        res[f"eq/N {k} distinct copies"] = lambda k=k: (lambda a, b: (lambda: a == b))(N(k), N(k))
+        res[f"hash/fingerprint N {k}"] = lambda k=k: (lambda t: (lambda: t.fingerprint()))(_fresh(N(k)))
+    for label, build in _nf_cases():
+        res[f"nf/{label}"] = lambda build=build: (lambda t: (lambda: t.nf()))(build())
+        res[f"nf_tc/{label} cold"] = lambda build=build: (lambda t: (lambda: t.nf(tc=TransitiveCache())))(build())
+
+        def warm(build=build):
+            t = build()
+            tc = TransitiveCache()
+            t.nf(tc=tc)
+            return lambda: t.nf(tc=tc)
+
+        res[f"nf_tc/{label} warm"] = warm
+        res[f"compiled/{label}"] = lambda build=build: (lambda t: (lambda: t.compile().nf()))(build())
+    state = (DIV | N(30) | N(4)).r(n=150)
+    for kind, render in (("str", str), ("repr", repr), ("latex", lambda t: t.to_latex())):
+        res[f"render/{kind} DIV state"] = lambda render=render: (lambda t: (lambda: render(t)))(_fresh(state))
+        res[f"render/{kind} N 5000"] = lambda render=render: (lambda t: (lambda: render(t)))(_fresh(N(5000)))
+    return res
+
+
+def time_benchmark(setup: Callable, *, min_time: float, min_repeats: int, max_repeats: int) -> Dict:
+    times = []
+    total = 0.0
+    while (len(times) < min_repeats) or ((total < min_time) and (len(times) < max_repeats)):
+        fn = setup()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        times.append(elapsed)
+        total = total + elapsed
+    return {
+        "best": min(times),
+        "median": statistics.median(times),
+        "repeats": len(times),
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(*, name_filter: str | None, quick: bool) -> Dict:
+    results = dict()
+    for name, setup in benchmarks().items():
+        if (name_filter is not None) and (name_filter not in name):
+            continue
+        res = time_benchmark(
+            setup, min_time=0.05 if quick else 0.5, min_repeats=1 if quick else 3, max_repeats=5 if quick else 50
+        )
+        results[name] = res
+        print(f"{name:<40} best {res['best']:.6f}s  median {res['median']:.6f}s  ({res['repeats']} runs)")
+    return {
+        "meta": {
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "commit": _git_commit(),
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+
+def compare(old_path: str, new_path: str, *, threshold: float) -> int:
+    """print best time ratios (new / old), returns the number of regressions beyond threshold"""
+    with open(old_path) as f:
+        old = json.load(f)["results"]
+    with open(new_path) as f:
+        new = json.load(f)["results"]
+    regressions = 0
+    print(f"{'benchmark':<40} {'old':>10} {'new':>10} {'ratio':>7}")
+    for name in sorted(set(old) & set(new)):
+        ratio = new[name]["best"] / max(old[name]["best"], 1e-12)
+        flag = ""
+        if ratio > 1.0 + threshold:
+            flag = "  slower"
+            regressions = regressions + 1
+        elif ratio < 1.0 / (1.0 + threshold):
+            flag = "  faster"
+        print(f"{name:<40} {old[name]['best']:>10.6f} {new[name]['best']:>10.6f} {ratio:>7.2f}{flag}")
+    for name in sorted(set(old) ^ set(new)):
+        print(f"{name:<40} only in {'old' if name in old else 'new'}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filter", default=None, help="only run benchmarks whose name contains this")
+    parser.add_argument("--quick", action="store_true", help="fewer repeats, for smoke testing")
+    parser.add_argument("--output", default=None, help="JSON results file")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), default=None)
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slow down reported as a regression")
+    args = parser.parse_args()
+    if args.compare is not None:
+        regressions = compare(args.compare[0], args.compare[1], threshold=args.threshold)
+        sys.exit(1 if regressions > 0 else 0)
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 20000))
+    res = run(name_filter=args.filter, quick=args.quick)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(res, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
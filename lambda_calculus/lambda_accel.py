@@ -0,0 +1,303 @@
+import random
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from lambda_calc import (
+    FALSE,
+    LEQ,
+    MULT,
+    MaxStepsExceeded,
+    PLUS,
+    PRED,
+    SUB,
+    SUCC,
+    TRUE,
+    N,
+    ReductionContext,
+    Term,
+    _BrentCycleCheck,
+    _Abstraction,
+    _Composition,
+    _Variable,
+    _beta_step,
+    _mk_abstraction,
+    _mk_composition,
+    isZERO,
+)
+from TransitiveCache import TransitiveCache
+
+
+# accelerated primitives: saturated applications of these library combinators to
+# closed Church numerals are replaced by their value, computed on Python ints
+_primitives: Dict[Term, Tuple[str, int, Callable]] = {
+    SUCC: ("SUCC", 1, lambda n: n + 1),
+    PRED: ("PRED", 1, lambda n: max(n - 1, 0)),
+    isZERO: ("isZERO", 1, lambda n: n == 0),
+    PLUS: ("PLUS", 2, lambda m, n: m + n),
+    MULT: ("MULT", 2, lambda m, n: m * n),
+    SUB: ("SUB", 2, lambda m, n: max(m - n, 0)),
+    LEQ: ("LEQ", 2, lambda m, n: m <= n),
+}
+
+# entries the reducer's id memos may hold (keeping their terms alive) before they are dropped
+_MEMO_LIMIT = 100000
+
+_validation_enabled = False
+_validation_sample_rate = 1.0
+_validation_rng = random.Random()
+
+
+def enable_validation(enabled: bool = True, *, sample_rate: float = 1.0, seed: Optional[int] = None) -> bool:
+    """cross-check a sample_rate fraction of accelerated results against plain reduction, returns previous setting"""
+    global _validation_enabled, _validation_sample_rate
+    assert isinstance(enabled, bool)
+    assert 0.0 <= sample_rate <= 1.0
+    previous = _validation_enabled
+    _validation_enabled = enabled
+    _validation_sample_rate = sample_rate
+    if seed is not None:
+        _validation_rng.seed(seed)
+    return previous
+
+
+def church_value(t: Term) -> Optional[int]:
+    """k if t is a Church numeral λf.λx.f (... (f x)) (any bound names), else None"""
+    if (type(t) is not _Abstraction) or (type(t.term) is not _Abstraction) or t.eager or t.term.eager:
+        return None
+    f = t.variable.name
+    x = t.term.variable.name
+    if f == x:
+        return None
+    k = 0
+    node = t.term.term
+    while type(node) is _Composition:
+        if (type(node.left) is not _Variable) or (node.left.name != f):
+            return None
+        k = k + 1
+        node = node.right
+    if (type(node) is not _Variable) or (node.name != x):
+        return None
+    return k
+
+
+def church_bool(t: Term) -> Optional[bool]:
+    """True for λa.λb.a, False for λa.λb.b (any bound names, so also N(0)), else None"""
+    if (type(t) is not _Abstraction) or (type(t.term) is not _Abstraction) or (type(t.term.term) is not _Variable):
+        return None
+    if t.eager or t.term.eager:
+        return None
+    a = t.variable.name
+    b = t.term.variable.name
+    if a == b:
+        return None
+    name = t.term.term.name
+    if name == a:
+        return True
+    if name == b:
+        return False
+    return None
+
+
+def _read_back(value) -> Term:
+    if isinstance(value, bool):
+        return TRUE if value else FALSE
+    return N(value)
+
+
+@dataclass
+class AccelerationStats:
+    """work done by an accelerated reduction"""
+    steps: int = 0  # beta contractions
+    primitive_steps: int = 0  # primitive applications and TRUE/FALSE selections replaced by their value
+    eager_primitive_steps: int = 0  # ... of these made normalizing eager (Λ) arguments, not in primitive_steps
+    validations: int = 0  # replacements cross-checked against plain reduction
+
+
+class _AcceleratedContext(ReductionContext):
+    """reduction context normalizing eager arguments with the reducer, so primitives are accelerated there too"""
+
+    def __init__(self, reducer: "_AcceleratedReducer", *, tc: Optional[TransitiveCache] = None):
+        super().__init__(tc=tc)
+        self._reducer = reducer
+
+    def _nested_nf(self, t: Term, *, engine: str) -> Tuple[Term, int]:
+        return self._reducer.eager_nf(t)
+
+
+class _AcceleratedReducer:
+    """normal order reduction, preceded at each step by a bottom up primitive rewriting pass"""
+
+    def __init__(self, *, tc: Optional[TransitiveCache] = None):
+        self.tc = tc
+        self.ctx = _AcceleratedContext(self, tc=tc)  # name source and memo of eager argument normal forms
+        self.stats = AccelerationStats()
+        self._values: Dict[int, Tuple[Term, Optional[int]]] = dict()  # id -> (term, numeral value)
+        self._clean: Dict[int, Term] = dict()  # id -> term with nothing to rewrite
+
+    def _value(self, t: Term) -> Optional[int]:
+        try:
+            return self._values[id(t)][1]
+        except KeyError:
+            pass
+        res = church_value(t)
+        self._values[id(t)] = (t, res)
+        return res
+
+    def _check(self, redex: Term, res: Term, name: str, *, steps: Optional[int] = None) -> None:
+        """compare res to the normal form of redex (or to redex after steps beta steps)"""
+        if (not _validation_enabled) or (_validation_rng.random() >= _validation_sample_rate):
+            return
+        import lambda_debruijn
+
+        expected = redex.nf()[0] if steps is None else redex.r(n=steps)
+        if not lambda_debruijn.alpha_equivalent(expected, res):
+            raise ValueError(f"accelerated {name} disagrees with reduction: {redex} gave {res}, expected {expected}")
+        self.stats.validations = self.stats.validations + 1
+
+    def _rewrite_node(self, node: _Composition) -> Optional[Term]:
+        """replace a saturated primitive application or boolean selection, None if there is none"""
+        left = node.left
+        found = _primitives.get(left) if type(left) is _Abstraction else None
+        if (found is not None) and (found[1] == 1):
+            n = self._value(node.right)
+            if n is not None:
+                res = _read_back(found[2](n))
+                self._check(node, res, found[0])
+                return res
+            return None
+        if type(left) is not _Composition:
+            return None
+        head = left.left
+        if type(head) is not _Abstraction:
+            return None
+        found = _primitives.get(head)
+        if found is not None:
+            if found[1] != 2:
+                return None
+            m = self._value(left.right)
+            if m is None:
+                return None
+            n = self._value(node.right)
+            if n is None:
+                return None
+            res = _read_back(found[2](m, n))
+            self._check(node, res, found[0])
+            return res
+        selector = church_bool(head)
+        if selector is None:
+            return None
+        res = left.right if selector else node.right
+        self._check(node, res, "TRUE" if selector else "FALSE", steps=2)
+        return res
+
+    def rewrite(self, term: Term) -> Tuple[Term, int]:
+        """bottom up rewriting pass, returns new term and number of replacements"""
+        count = 0
+        values = []
+        stack = [(term, False)]
+        while len(stack) > 0:
+            node, ready = stack.pop()
+            if not ready:
+                if (type(node) is _Variable) or (id(node) in self._clean):
+                    values.append(node)
+                    continue
+                stack.append((node, True))
+                if type(node) is _Abstraction:
+                    stack.append((node.term, False))
+                else:
+                    stack.append((node.right, False))
+                    stack.append((node.left, False))
+                continue
+            if type(node) is _Abstraction:
+                body = values.pop()
+                res = node if body is node.term else _mk_abstraction(variable=node.variable, term=body, eager=node.eager)
+            else:
+                right = values.pop()
+                left = values.pop()
+                res = node if (left is node.left) and (right is node.right) else _mk_composition(left=left, right=right)
+                while type(res) is _Composition:
+                    replaced = self._rewrite_node(res)
+                    if replaced is None:
+                        break
+                    count = count + 1
+                    res = replaced
+            if res is node:
+                self._clean[id(node)] = node
+            values.append(res)
+        assert len(values) == 1
+        return values[0], count
+
+    def _step(self, term: Term) -> Tuple[Term, bool, int]:
+        """one rewriting pass then one normal order beta step, returns (term, beta step made, replacements)"""
+        if len(self._values) + len(self._clean) > _MEMO_LIMIT:
+            self._values.clear()
+            self._clean.clear()
+        new_name_source = self.ctx.new_name_source
+        new_name_source.names_to_avoid.update(term.names)
+        term, count = self.rewrite(term)
+        if count > 0:
+            new_name_source.names_to_avoid.update(term.names)
+        term, acted = _beta_step(term, new_name_source=new_name_source, tc=self.tc, ctx=self.ctx)
+        return term, acted, count
+
+    def step(self, term: Term) -> Tuple[Term, bool]:
+        """one rewriting pass then one normal order beta step"""
+        term, acted, count = self._step(term)
+        self.stats.primitive_steps = self.stats.primitive_steps + count
+        if acted:
+            self.stats.steps = self.stats.steps + 1
+        return term, acted or (count > 0)
+
+    def eager_nf(self, term: Term) -> Tuple[Term, int]:
+        """normal form of an eager argument and the steps it took, which (as in Term.nf()) stats does not count"""
+        cycles = _BrentCycleCheck(term)
+        passes = 0
+        steps = 0
+        while True:
+            term, acted, count = self._step(term)
+            if not (acted or (count > 0)):
+                return term, steps
+            self.stats.eager_primitive_steps = self.stats.eager_primitive_steps + count
+            steps = steps + acted + count
+            passes = passes + 1
+            cycles.check(term, passes)
+
+    def normalize(self, term: Term, *, max_steps: Optional[int] = None) -> Term:
+        """reduce to normal form, detecting cycles as Term.nf() does"""
+        assert isinstance(max_steps, int | None)
+        cycles = _BrentCycleCheck(term)
+        steps = 0
+        while True:
+            term, acted = self.step(term)
+            if not acted:
+                return term
+            steps = steps + 1
+            cycles.check(term, steps)
+            if (max_steps is not None) and (self.stats.steps + self.stats.primitive_steps > max_steps):
+                raise MaxStepsExceeded()
+
+
+def accelerated_nf(t: Term, *, max_steps: Optional[int] = None) -> Tuple[Term, AccelerationStats]:
+    """reduce to normal form with accelerated primitives, also returning step counts"""
+    assert isinstance(t, Term)
+    reducer = _AcceleratedReducer()
+    res = reducer.normalize(t, max_steps=max_steps)
+    return res, reducer.stats
+
+
+def term_nf(t: Term, *, max_steps: Optional[int] = None, tc: Optional[TransitiveCache] = None) -> Tuple[Term, int]:
+    """reduce to normal form with accelerated primitives, steps counts beta steps plus primitive replacements"""
+    assert isinstance(t, Term)
+    reducer = _AcceleratedReducer(tc=tc)
+    res = reducer.normalize(t, max_steps=max_steps)
+    return res, reducer.stats.steps + reducer.stats.primitive_steps
+
+
+def term_r(t: Term, *, n: int = 1, tc: Optional[TransitiveCache] = None) -> Term:
+    """run n step(s), each a primitive rewriting pass followed by a normal order beta step"""
+    assert isinstance(t, Term)
+    assert isinstance(n, int)
+    reducer = _AcceleratedReducer(tc=tc)
+    for i in range(n):
+        t, _ = reducer.step(t)
+    return t
@@ -0,0 +1,154 @@
+import os
+import signal
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+
+from lambda_calc import Term
+from TransitiveCache import TransitiveCache
+
+
+@dataclass
+class NormalizeResult:
+    """outcome of normalizing the index-th input term"""
+    index: int
+    result: Optional[Term]  # normal form, None on error
+    steps: Optional[int]
+    error: Optional[str]  # "timeout", "cycle", "max_steps exceeded", ... None on success
+    seconds: float
+
+
+class _Timeout(Exception):
+    pass
+
+
+def _raise_timeout(signum, frame):
+    raise _Timeout()
+
+
+def _alarm_blocked(method):
+    """wrap a cache method so the timeout alarm is held until it returns (then delivered),
+    a timeout raised part way through an update would leave the cache tables inconsistent"""
+    def wrapped(*args, **kwargs):
+        previous = signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM})
+        try:
+            return method(*args, **kwargs)
+        finally:
+            signal.pthread_sigmask(signal.SIG_SETMASK, previous)
+
+    return wrapped
+
+
+def _protect_from_alarm(tc) -> None:
+    """make the updating methods of a cache instance hold off the timeout alarm"""
+    if not hasattr(signal, "pthread_sigmask"):
+        return
+    for name in ("lookup_result", "store_absorbing", "store_transition", "flush", "refresh"):
+        method = getattr(tc, name, None)
+        if method is not None:
+            setattr(tc, name, _alarm_blocked(method))
+
+
+# per process cache state, set up by _init_worker()
+_worker_tc = None
+
+
+def _init_worker(worker_cache: bool, cache_path: Optional[str]) -> None:
+    global _worker_tc
+    if cache_path is not None:
+        from PersistentTransitiveCache import PersistentTransitiveCache
+
+        _worker_tc = PersistentTransitiveCache(cache_path)
+    elif worker_cache:
+        _worker_tc = TransitiveCache()
+    else:
+        _worker_tc = None
+    if _worker_tc is not None:
+        _protect_from_alarm(_worker_tc)
+
+
+def _normalize_one(index: int, t: Term, max_steps: Optional[int], engine: str, timeout: Optional[float]) -> NormalizeResult:
+    """run in a worker, terms travel as dumps_term() text (see Term.__reduce__)"""
+    # a timer signal interrupts the reduction, only possible on the main thread of a process
+    use_timer = (
+        (timeout is not None) and hasattr(signal, "setitimer") and (threading.current_thread() is threading.main_thread())
+    )
+    if (_worker_tc is not None) and hasattr(_worker_tc, "refresh"):
+        _worker_tc.refresh()  # pick up results other workers flushed since the last term
+    if use_timer:
+        previous = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    start = time.perf_counter()
+    try:
+        res, steps = t.nf(max_steps=max_steps, tc=_worker_tc, engine=engine)
+        outcome = NormalizeResult(index=index, result=res, steps=steps, error=None, seconds=0.0)
+    except _Timeout:
+        outcome = NormalizeResult(index=index, result=None, steps=None, error="timeout", seconds=0.0)
+    except (ValueError, RecursionError) as ex:
+        outcome = NormalizeResult(index=index, result=None, steps=None, error=str(ex) or type(ex).__name__, seconds=0.0)
+    finally:
+        if use_timer:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+    outcome.seconds = time.perf_counter() - start
+    if (_worker_tc is not None) and hasattr(_worker_tc, "flush"):
+        _worker_tc.flush()  # share results with the other workers
+    return outcome
+
+
+def normalize_many(
+    terms: Iterable[Term],
+    *,
+    max_steps: Optional[int] = None,
+    workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+    engine: str = "named",
+    worker_cache: bool = False,
+    cache_path: Optional[str] = None,
+) -> Iterator[NormalizeResult]:
+    """reduce many terms to normal form on a process pool, yielding results as they finish (not in input order).
+    timeout (seconds) bounds each term, worker_cache keeps a TransitiveCache in each worker,
+    cache_path shares a PersistentTransitiveCache file between workers.
+    workers=0 reduces in this process, workers=None uses one per CPU."""
+    assert isinstance(max_steps, int | None)
+    assert isinstance(workers, int | None)
+    assert isinstance(timeout, float | int | None)
+    assert isinstance(cache_path, str | None)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 0:
+        global _worker_tc
+        saved = _worker_tc
+        _init_worker(worker_cache, cache_path)
+        try:
+            for index, t in enumerate(terms):
+                assert isinstance(t, Term)
+                yield _normalize_one(index, t, max_steps, engine, timeout)
+        finally:
+            if hasattr(_worker_tc, "close"):
+                _worker_tc.close()
+            _worker_tc = saved
+        return
+    if cache_path is not None:
+        # create the file and schema once, workers opening a new file together can find it locked
+        from PersistentTransitiveCache import PersistentTransitiveCache
+
+        PersistentTransitiveCache(cache_path, preload=False).close()
+    max_pending = 4 * workers  # read terms as results drain, so inputs can be streamed too
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(worker_cache, cache_path)
+    ) as pool:
+        pending = set()
+        for index, t in enumerate(terms):
+            assert isinstance(t, Term)
+            pending.add(pool.submit(_normalize_one, index, t, max_steps, engine, timeout))
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while len(pending) > 0:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
@@ -1,51 +1,275 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from functools import total_ordering
+import hashlib
+import importlib
+import json
 import re
-from typing import FrozenSet, Iterable, List, Optional, Set, Tuple
+import time
+import weakref
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
 import string
 from abc import ABC, abstractmethod
 
 import inspect
-from pygments import highlight
-from pygments.lexers import PythonLexer
-from pygments.formatters import HtmlFormatter
-from IPython.display import display, HTML
 
-from TransitiveCache import TransitiveCache
+from TransitiveCache import TransitiveCache, estimated_size
 
 
 
-string_repr_map = dict()
-latex_repr_map = dict()
+class _AliasMap(dict):
+    """dict of rendering aliases counting its changes (generation), so cached renders can tell they are stale"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.generation = 0
+
+    def _changed(self):
+        self.generation = self.generation + 1
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._changed()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._changed()
+
+    def __ior__(self, other):
+        res = super().__ior__(other)
+        self._changed()
+        return res
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+    def pop(self, *args):
+        res = super().pop(*args)
+        self._changed()
+        return res
+
+    def popitem(self):
+        res = super().popitem()
+        self._changed()
+        return res
+
+    def setdefault(self, key, default=None):
+        res = super().setdefault(key, default)
+        self._changed()
+        return res
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._changed()
+
+
+string_repr_map = _AliasMap()
+latex_repr_map = _AliasMap()
+_numeral_reps = False  # show Church numerals as N(k), set by load_common_aliases(add_reps=True)
+_display_max_chars = 20000  # Jupyter rendering limit, see set_display_max_chars()
+
+
+def set_display_max_chars(max_chars: int | None) -> int | None:
+    """truncate Jupyter (_repr_latex_) renderings after about max_chars characters (None: no limit),
+    returns previous setting"""
+    global _display_max_chars
+    assert isinstance(max_chars, int | None)
+    previous = _display_max_chars
+    _display_max_chars = max_chars
+    return previous
+
+
+# hash-consing table: structural key -> the one live term with that structure
+_intern_table = weakref.WeakValueDictionary()
+_interning_enabled = False
+
+
+def enable_interning(enabled: bool = True) -> bool:
+    """turn hash-consing of newly built terms on or off, returns previous setting"""
+    global _interning_enabled
+    assert isinstance(enabled, bool)
+    previous = _interning_enabled
+    _interning_enabled = enabled
+    return previous
+
+
+def interned_term_count() -> int:
+    """number of live terms in the interning table"""
+    return len(_intern_table)
+
+
+# stable 64 bit structural hashes (str hash is salted per process, these are not).
+# _hash_val is computed as terms are built and includes variable names; the alpha
+# invariant half of fingerprint() is computed on first use. For that each term keeps a
+# hash of its shape with variables blanked out (_struct) and, for each free name, a
+# hash of the positions it occurs at (_positions). An abstraction folds the positions
+# of its bound variable into its shape, so bound names never enter that hash.
+_FP_MASK = (1 << 64) - 1
+_FP_VAR = 0x5EED0001
+_FP_HERE = 0x5EED0002
+_FP_LAM = 0x5EED0003
+_FP_EAGER_LAM = 0x5EED0004
+_FP_UNUSED = 0x5EED0005
+_FP_BODY = 0x5EED0006
+_FP_APP = 0x5EED0007
+_FP_LEFT = 0x5EED0008
+_FP_RIGHT = 0x5EED0009
+_FP_BOTH = 0x5EED000A
+_NO_POSITIONS = dict()  # shared by closed terms, never modified
+_name_fingerprints = dict()
+
+
+def _fp_mix(a: int, b: int) -> int:
+    """order dependent, non-linear combination of two 64 bit values"""
+    h = (((a * 0x9E3779B97F4A7C15) ^ b) * 0xBF58476D1CE4E5B9) & _FP_MASK
+    return h ^ (h >> 31)
+
+
+def _fp_name(name: str) -> int:
+    """hash of a variable name that does not change between runs"""
+    try:
+        return _name_fingerprints[name]
+    except KeyError:
+        pass
+    res = int.from_bytes(hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest(), "little")
+    _name_fingerprints[name] = res
+    return res
+
+
+def _alpha_fingerprint(t) -> int:
+    """64 bit hash equal for terms that differ only in bound variable names, cached on the terms"""
+    if t._positions is not None:
+        return t._alpha_val
+    stack = [(t, False)]
+    while len(stack) > 0:
+        node, ready = stack.pop()
+        if node._positions is not None:
+            continue
+        node_type = type(node)
+        if node_type is _Variable:
+            struct = _FP_VAR
+            positions = {node.name: _FP_HERE}
+        elif not ready:
+            stack.append((node, True))
+            if node_type is _Abstraction:
+                stack.append((node.term, False))
+            else:
+                stack.append((node.right, False))
+                stack.append((node.left, False))
+            continue
+        elif node_type is _Abstraction:
+            name = node.variable.name
+            body_positions = node.term._positions
+            positions = _NO_POSITIONS
+            if len(node.free_names) > 0:
+                positions = {k: _fp_mix(_FP_BODY, pos) for k, pos in body_positions.items() if k != name}
+            struct = _fp_mix(
+                node.term._struct ^ (_FP_EAGER_LAM if node.eager else _FP_LAM),
+                body_positions.get(name, _FP_UNUSED),
+            )
+        else:
+            l_positions = node.left._positions
+            r_positions = node.right._positions
+            positions = _NO_POSITIONS
+            if len(node.free_names) > 0:
+                positions = dict()
+                for k, pos in l_positions.items():
+                    r_pos = r_positions.get(k)
+                    if r_pos is None:
+                        positions[k] = _fp_mix(_FP_LEFT, pos)
+                    else:
+                        positions[k] = _fp_mix(pos ^ _FP_BOTH, r_pos)
+                for k, pos in r_positions.items():
+                    if k not in l_positions:
+                        positions[k] = _fp_mix(_FP_RIGHT, pos)
+            struct = _fp_mix(node.left._struct ^ _FP_APP, node.right._struct)
+        # order independent sum over free names, position values are already mixed
+        total = sum([_fp_name(k) * pos for k, pos in positions.items()])
+        object.__setattr__(node, "_struct", struct)
+        object.__setattr__(node, "_positions", positions)
+        object.__setattr__(node, "_alpha_val", _fp_mix(struct, total & _FP_MASK))
+    return t._alpha_val
 
 
 def _mk_abstraction(*, variable, term, eager: bool):
     assert isinstance(variable, _Variable)
     assert isinstance(term, Term)
+    interning = _interning_enabled
+    if interning:
+        key = ("λ", variable, term, eager)
+        found = _intern_table.get(key)
+        if found is not None:
+            return found
     names = frozenset(variable.names.union(term.names))
     free_names = frozenset(term.free_names - variable.names)
-    return _Abstraction(
+    res = _Abstraction(
         variable=variable,
         term=term,
         names=names,
         free_names=free_names,
-        _hash_val=hash(variable) + 3 * hash(term) + 5 * hash(tuple(sorted(names))) + 7 * hash(tuple(sorted(free_names))),
+        _hash_val=_fp_mix(variable._hash_val ^ (_FP_EAGER_LAM if eager else _FP_LAM), term._hash_val),
         eager=eager,
+        _interned=interning,
     )
+    if interning:
+        _intern_table[key] = res
+    return res
 
 
 def _mk_composition(*, left, right):
     assert isinstance(left, Term)
     assert isinstance(right, Term)
+    interning = _interning_enabled
+    if interning:
+        key = ("|", left, right)
+        found = _intern_table.get(key)
+        if found is not None:
+            return found
     names = frozenset(left.names.union(right.names))
     free_names = frozenset(left.free_names.union(right.free_names))
-    return _Composition(
+    res = _Composition(
         left=left,
         right=right,
         names=names,
         free_names=free_names,
-        _hash_val=hash(left) + 3 * hash(right) + 5 * hash(tuple(sorted(names))) + 7 * hash(tuple(sorted(free_names))),
+        _hash_val=_fp_mix(left._hash_val ^ _FP_APP, right._hash_val),
+        _interned=interning,
     )
+    if interning:
+        _intern_table[key] = res
+    return res
+
+
+class MaxStepsExceeded(ValueError):
+    """reduction stopped at max_steps, profile holds (step, term size) pairs taken at doubling intervals"""
+
+    def __init__(self, profile: Iterable[Tuple[int, int]] = ()):
+        self.profile = list(profile)
+        message = "max_steps exceeded"
+        if len(self.profile) > 0:
+            message = message + ", term size by step: " + ", ".join([f"{step}: {size}" for step, size in self.profile])
+        super().__init__(message)
+
+
+def _size_and_depth(t) -> Tuple[int, int]:
+    """number of nodes and nesting depth of a term (shared sub-terms counted each time they occur)"""
+    memo = dict()  # id -> (size, depth)
+    stack = [(t, False)]
+    while len(stack) > 0:
+        node, ready = stack.pop()
+        if id(node) in memo:
+            continue
+        if type(node) is _Variable:
+            memo[id(node)] = (1, 1)
+            continue
+        children = (node.term,) if type(node) is _Abstraction else (node.left, node.right)
+        if not ready:
+            stack.append((node, True))
+            stack.extend([(c, False) for c in children])
+            continue
+        sizes = [memo[id(c)] for c in children]
+        memo[id(node)] = (1 + sum([size for size, _ in sizes]), 1 + max([depth for _, depth in sizes]))
+    return memo[id(t)]
 
 
 @total_ordering
@@ -54,6 +278,13 @@ class Term(ABC):
     """Represent a term in a lambda calculus expression"""
     names: FrozenSet[str]
     free_names: FrozenSet[str]
+    _interned: bool = field(default=False, compare=False, repr=False)
+    # alpha invariant hash and its parts, filled in by _alpha_fingerprint()
+    _alpha_val: int = field(default=0, compare=False, repr=False)
+    _struct: int = field(default=0, compare=False, repr=False)
+    _positions: dict = field(default=None, compare=False, repr=False)
+    # rendered ropes and text by kind, filled in by _rope() and _render()
+    _renders: dict = field(default=None, compare=False, repr=False)
 
     @abstractmethod
     def _capture_avoiding_substitution(
@@ -63,47 +294,91 @@ class Term(ABC):
 
     @abstractmethod
     def _normal_order_beta_reduction(
-        self, *, new_name_source: "NewNameSource", tc: TransitiveCache | None
+        self, *, new_name_source: "NewNameSource", tc: TransitiveCache | None, ctx: "ReductionContext | None" = None
     ) -> Tuple["Term", bool]:
-        """internal method for reduction step, needs list of all names to avoid"""
+        """internal method for reduction step, needs list of all names to avoid (ctx normalizes eager arguments)"""
 
-    def r(self, *, n : int = 1, tc : TransitiveCache | None = None) -> "Term":
+    def r(self, *, n : int = 1, tc : TransitiveCache | None = None, engine: str = "named") -> "Term":
         """run n beta reduction step(s) in normal order (top left FIRST)"""
         assert isinstance(n, int)
+        if engine not in ("named", "recursive"):
+            return _engine_module(engine).term_r(self, n=n, tc=tc)
+        red = self
         for i in range(n):
-            red, _ = self._normal_order_beta_reduction(
-                new_name_source=NewNameSource(self.names),
-                tc=tc,
-            )
+            ctx = ReductionContext(red.names, tc=tc)
+            if engine == "recursive":
+                red, _ = red._normal_order_beta_reduction(new_name_source=ctx.new_name_source, tc=tc, ctx=ctx)
+            else:
+                red, _ = _beta_step(red, new_name_source=ctx.new_name_source, tc=tc, ctx=ctx)
         return red
 
-    def nf(self, *, max_steps : int | None = None, tc : TransitiveCache | None = None) -> Tuple["Term", int]:
-        """reduce to normal form"""
+    def nf(
+        self,
+        *,
+        max_steps : int | None = None,
+        tc : TransitiveCache | None = None,
+        engine: str = "named",
+        tracer=None,
+        context: "ReductionContext | None" = None,
+    ) -> Tuple["Term", int]:
+        """reduce to normal form, engine selects the reduction implementation
+        ("named": explicit stack, "recursive": original recursive methods, others see _engine_modules),
+        tracer (a lambda_trace.ReductionTracer, "named" engine only) records each step,
+        context (a ReductionContext, made if not given) is shared with the normalization of eager
+        arguments, max_steps counts their steps too"""
         assert isinstance(max_steps, int | None)
-        steps = 0
-        new_name_source = NewNameSource(self.names)
-        seen = set()
-        e = self
-        while True:
-            if e in seen:
-                raise ValueError("cycle")
-            seen.add(e)
-            e, acted = e._normal_order_beta_reduction(new_name_source=new_name_source, tc=tc)
-            if not acted:
-                return e, steps
-            steps = steps + 1
-            if (max_steps is not None) and (steps > max_steps):
-                raise ValueError("max_steps exceeded")
+        if (tracer is not None) and (engine != "named"):
+            raise ValueError("tracing needs the named engine")
+        if engine not in ("named", "recursive"):
+            if context is not None:
+                raise ValueError("a reduction context needs the named or recursive engine")
+            return _engine_module(engine).term_nf(self, max_steps=max_steps, tc=tc)
+        if context is None:
+            context = ReductionContext(self.names, tc=tc)
+        else:
+            assert isinstance(context, ReductionContext)
+            if tc is not None:
+                context.tc = tc
+            context.new_name_source.names_to_avoid.update(self.names)
+        context._step_limit = None if max_steps is None else context.steps + max_steps
+        return _normalize(self, context, engine=engine, tracer=tracer)
+
+    def fingerprint(self) -> int:
+        """stable 128 bit structural hash: high 64 bits are equal for terms that differ only in
+        bound variable names (see alpha_fingerprint()), low 64 bits are hash(self)"""
+        return (_alpha_fingerprint(self) << 64) | self._hash_val
+
+    def alpha_fingerprint(self) -> int:
+        """stable 64 bit hash, equal for terms that differ only in bound variable names"""
+        return _alpha_fingerprint(self)
+
+    def whnf(self, *, max_steps : int | None = None) -> Tuple["Term", int]:
+        """reduce to weak head normal form (no redex at the head, bodies and arguments left alone)"""
+        return _engine_module("machine").term_whnf(self, max_steps=max_steps)
+
+    def compile(self):
+        """compile to Python closures for fast repeated application, see lambda_compile.CompiledTerm"""
+        from lambda_compile import CompiledTerm
+
+        return CompiledTerm(self)
 
     @abstractmethod
     def to_latex(
-        self, *, not_expanded: Set | None = None, top_level: bool = False
+        self, *, not_expanded: Set | None = None, top_level: bool = False, max_chars: int | None = None
     ) -> str:
-        """convert to to_latex, no substitutions for not_expanded set"""
+        """convert to to_latex, no substitutions for not_expanded set, max_chars truncates"""
+
+    def to_str(self, *, max_chars: int | None = None) -> str:
+        """str(), truncated after about max_chars characters"""
+        return _term_str(self, max_chars=max_chars)
+
+    def __reduce__(self):
+        """pickle as the dumps_term() text (compact, and no recursion on deep terms)"""
+        return (loads_term, (dumps_term(self),))
 
     def _repr_latex_(self):
         """trigger pretty printing path in Jupyter"""
-        return "$$" + self.to_latex(top_level=True) + "$$"
+        return "$$" + self.to_latex(top_level=True, max_chars=_display_max_chars) + "$$"
 
     def __or__(self, other) -> "Term":
         """concatenate/compose"""
@@ -130,14 +405,32 @@ class Term(ABC):
         pass
 
 
+# alternate reduction engines, each module supplies term_nf() and term_r()
+_engine_modules = {
+    "accel": "lambda_accel",
+    "debruijn": "lambda_debruijn",
+    "graph": "lambda_graph",
+    "machine": "lambda_machine",
+}
+
+
+def _engine_module(engine: str):
+    """import the module implementing a non-default reduction engine"""
+    try:
+        module_name = _engine_modules[engine]
+    except KeyError:
+        raise ValueError(f"unknown reduction engine {engine!r}")
+    return importlib.import_module(module_name)
+
+
 def _eq_helper(a, b) -> bool:
     """See if equality can be resolved by type or hash, return None if same type and hash"""
-    if id(a) == id(b):
+    if a is b:
         return True
-    t_a = str(type(a))
-    t_b = str(type(b))
-    if t_a != t_b:
+    if type(a) is not type(b):
         return False
+    if a._interned and b._interned:
+        return False  # distinct canonical representatives
     h_a = hash(a)
     h_b = hash(b)
     if h_a != h_b:
@@ -221,6 +514,7 @@ def vr(*args) -> Term:
 class _Variable(Term):
     """represent a variable"""
 
+    _hash_val: int
     name: str
 
     def _capture_avoiding_substitution(
@@ -235,7 +529,7 @@ class _Variable(Term):
         return self
 
     def _normal_order_beta_reduction(
-        self, *, new_name_source: "NewNameSource", tc: TransitiveCache | None
+        self, *, new_name_source: "NewNameSource", tc: TransitiveCache | None, ctx: "ReductionContext | None" = None
     ) -> Tuple["Term", bool]:
         return self, False
 
@@ -254,9 +548,7 @@ class _Variable(Term):
         return self.name < other.name
 
     def __hash__(self):
-        return hash(
-            "_Variable" + self.name
-        )  # hash NULLed on derived classes that re-define __eq__()
+        return self._hash_val  # hash NULLed on derived classes that re-define __eq__()
 
     def __str__(self) -> str:
         return self.name
@@ -267,10 +559,13 @@ class _Variable(Term):
         return f"'{self.name}'"
 
     def to_latex(
-        self, *, not_expanded: Set | None = None, top_level: bool = False
+        self, *, not_expanded: Set | None = None, top_level: bool = False, max_chars: int | None = None
     ) -> str:
         return self.name.replace('_', '\\_')
 
+    def to_str(self, *, max_chars: int | None = None) -> str:
+        return self.name
+
 
 def _mk_var(name: str) -> _Variable:
     assert isinstance(name, str)
@@ -279,7 +574,22 @@ def _mk_var(name: str) -> _Variable:
     assert not name.isdecimal()
     assert not any(char in string.whitespace for char in name)
     assert not any(char in "'\"().[];|+-*/%\\λΛε \n" for char in name)
-    return _Variable(name=name, names=frozenset([name]), free_names=frozenset([name]))
+    interning = _interning_enabled
+    if interning:
+        key = ("v", name)
+        found = _intern_table.get(key)
+        if found is not None:
+            return found
+    res = _Variable(
+        name=name,
+        names=frozenset([name]),
+        free_names=frozenset([name]),
+        _hash_val=_fp_mix(_FP_VAR, _fp_name(name)),
+        _interned=interning,
+    )
+    if interning:
+        _intern_table[key] = res
+    return res
 
 
 class NewNameSource:
@@ -312,6 +622,60 @@ class NewNameSource:
             self.next_index = self.next_index + 1
 
 
+class ReductionContext:
+    """state shared by a normalization and the nested normalizations of its eager (Λ) arguments:
+    one name source, one cache (tc plus a memo of argument normal forms) and one step budget.
+    Pass the same context to several Term.nf() calls to share the memo between them."""
+
+    def __init__(self, nms: Iterable[str] | None = None, *, tc: TransitiveCache | None = None):
+        self.new_name_source = NewNameSource(nms)
+        self.tc = tc
+        self.steps = 0  # all steps, nested normalizations included
+        self.eager_args = 0  # eager arguments normalized
+        self.eager_memo_hits = 0  # ... of these already normalized in this context
+        self.eager_already_normal = 0  # ... of these normal as given
+        self.nested_steps = 0  # steps spent normalizing eager arguments
+        self.max_depth = 0  # deepest nesting of eager argument normalizations
+        self._depth = 0
+        self._step_limit = None  # value of steps not to exceed, set by Term.nf()
+        self._eager_memo: Dict[Term, Term] = dict()  # eager argument -> normal form (normal forms map to themselves)
+
+    def _eager_nf(self, t: Term, *, engine: str) -> Term:
+        """normal form of an eager argument"""
+        self.eager_args = self.eager_args + 1
+        res = self._eager_memo.get(t)
+        if res is not None:
+            self.eager_memo_hits = self.eager_memo_hits + 1
+            return res
+        self._depth = self._depth + 1
+        self.max_depth = max(self.max_depth, self._depth)
+        try:
+            res, steps = self._nested_nf(t, engine=engine)
+        finally:
+            self._depth = self._depth - 1
+        if steps == 0:
+            self.eager_already_normal = self.eager_already_normal + 1
+        self.nested_steps = self.nested_steps + steps
+        self._eager_memo[t] = res
+        self._eager_memo[res] = res
+        return res
+
+    def _nested_nf(self, t: Term, *, engine: str) -> Tuple[Term, int]:
+        """normalize an eager argument not in the memo, returning (normal form, steps)"""
+        return _normalize(t, self, engine=engine, tracer=None)
+
+    def stats(self) -> Dict[str, int]:
+        """counters, eager_memo_hits and eager_already_normal count nested work avoided"""
+        return {
+            "steps": self.steps,
+            "nested_steps": self.nested_steps,
+            "eager_args": self.eager_args,
+            "eager_memo_hits": self.eager_memo_hits,
+            "eager_already_normal": self.eager_already_normal,
+            "max_depth": self.max_depth,
+        }
+
+
 @total_ordering
 @dataclass(frozen=True, kw_only=True)
 class _Abstraction(Term):
@@ -358,17 +722,20 @@ class _Abstraction(Term):
         )
     
     def _normal_order_beta_reduction(
-        self, *, new_name_source: "NewNameSource", tc: TransitiveCache | None
+        self, *, new_name_source: "NewNameSource", tc: TransitiveCache | None, ctx: "ReductionContext | None" = None
     ) -> Tuple["Term", bool]:
         # try cached
         if (tc is not None) and (self in tc):
             res = tc.lookup_result(self)
             assert res is not None
+            if res is not self:
+                new_name_source.names_to_avoid.update(res.names)
             return res, res!=self
         # needed for SUCC | N(0) == N(1)
         sub, acted = self.term._normal_order_beta_reduction(
             new_name_source=new_name_source,
-            tc=tc
+            tc=tc,
+            ctx=ctx,
         )
         if not acted:
             if tc is not None:
@@ -381,25 +748,10 @@ class _Abstraction(Term):
         return result, True
 
     def __eq__(self, other) -> bool:
-        e_v = _eq_helper(self, other)
-        if e_v is not None:
-            return e_v
-        # now know same type
-        if self.variable != other.variable:
-            return False
-        if self.eager != other.eager:
-            return False
-        return self.term == other.term
+        return _term_eq(self, other)
 
     def __lt__(self, other) -> bool:
-        l_v = _lt_helper(self, other)
-        if l_v is not None:
-            return l_v
-        if self.variable != other.variable:
-            return self.variable < other.variable
-        if self.eager != other.eager:
-            return self.eager < other.eager
-        return self.term < other.term
+        return _term_lt(self, other)
 
     def __hash__(self):
         return self._hash_val  # hash NULLed on derived classes that re-define __eq__()
@@ -418,51 +770,15 @@ class _Abstraction(Term):
                 return None
             
     def __str__(self) -> str:
-        try:
-            return string_repr_map[self]
-        except KeyError:
-            pass
-        values = self._get_value_seq()
-        if values is not None:
-            return "[" + ", ".join([str(vi) for vi in values]) + "]"
-        symbol = "λ"
-        if self.eager:
-            symbol = "Λ"
-        if self.variable.name == "":
-            return "(" + symbol + " " + str(self.term) + ")"
-        return "(" + symbol + str(self.variable) + " . " + str(self.term) + ")"
+        return _term_str(self)
     
     def __repr__(self, *, need_v: bool = True) -> str:
-        symbol = "λ"
-        if self.eager:
-            symbol = "Λ"
-        if self.variable.name == "":
-            return f"{symbol}({self.term.__repr__(need_v=False)})"
-        return f"{symbol}[{self.variable.__repr__(need_v=False)}]({self.term.__repr__(need_v=False)})"
+        return _term_repr(self, need_v=need_v)
 
     def to_latex(
-        self, *, not_expanded: Set | None = None, top_level: bool = False
+        self, *, not_expanded: Set | None = None, top_level: bool = False, max_chars: int | None = None
     ) -> str:
-        if (not_expanded is None) or (self not in not_expanded):
-            try:
-                return latex_repr_map[self]
-            except KeyError:
-                pass
-            values = self._get_value_seq()
-            if values is not None:
-                return "[_{" + self.variable.to_latex() + "}" + ", ".join([vi.to_latex(not_expanded=not_expanded, top_level=False) for vi in values]) + "]"
-        s1 = self.variable.to_latex(not_expanded=not_expanded, top_level=False)
-        s2 = self.term.to_latex(not_expanded=not_expanded, top_level=False)
-        symbol = "\\lambda"
-        if self.eager:
-            symbol = "\\Lambda"
-        if self.variable.name == "":
-            res = f"{symbol} \\; {s2}"
-        else:
-            res = f"{symbol} \\; {s1} \\;.\\; {s2}"
-        if not top_level:
-            res = "( " + res + " )"
-        return res
+        return _term_latex(self, not_expanded=not_expanded, top_level=top_level, max_chars=max_chars)
 
 
 @dataclass(frozen=True)
@@ -559,19 +875,24 @@ class _Composition(Term):
         return _mk_composition(left=left, right=right)
 
     def _normal_order_beta_reduction(
-        self, *, new_name_source: "NewNameSource", tc: TransitiveCache | None
+        self, *, new_name_source: "NewNameSource", tc: TransitiveCache | None, ctx: "ReductionContext | None" = None
     ) -> Tuple["Term", bool]:
         # try cached
         if (tc is not None) and (self in tc):
             res = tc.lookup_result(self)
             assert res is not None
+            if res is not self:
+                new_name_source.names_to_avoid.update(res.names)
             return res, res!=self
         # first try top most application
         if isinstance(self.left, _Abstraction):
             assert self.left.variable.name != ""
             right = self.right
             if self.left.eager:
-                right = right.nf(tc=tc)[0]
+                if ctx is None:
+                    right = right.nf(tc=tc, engine="recursive")[0]
+                else:
+                    right = ctx._eager_nf(right, engine="recursive")
             res = self.left.term._capture_avoiding_substitution(
                 var=self.left.variable, t=right, new_name_source=new_name_source
             )
@@ -582,7 +903,8 @@ class _Composition(Term):
         # now try left to right application
         left, left_triggered = self.left._normal_order_beta_reduction(
             new_name_source=new_name_source,
-            tc=tc
+            tc=tc,
+            ctx=ctx,
         )
         if left_triggered:
             # don't apply to right, already have a transform on left
@@ -590,7 +912,8 @@ class _Composition(Term):
         else:
             right, right_triggered = self.right._normal_order_beta_reduction(
                 new_name_source=new_name_source,
-                tc=tc
+                tc=tc,
+                ctx=ctx,
             )
         if not (left_triggered or right_triggered):
             if tc is not None:
@@ -603,59 +926,598 @@ class _Composition(Term):
         return res, True
 
     def __eq__(self, other) -> bool:
-        e_v = _eq_helper(self, other)
-        if e_v is not None:
-            return e_v
-        # now know same type
-        if self.left != other.left:
-            return False
-        return self.right == other.right
+        return _term_eq(self, other)
 
     def __lt__(self, other) -> bool:
-        l_v = _lt_helper(self, other)
-        if l_v is not None:
-            return l_v
-        # now know same type
-        if self.left != other.left:
-            return self.left < other.left
-        return self.right < other.right
+        return _term_lt(self, other)
 
     def __hash__(self):
         return self._hash_val  # hash NULLed on derived classes that re-define __eq__()
 
     def __str__(self) -> str:
-        try:
-            return string_repr_map[self]
-        except KeyError:
-            pass
-        r_str = str(self.right)
-        if isinstance(self.right, _Composition):
-            r_str = "(" + r_str + ")"
-        return str(self.left) + " " + r_str
+        return _term_str(self)
 
     def __repr__(self, *, need_v: bool = True) -> str:
-        l_str = self.left.__repr__(need_v=False)
-        r_str = self.right.__repr__(need_v=False)
-        if isinstance(self.left, _Composition):
-            l_str = "(" + l_str + ")"
-        if isinstance(self.right, _Composition):
-            r_str = "(" + r_str + ")"
-        if need_v:
-            return f"v({l_str}, {r_str})"
-        return f"{l_str}, {r_str}"
+        return _term_repr(self, need_v=need_v)
 
     def to_latex(
-        self, *, not_expanded: Set | None = None, top_level: bool = False
+        self, *, not_expanded: Set | None = None, top_level: bool = False, max_chars: int | None = None
     ) -> str:
-        if (not_expanded is None) or (self not in not_expanded):
-            try:
-                return latex_repr_map[self]
-            except KeyError:
-                pass
-        r_str = self.right.to_latex(not_expanded=not_expanded)
-        if isinstance(self.right, _Composition):
-            r_str = "(" + r_str + ")"
-        return self.left.to_latex(not_expanded=not_expanded) + " \\; " + r_str
+        return _term_latex(self, not_expanded=not_expanded, top_level=top_level, max_chars=max_chars)
+
+
+# explicit stack versions of the recursive algorithms, so deep terms do not
+# hit the Python recursion limit (type() tests, as isinstance() on ABC subclasses is slow)
+
+
+def _term_eq(a, b) -> bool:
+    """structural equality"""
+    stack = [(a, b)]
+    while len(stack) > 0:
+        a, b = stack.pop()
+        e_v = _eq_helper(a, b)
+        if e_v is not None:
+            if not e_v:
+                return False
+            continue
+        # now know same type
+        if type(a) is _Variable:
+            if a.name != b.name:
+                return False
+        elif type(a) is _Abstraction:
+            if a.eager != b.eager:
+                return False
+            stack.append((a.term, b.term))
+            stack.append((a.variable, b.variable))
+        else:
+            stack.append((a.right, b.right))
+            stack.append((a.left, b.left))
+    return True
+
+
+def _term_lt(a, b) -> bool:
+    """order by type, then hash, then structure (first differing position in left to right order)"""
+    stack = [(a, b)]
+    while len(stack) > 0:
+        a, b = stack.pop()
+        if a is b:
+            continue
+        t_a = type(a)
+        t_b = type(b)
+        if t_a is not t_b:
+            return str(t_a) < str(t_b)
+        h_a = hash(a)
+        h_b = hash(b)
+        if h_a != h_b:
+            return h_a < h_b
+        # now know same type
+        if type(a) is _Variable:
+            if a.name != b.name:
+                return a.name < b.name
+        elif type(a) is _Abstraction:
+            if a.variable != b.variable:
+                return a.variable < b.variable
+            if a.eager != b.eager:
+                return a.eager < b.eager
+            stack.append((a.term, b.term))
+        else:
+            stack.append((a.right, b.right))
+            stack.append((a.left, b.left))
+    return False
+
+
+def _term_alpha_eq(a, b) -> bool:
+    """equality up to renaming of bound variables"""
+    # ctx: linked list (name in a, name in b, rest) of binders entered, innermost first
+    stack = [(a, b, None)]
+    while len(stack) > 0:
+        a, b, ctx = stack.pop()
+        if (a is b) and (ctx is None):
+            continue
+        t_a = type(a)
+        if t_a is not type(b):
+            return False
+        if t_a is _Variable:
+            name_a = a.name
+            name_b = b.name
+            c = ctx
+            while c is not None:
+                bound_a = c[0] == name_a
+                bound_b = c[1] == name_b
+                if bound_a or bound_b:
+                    if not (bound_a and bound_b):
+                        return False
+                    break
+                c = c[2]
+            if (c is None) and (name_a != name_b):
+                return False
+        elif t_a is _Abstraction:
+            if a.eager != b.eager:
+                return False
+            stack.append((a.term, b.term, (a.variable.name, b.variable.name, ctx)))
+        else:
+            stack.append((a.right, b.right, ctx))
+            stack.append((a.left, b.left, ctx))
+    return True
+
+
+class _AlphaKey:
+    """hashable wrapper making terms equal when they differ only in bound variable names"""
+    __slots__ = ("term", "_hash")
+
+    def __init__(self, term: Term):
+        self.term = term
+        self._hash = _alpha_fingerprint(term)
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, _AlphaKey):
+            return False
+        return (self._hash == other._hash) and _term_alpha_eq(self.term, other.term)
+
+
+class AlphaTransitiveCache(TransitiveCache):
+    """TransitiveCache of terms treating alpha equivalent terms as the same entry,
+    results come back with the bound names of whichever term was stored"""
+
+    def __init__(self, *, max_size : int = 1000000, max_bytes : int | None = None, size_fn=None):
+        term_size_fn = estimated_size if size_fn is None else size_fn
+        super().__init__(max_size=max_size, max_bytes=max_bytes, size_fn=lambda key: term_size_fn(key.term))
+        self._measure = (max_bytes is not None) or (size_fn is not None)
+
+    def lookup_result(self, start):
+        assert start is not None
+        if type(start) is _AlphaKey:  # called from TransitiveCache on stored keys
+            return super().lookup_result(start)
+        res = super().lookup_result(_AlphaKey(start))
+        if (res.term is not start) and _term_alpha_eq(res.term, start):
+            return start  # same class as the query, keep the caller's names
+        return res.term
+
+    def store_absorbing(self, item) -> None:
+        super().store_absorbing(_AlphaKey(item))
+
+    def store_transition(self, start, end) -> None:
+        start = _AlphaKey(start)
+        end = _AlphaKey(end)
+        if start == end:
+            return  # step to an alpha variant of itself
+        super().store_transition(start, end)
+
+    def __contains__(self, item):
+        assert item is not None
+        return super().__contains__(_AlphaKey(item))
+
+
+def _numeral_value(t: Term) -> Optional[int]:
+    """k if t is N(k) (binders named f and x, as N() builds them), else None"""
+    if (type(t) is not _Abstraction) or t.eager or (t.variable.name != "f"):
+        return None
+    body = t.term
+    if (type(body) is not _Abstraction) or body.eager or (body.variable.name != "x"):
+        return None
+    k = 0
+    node = body.term
+    while type(node) is _Composition:
+        if (type(node.left) is not _Variable) or (node.left.name != "f"):
+            return None
+        k = k + 1
+        node = node.right
+    if (type(node) is not _Variable) or (node.name != "x"):
+        return None
+    return k
+
+
+# Rendering (str, repr, to_latex) builds a rope per node: a tuple of strings and the
+# ropes of sub-terms. Terms are frozen, so ropes are kept on the nodes (_renders) and
+# terms sharing sub-terms, such as successive reduction states, only render new nodes.
+# Ropes record the alias maps they were built against (_render_key()).
+_render_generation = 0  # bumped when aliases are defined, the alias maps also count their own changes
+_ellipsis = {"str": " ...", "repr": " ...", "latex": " \\ldots"}
+
+
+def _render_key() -> tuple:
+    return (_render_generation, string_repr_map.generation, latex_repr_map.generation, _numeral_reps)
+
+
+def _render_parts(node: Term, kind: str, top: bool, not_expanded) -> List:
+    """one node's rendering as strings and sub-terms, top only differs for repr (need_v) and latex (top_level)"""
+    node_type = type(node)
+    if node_type is _Variable:
+        if kind == "str":
+            return [node.name]
+        if kind == "latex":
+            return [node.name.replace("_", "\\_")]
+        return [node.__repr__(need_v=top)]
+    if kind == "repr":
+        if node_type is _Abstraction:
+            symbol = "Λ" if node.eager else "λ"
+            if node.variable.name == "":
+                return [symbol + "(", node.term, ")"]
+            return [f"{symbol}['{node.variable.name}'](", node.term, ")"]
+        parts = ["v("] if top else []
+        for i, sub in enumerate((node.left, node.right)):
+            if i > 0:
+                parts.append(", ")
+            if type(sub) is _Composition:
+                parts.extend(["(", sub, ")"])
+            else:
+                parts.append(sub)
+        if top:
+            parts.append(")")
+        return parts
+    latex = kind == "latex"
+    if (not_expanded is None) or (node not in not_expanded):
+        alias = (latex_repr_map if latex else string_repr_map).get(node)
+        if alias is not None:
+            return [alias]
+        if node_type is _Abstraction:
+            if _numeral_reps:
+                k = _numeral_value(node)
+                if k is not None:
+                    return ["\\mathbf{" + str(k) + "}" if latex else f"N({k})"]
+            values = node._get_value_seq()
+            if values is not None:
+                parts = ["[_{" + node.variable.to_latex() + "}" if latex else "["]
+                for i, vi in enumerate(values):
+                    if i > 0:
+                        parts.append(", ")
+                    parts.append(vi)
+                parts.append("]")
+                return parts
+    if node_type is _Abstraction:
+        if latex:
+            symbol = "\\Lambda" if node.eager else "\\lambda"
+            if node.variable.name == "":
+                core = (symbol + " \\; ", node.term)
+            else:
+                core = (f"{symbol} \\; {node.variable.to_latex()} \\;.\\; ", node.term)
+            return list(core) if top else ["( ", *core, " )"]
+        symbol = "Λ" if node.eager else "λ"
+        if node.variable.name == "":
+            return ["(" + symbol + " ", node.term, ")"]
+        return ["(" + symbol + node.variable.name + " . ", node.term, ")"]
+    separator = " \\; " if latex else " "
+    if type(node.right) is _Composition:
+        return [node.left, separator + "(", node.right, ")"]
+    return [node.left, separator, node.right]
+
+
+def _rope(t: Term, kind: str, not_expanded) -> tuple:
+    """rope for a non top level rendering of t, memoized on the nodes (or per call if not_expanded is given)"""
+    key = _render_key()
+    local = None if not_expanded is None else dict()  # id -> rope
+
+    def lookup(node):
+        if type(node) is _Variable:
+            return _render_parts(node, kind, False, not_expanded)[0]
+        if local is not None:
+            return local.get(id(node))
+        if node._renders is not None:
+            found = node._renders.get(kind)
+            if (found is not None) and (found[0] == key):
+                return found[1]
+        return None
+
+    res = lookup(t)
+    if res is not None:
+        return res
+    stack = [(t, None)]
+    while len(stack) > 0:
+        node, parts = stack.pop()
+        if parts is None:
+            if lookup(node) is not None:
+                continue
+            parts = _render_parts(node, kind, False, not_expanded)
+            stack.append((node, parts))
+            for part in parts:
+                if not isinstance(part, str):
+                    stack.append((part, None))
+            continue
+        rope = tuple([part if isinstance(part, str) else lookup(part) for part in parts])
+        if local is not None:
+            local[id(node)] = rope
+        else:
+            if node._renders is None:
+                object.__setattr__(node, "_renders", dict())
+            node._renders[kind] = (key, rope)
+    return lookup(t)
+
+
+def _render(t: Term, kind: str, *, top: bool = True, not_expanded=None, max_chars: int | None = None) -> str:
+    """text of t, with max_chars stop after about that many characters (whole pieces, then an ellipsis)"""
+    assert isinstance(max_chars, int | None)
+    if (max_chars is None) and (not_expanded is None) and (type(t) is not _Variable):
+        cache_kind = kind + ("_top" if top else "_text")
+        if t._renders is not None:
+            found = t._renders.get(cache_kind)
+            if (found is not None) and (found[0] == _render_key()):
+                return found[1]
+    parts = _render_parts(t, kind, top, not_expanded)
+    out = []
+    n_chars = 0
+    # pending pieces: strings, terms and ropes, next last
+    stack = list(reversed(parts))
+    while len(stack) > 0:
+        item = stack.pop()
+        if isinstance(item, str):
+            out.append(item)
+            n_chars = n_chars + len(item)
+            if (max_chars is not None) and (n_chars >= max_chars) and (len(stack) > 0):
+                out.append(_ellipsis[kind])
+                break
+        elif isinstance(item, tuple):
+            stack.extend(reversed(item))
+        elif max_chars is None:
+            stack.append(_rope(item, kind, not_expanded))
+        else:
+            # truncated: expand top down, only the displayed part of the term is visited
+            found = None
+            if (not_expanded is None) and (item._renders is not None):
+                found = item._renders.get(kind)
+            if (found is not None) and (found[0] == _render_key()):
+                stack.append(found[1])
+            else:
+                stack.extend(reversed(_render_parts(item, kind, False, not_expanded)))
+    text = "".join(out)
+    if (max_chars is None) and (not_expanded is None) and (type(t) is not _Variable):
+        if t._renders is None:
+            object.__setattr__(t, "_renders", dict())
+        t._renders[cache_kind] = (_render_key(), text)
+    return text
+
+
+def _term_str(t: Term, *, max_chars: int | None = None) -> str:
+    """text rendering (string_repr_map aliases replace sub-terms)"""
+    return _render(t, "str", max_chars=max_chars)
+
+
+def _term_repr(t: Term, *, need_v: bool = True) -> str:
+    """Python source rendering, parse_l() inverts this"""
+    return _render(t, "repr", top=need_v)
+
+
+def _term_latex(t: Term, *, not_expanded: Set | None = None, top_level: bool = False, max_chars: int | None = None) -> str:
+    """LaTeX rendering (latex_repr_map aliases replace sub-terms not in not_expanded)"""
+    return _render(t, "latex", top=top_level, not_expanded=not_expanded, max_chars=max_chars)
+
+
+def _substitute(term: Term, *, var: _Variable, t: Term, new_name_source: NewNameSource) -> Term:
+    """capture avoiding substitution var replaced with t, same results (and fresh names) as Term._capture_avoiding_substitution()"""
+    values = []
+    # tasks: ("sub", term, var, t), ("renamed", abstraction, new_var, var, t), ("abs", variable, eager), ("comp",)
+    tasks = [("sub", term, var, t)]
+    while len(tasks) > 0:
+        task = tasks.pop()
+        kind = task[0]
+        if kind == "sub":
+            _, node, var, t = task
+            if var == t:
+                values.append(node)  # no op
+            elif type(node) is _Variable:
+                values.append(t if var.name == node.name else node)
+            elif type(node) is _Abstraction:
+                if (var.name == node.variable.name) or (var.name not in node.term.names):
+                    values.append(node)  # variable isn't free or symbol not present
+                elif node.variable.name in t.free_names:  # freshness condition violation
+                    new_var = _mk_var(name=new_name_source.new_name())  # establish freshness
+                    tasks.append(("renamed", node, new_var, var, t))
+                    tasks.append(("sub", node.term, node.variable, new_var))
+                else:
+                    tasks.append(("abs", node.variable, node.eager))
+                    tasks.append(("sub", node.term, var, t))
+            else:
+                if var.name not in node.names:
+                    values.append(node)  # symbol not present
+                else:
+                    tasks.append(("comp",))
+                    tasks.append(("sub", node.right, var, t))
+                    tasks.append(("sub", node.left, var, t))
+        elif kind == "renamed":
+            _, node, new_var, var, t = task
+            tasks.append(("abs", new_var, node.eager))
+            tasks.append(("sub", values.pop(), var, t))
+        elif kind == "abs":
+            _, variable, eager = task
+            values.append(_mk_abstraction(variable=variable, term=values.pop(), eager=eager))
+        else:
+            right = values.pop()
+            left = values.pop()
+            values.append(_mk_composition(left=left, right=right))
+    assert len(values) == 1
+    return values[0]
+
+
+def _beta_step(
+    term: Term,
+    *,
+    new_name_source: NewNameSource,
+    tc: TransitiveCache | None,
+    tracer=None,
+    ctx: "ReductionContext | None" = None,
+) -> Tuple[Term, bool]:
+    """one normal order beta reduction, same results as Term._normal_order_beta_reduction()
+    (tracer, a lambda_trace.ReductionTracer, is told about each redex contracted,
+    ctx normalizes eager arguments)"""
+    result = None  # (term, acted) of the most recently finished node
+    # frames: (node, phase, reduced left of a composition)
+    stack = [(term, 0, None)]
+    while len(stack) > 0:
+        node, phase, left = stack.pop()
+        if phase == 0:
+            if type(node) is _Variable:
+                result = (node, False)
+                continue
+            # try cached
+            if (tc is not None) and (node in tc):
+                res = tc.lookup_result(node)
+                assert res is not None
+                if res is not node:  # cached results may bring in names (alpha variants) the source has not seen
+                    new_name_source.names_to_avoid.update(res.names)
+                result = (res, res != node)
+                continue
+            if type(node) is _Abstraction:
+                stack.append((node, 1, None))
+                stack.append((node.term, 0, None))
+                continue
+            # first try top most application
+            if type(node.left) is _Abstraction:
+                assert node.left.variable.name != ""
+                if tracer is not None:
+                    t0 = time.perf_counter()
+                right = node.right
+                if node.left.eager:
+                    right = right.nf(tc=tc)[0] if ctx is None else ctx._eager_nf(right, engine="named")
+                if tracer is not None:
+                    t1 = time.perf_counter()
+                res = _substitute(
+                    node.left.term, var=node.left.variable, t=right, new_name_source=new_name_source
+                )
+                if tracer is not None:
+                    tracer._on_redex(node, t1 - t0, time.perf_counter() - t1, res != node)
+                if res != node:
+                    if tc is not None:
+                        tc.store_transition(node, res)
+                    result = (res, True)
+                    continue
+            # now try left to right application
+            stack.append((node, 1, None))
+            stack.append((node.left, 0, None))
+            continue
+        sub, acted = result
+        if type(node) is _Abstraction:
+            if not acted:
+                if tc is not None:
+                    tc.store_absorbing(node)
+                result = (node, False)
+                continue
+            res = _mk_abstraction(variable=node.variable, term=sub, eager=node.eager)
+        elif phase == 1:
+            if not acted:
+                stack.append((node, 2, sub))
+                stack.append((node.right, 0, None))
+                continue
+            # don't apply to right, already have a transform on left
+            res = _mk_composition(left=sub, right=node.right)
+        else:
+            if not acted:
+                if tc is not None:
+                    tc.store_absorbing(node)
+                result = (node, False)
+                continue
+            res = _mk_composition(left=left, right=sub)
+        assert res != node
+        if tc is not None:
+            tc.store_transition(node, res)
+        result = (res, True)
+    return result
+
+
+class _BrentCycleCheck:
+    """Brent's cycle finding: each term is compared to one saved at steps 1, 2, 4, 8, ...,
+    so memory does not grow with the number of steps"""
+
+    def __init__(self, start):
+        self.saved = start
+        self.checkpoint = 1
+
+    def check(self, key, steps: int) -> bool:
+        """raise ValueError on a repeat of the saved key, True if key (after steps steps) is saved as the next one"""
+        if key == self.saved:
+            raise ValueError("cycle")
+        if steps != self.checkpoint:
+            return False
+        self.saved = key
+        self.checkpoint = 2 * self.checkpoint
+        return True
+
+
+def _normalize(t: Term, ctx: ReductionContext, *, engine: str, tracer=None) -> Tuple[Term, int]:
+    """reduce to normal form with the "named" or "recursive" engine, returning the steps at this level"""
+    tc = ctx.tc
+    new_name_source = ctx.new_name_source
+    steps = 0
+    # with an alpha aware cache the alpha fingerprints are computed anyway, so cycles
+    # through renamed terms are also caught
+    alpha = isinstance(tc, AlphaTransitiveCache)
+    cycles = _BrentCycleCheck(_AlphaKey(t) if alpha else t)
+    profile = []  # (step, term size) at the checkpoints
+    e = t
+    while True:
+        if engine == "recursive":
+            e, acted = e._normal_order_beta_reduction(new_name_source=new_name_source, tc=tc, ctx=ctx)
+        elif tracer is None:
+            e, acted = _beta_step(e, new_name_source=new_name_source, tc=tc, ctx=ctx)
+        else:
+            e, acted = tracer._step(e, new_name_source=new_name_source, tc=tc, ctx=ctx)
+        if not acted:
+            return e, steps
+        steps = steps + 1
+        ctx.steps = ctx.steps + 1
+        if cycles.check(_AlphaKey(e) if alpha else e, steps):
+            profile.append((steps, _size_and_depth(e)[0]))
+        if (ctx._step_limit is not None) and (ctx.steps > ctx._step_limit):
+            if profile[-1][0] != steps:
+                profile.append((steps, _size_and_depth(e)[0]))
+            raise MaxStepsExceeded(profile)
+
+
+def dumps_term(t: Term) -> str:
+    """compact text form: JSON list in postfix order, strings are variables,
+    0 composes the two previous entries, 1 (λ) and 2 (Λ) bind variable then body"""
+    ops = []
+    stack = [t]
+    while len(stack) > 0:
+        item = stack.pop()
+        if isinstance(item, int):
+            ops.append(item)
+        elif type(item) is _Variable:
+            ops.append(item.name)
+        elif type(item) is _Abstraction:
+            stack.append(2 if item.eager else 1)
+            stack.append(item.term)
+            stack.append(item.variable)
+        else:
+            stack.append(0)
+            stack.append(item.right)
+            stack.append(item.left)
+    return json.dumps(ops, ensure_ascii=False, separators=(",", ":"))
+
+
+def loads_term(src: str, *, memo: dict | None = None) -> Term:
+    """inverse of dumps_term(), a memo dict shared between calls builds each distinct sub-term once"""
+    assert isinstance(src, str)
+    if memo is None:
+        memo = dict()
+    values = []
+    for op in json.loads(src):
+        if isinstance(op, str):
+            key = op
+        elif op == 0:
+            right = values.pop()
+            left = values.pop()
+            key = (0, id(left), id(right))
+        elif op in (1, 2):
+            term = values.pop()
+            variable = values.pop()
+            key = (op, id(variable), id(term))
+        else:
+            raise ValueError(f"bad term op {op!r}")
+        res = memo.get(key)
+        if res is None:
+            if isinstance(op, str):
+                res = _mk_var(op)
+            elif op == 0:
+                res = _mk_composition(left=left, right=right)
+            else:
+                res = _mk_abstraction(variable=variable, term=term, eager=op == 2)
+            memo[key] = res  # memo keeps res alive, so the ids in keys stay valid
+        values.append(res)
+    if len(values) != 1:
+        raise ValueError("malformed term text")
+    return values[0]
 
 
 # https://en.wikipedia.org/wiki/Church_encoding#Church_numerals
@@ -667,6 +1529,11 @@ def N(k: int) -> Term:
 
 def pretty_print_function(func):
     """format a function from reference"""
+    from pygments import highlight  # notebook only, kept out of import time
+    from pygments.lexers import PythonLexer
+    from pygments.formatters import HtmlFormatter
+    from IPython.display import display, HTML
+
     source_code = inspect.getsource(func)
     highlighted_code = highlight(source_code, PythonLexer(), HtmlFormatter())
     display(
@@ -772,9 +1639,11 @@ text_aliases = dict()
 
 
 def def_text_symbol(t: Term, s: str, *, add_reps: bool):
+    global _render_generation
     assert isinstance(t, Term)
     assert isinstance(s, str)
     if add_reps:
+        _render_generation = _render_generation + 1
         latex_repr_map[t] = "\\textbf{" + s + "}"
         string_repr_map[t] = s
     else:
@@ -784,10 +1653,12 @@ def def_text_symbol(t: Term, s: str, *, add_reps: bool):
 
 
 def def_math_symbol(t: Term, s: str, m: str, *, add_reps: bool):
+    global _render_generation
     assert isinstance(t, Term)
     assert isinstance(s, str)
     assert isinstance(m, str)
     if add_reps:
+        _render_generation = _render_generation + 1
         latex_repr_map[t] = "\\mathbf{" + m + "}"
         string_repr_map[t] = s
     else:
@@ -797,6 +1668,7 @@ def def_math_symbol(t: Term, s: str, m: str, *, add_reps: bool):
 
 
 def load_common_aliases(add_reps: bool = True):
+    global _numeral_reps
     def_math_symbol(PLUS, "PLUS", "+", add_reps=add_reps)
     def_math_symbol(SUB, "SUB", "-", add_reps=add_reps)
     def_math_symbol(MULT, "MULT", "\\times", add_reps=add_reps)
@@ -831,33 +1703,263 @@ def load_common_aliases(add_reps: bool = True):
     def_text_symbol(MOD, "MOD", add_reps=add_reps)
     def_text_symbol(GCD, "GCD", add_reps=add_reps)
     if add_reps:
-        for ii in range(1000):
-            def_math_symbol(N(ii), f"N({ii})", f"{ii}", add_reps=True)
+        _numeral_reps = True  # recognized by structure in rendering, see _numeral_value()
 
 
+# the parse table is filled at import (a few dictionary entries, the terms already exist)
 load_common_aliases(add_reps=False)
 
 
-def parse_l(src: str) -> Term:
-    """Parse a lambda calculus expression from string (warning: uses Python eval)"""
-    assert isinstance(src, str)
-    restricted_globals = {
-        "__builtins__": {
-            "λ": λ,
-            "Λ": Λ,
-            "v": v,
-            "vr": vr,
-            "N": N,
-        },
-    }  # Disable built-in functions and supply some definitions
-    for key, val in text_aliases.items():
-        restricted_globals[key] = val
-    restricted_locals = {}
-    res = eval(src, restricted_globals, restricted_locals)
-    assert isinstance(res, Term)
+# tokens of the Python (repr()) syntax: string, number, name, punctuation
+_python_token_re = re.compile(
+    r"""\s*(?:('[^'\\\n]*'|"[^"\\\n]*")|(\d+)|([^\W\d]\w*)|([()\[\],|]))"""
+)
+# tokens of the λx.M N syntax: binder, number or name, punctuation
+_lambda_token_re = re.compile(r"""\s*(?:([λΛ\\])|([^\s'"().\[\];|+\-*/%\\λΛε]+)|([().]))""")
+
+
+def _parse_error(src: str, pos: int, what: str) -> ValueError:
+    return ValueError(f"parse_l(): {what} at position {pos}: {src[pos:pos + 20]!r}")
+
+
+_term_types = frozenset([_Variable, _Abstraction, _Composition])
+
+
+def _fold(items: List, right: bool) -> Term:
+    """compose parsed items, as _v() (left associative) or _vr() (right associative)"""
+    if len(items) == 0:
+        raise ValueError("empty value list")
+    if right:
+        res = items[-1]
+        for item in reversed(items[:-1]):
+            res = _mk_composition(left=item, right=res)
+    else:
+        res = items[0]
+        for item in items[1:]:
+            res = _mk_composition(left=res, right=item)
     return res
 
 
+def _parse_python(src: str) -> Term:
+    """parse the repr() form, a small subset of Python: strings, N(k), v(...), vr(...),
+    λ[...](...), Λ[...](...), text_aliases names, tuples, calls and |"""
+    builtins = {"λ": λ, "Λ": Λ, "v": v, "vr": vr, "N": N}
+    aliases = text_aliases
+    names = dict()  # name or quoted string -> value, resolved once per parse
+    numerals = dict()  # k -> N(k)
+    # frames: [kind, closer, head, right associative, items, pending | operand, current operand, saw comma]
+    #   kind "group" (tuple or parenthesized expression), "call" (head applied), "index" (λ[...])
+    frames = [["top", None, None, False, [], None, None, False]]
+    pos = 0
+    n = len(src)
+    while True:
+        m = _python_token_re.match(src, pos)
+        if m is None:
+            if src[pos:].strip() != "":
+                raise _parse_error(src, pos, "unexpected text")
+            tok_start = n
+            punct = None
+        else:
+            tok_start = m.start(m.lastindex)
+            pos = m.end()
+            punct = m.group(4)
+        frame = frames[-1]
+        if (m is not None) and (punct is None):
+            if frame[6] is not None:
+                raise _parse_error(src, tok_start, "missing operator")
+            if m.group(1) is not None:
+                text = m.group(1)
+                try:
+                    frame[6] = names[text]
+                except KeyError:
+                    val = _mk_var(name=text[1:-1].strip())
+                    names[text] = val
+                    frame[6] = val
+            elif m.group(2) is not None:
+                frame[6] = int(m.group(2))
+            else:
+                name = m.group(3)
+                try:
+                    frame[6] = names[name]
+                except KeyError:
+                    val = builtins.get(name)
+                    if val is None:
+                        val = aliases.get(name)
+                    if val is None:
+                        raise _parse_error(src, tok_start, f"unknown name {name!r}")
+                    names[name] = val
+                    frame[6] = val
+            continue
+        if (punct == "(") or (punct == "["):
+            head = frame[6]
+            frame[6] = None
+            right = frame[3]
+            if head is None:
+                # a list is always a sequence, mark it as if it had a comma
+                frames.append(["group", ")" if punct == "(" else "]", None, right, [], None, None, punct == "["])
+            elif punct == "(":
+                if isinstance(head, int) or isinstance(head, _AbstractionFactoryFactory):
+                    raise _parse_error(src, tok_start, "value is not callable")
+                frames.append(["call", ")", head, head is vr, [], None, None, False])
+            else:
+                if not isinstance(head, _AbstractionFactoryFactory):
+                    raise _parse_error(src, tok_start, "only λ and Λ take [names]")
+                frames.append(["index", "]", head, False, [], None, None, False])
+            continue
+        # operand finished: |, comma, closer or end
+        current = frame[6]
+        if punct == "|":
+            if not type(current) in _term_types:
+                raise _parse_error(src, tok_start, "| needs terms")
+            frame[5] = current if frame[5] is None else _mk_composition(left=frame[5], right=current)
+            frame[6] = None
+            continue
+        if current is not None:
+            if frame[5] is not None:
+                if not type(current) in _term_types:
+                    raise _parse_error(src, tok_start, "| needs terms")
+                current = _mk_composition(left=frame[5], right=current)
+            frame[4].append(current)
+        elif frame[5] is not None:
+            raise _parse_error(src, tok_start, "missing operand")
+        elif punct == ",":
+            raise _parse_error(src, tok_start, "missing value")
+        frame[5] = None
+        frame[6] = None
+        if punct == ",":
+            if frame[0] == "top":
+                raise _parse_error(src, tok_start, "unexpected ,")
+            frame[7] = True
+            continue
+        if punct != frame[1]:
+            raise _parse_error(src, tok_start, "unbalanced brackets" if m is not None else "unexpected end")
+        frames.pop()
+        kind, _, head, right, items, _, _, saw_comma = frame
+        if kind == "top":
+            if len(items) != 1 or type(items[0]) not in _term_types:
+                raise ValueError("parse_l(): expression is not a term")
+            return items[0]
+        if (head is not N) and not all(type(item) in _term_types for item in items):
+            raise _parse_error(src, tok_start, "expected terms")
+        if kind == "group":
+            if (len(items) == 1) and (not saw_comma):
+                val = items[0]  # parenthesized expression
+            else:
+                val = _fold(items, right)
+        elif kind == "index":
+            if (len(items) == 0) or not all(type(item) is _Variable for item in items):
+                raise _parse_error(src, tok_start, "expected variable names")
+            val = head[items[0] if len(items) == 1 else tuple(items)]
+        elif head is N:
+            if (len(items) != 1) or (not isinstance(items[0], int)):
+                raise _parse_error(src, tok_start, "N() takes one number")
+            try:
+                val = numerals[items[0]]
+            except KeyError:
+                val = N(items[0])
+                numerals[items[0]] = val
+        elif (head is v) or (head is vr):
+            val = _fold(items, right)
+        elif isinstance(head, _AbstractionFactory):
+            val = _fold(items, False)
+            for var in reversed(head.vars_seen):
+                val = _mk_abstraction(variable=var, term=val, eager=head.eager)
+        else:
+            val = _mk_composition(left=head, right=_fold(items, False))
+        frames[-1][6] = val
+
+
+def _parse_lambda(src: str) -> Term:
+    """parse conventional syntax: λx y.M (or \\x y.M, Λ for eager), application by juxtaposition,
+    parentheses, numbers as Church numerals, free text_aliases names as their terms"""
+    aliases = text_aliases
+    bound = dict()  # name -> number of enclosing binders using it
+    # frames: [kind, application so far, binder variables, eager]
+    #   kind "top", "paren" or "lam" (closed along with the enclosing paren or top)
+    frames = [["top", None, None, False]]
+    pos = 0
+    n = len(src)
+    while True:
+        m = _lambda_token_re.match(src, pos)
+        if m is None:
+            if src[pos:].strip() != "":
+                raise _parse_error(src, pos, "unexpected text")
+            tok_start = n
+            punct = None
+        else:
+            tok_start = m.start(m.lastindex)
+            pos = m.end()
+            punct = m.group(3)
+        frame = frames[-1]
+        val = None
+        if m is not None and m.group(1) is not None:
+            variables = []
+            while True:
+                m = _lambda_token_re.match(src, pos)
+                if (m is None) or (m.group(2) is None):
+                    break
+                if m.group(2).isdecimal():
+                    raise _parse_error(src, pos, "number as binder name")
+                pos = m.end()
+                variables.append(_mk_var(name=m.group(2)))
+            if (m is None) or (m.group(3) != ".") or (len(variables) == 0):
+                raise _parse_error(src, pos, "expected binder names then .")
+            pos = m.end()
+            for var in variables:
+                bound[var.name] = bound.get(var.name, 0) + 1
+            frames.append(["lam", None, variables, src[tok_start] == "Λ"])
+            continue
+        if m is not None and m.group(2) is not None:
+            name = m.group(2)
+            if name in bound:
+                val = _mk_var(name=name)
+            elif name.isdecimal():
+                val = N(int(name))
+            else:
+                val = aliases.get(name)
+                if val is None:
+                    val = _mk_var(name=name)
+        elif punct == "(":
+            frames.append(["paren", None, None, False])
+            continue
+        elif punct == ".":
+            raise _parse_error(src, tok_start, "unexpected .")
+        else:
+            # ")" or end: close binders, then the paren (or top) frame
+            while frames[-1][0] == "lam":
+                _, body, variables, eager = frames.pop()
+                if body is None:
+                    raise _parse_error(src, tok_start, "empty body")
+                for var in reversed(variables):
+                    body = _mk_abstraction(variable=var, term=body, eager=eager)
+                    bound[var.name] = bound[var.name] - 1
+                    if bound[var.name] == 0:
+                        del bound[var.name]
+                frame = frames[-1]
+                frame[1] = body if frame[1] is None else _mk_composition(left=frame[1], right=body)
+            kind, val, _, _ = frames.pop()
+            if kind != ("paren" if punct == ")" else "top"):
+                raise _parse_error(src, tok_start, "unbalanced parentheses")
+            if val is None:
+                raise _parse_error(src, tok_start, "empty expression")
+            if kind == "top":
+                return val
+            frame = frames[-1]
+        frame[1] = val if frame[1] is None else _mk_composition(left=frame[1], right=val)
+
+
+def parse_l(src: str, *, syntax: str = "python") -> Term:
+    """Parse a lambda calculus expression from string (no eval).
+    syntax "python": the repr() form, e.g. v(λ['x']('x'), N(2)) (text_aliases names allowed),
+    syntax "lambda": conventional form, e.g. (λx y. x y) 2 (\\ also accepted for λ)"""
+    assert isinstance(src, str)
+    if syntax == "python":
+        return _parse_python(src)
+    if syntax == "lambda":
+        return _parse_lambda(src)
+    raise ValueError(f"unknown syntax {syntax!r}")
+
+
 def ifthenelse(condition, then, otherwise):
     """alias for IFTHENELSE | (condition) | (then) | (otherwise)"""
     return IFTHENELSE | condition | then | otherwise
@@ -0,0 +1,373 @@
+from typing import Callable, Dict, List, Optional, Tuple
+
+from lambda_calc import FALSE, TRUE, Term
+from lambda_debruijn import _APP, _FREE, _LAM, _VAR, _app, _lam, _var, from_debruijn, to_debruijn
+
+
+# Normalization by evaluation: a term is compiled once into Python closures over
+# environments, applying it runs Python calls instead of substitution, and results are
+# read back into terms by applying functions to neutral variables.
+#   value: _Fun (a compiled abstraction and its environment) or _Neutral (a variable
+#       applied to arguments, appears when reading back under binders or for free names)
+#   environment: None or (thunk, rest of environment), de Bruijn index 0 first
+# Arguments are passed as memoized thunks (call by need), eager (Λ) binders force their
+# argument to weak head normal form first. There is no step limit or cycle detection:
+# terms without a normal form run until RecursionError, use Term.nf() for those.
+# Compiling and reading back use explicit stacks, so deep terms such as N(3000) are fine,
+# but evaluation nests Python calls as deep as the chain of thunks one force waits on
+# (PLUS | N(3000) | N(3000) waits on a chain of 3000 successors). Past the recursion limit
+# CompiledTerm raises RecursionError saying so, pass ints (native numerals) to avoid these chains.
+
+
+class _Thunk:
+    """a delayed value, evaluated at most once"""
+    __slots__ = ("ev", "env", "value")
+
+    def __init__(self, ev: Optional[Callable], env):
+        self.ev = ev
+        self.env = env
+        self.value = None
+
+    def force(self):
+        ev = self.ev
+        if ev is not None:
+            self.value = ev(self.env)
+            self.ev = None
+            self.env = None
+        return self.value
+
+
+def _ready(value) -> _Thunk:
+    t = _Thunk(None, None)
+    t.value = value
+    return t
+
+
+class _Fun:
+    """abstraction value: body evaluates against (argument thunk, env)"""
+    __slots__ = ("body", "env", "eager", "hint")
+
+    def __init__(self, body: Callable, env, eager: bool, hint: Optional[str]):
+        self.body = body
+        self.env = env
+        self.eager = eager
+        self.hint = hint
+
+
+class _Neutral:
+    """head applied to argument thunks, head is a binder level (int), free name (str) or marker"""
+    __slots__ = ("head", "args")
+
+    def __init__(self, head, args: tuple):
+        self.head = head
+        self.args = args
+
+
+def _apply(f, arg: _Thunk):
+    if type(f) is _Fun:
+        if f.eager:
+            arg.force()
+        return f.body((arg, f.env))
+    if type(f) is _Neutral:
+        return _Neutral(f.head, f.args + (arg,))
+    raise ValueError(f"cannot apply {type(f).__name__}")
+
+
+def _apply_ev(env):
+    """evaluator for a delayed application, env is (function thunk, argument thunk)"""
+    return _apply(env[0].force(), env[1])
+
+
+def _lookup_fn(i: int) -> Callable:
+    """thunk bound to de Bruijn index i"""
+    if i == 0:
+        return lambda env: env[0]
+    if i == 1:
+        return lambda env: env[1][0]
+    if i == 2:
+        return lambda env: env[1][1][0]
+
+    def lookup(env):
+        for _ in range(i):
+            env = env[1]
+        return env[0]
+
+    return lookup
+
+
+class _Compiler:
+    """de Bruijn node -> (ev(env) -> value, th(env) -> thunk), shared nodes compiled once"""
+
+    def __init__(self):
+        self._memo: Dict[int, Tuple[tuple, Callable, Callable]] = dict()  # id -> (node, ev, th)
+
+    def compile(self, node: tuple) -> Tuple[Callable, Callable]:
+        # children are compiled before their parents from an explicit stack, terms can be deeper than the recursion limit
+        memo = self._memo
+        stack = [node]
+        while len(stack) > 0:
+            current = stack[-1]
+            if id(current) in memo:
+                stack.pop()
+                continue
+            missing = [c for c in _children(current) if id(c) not in memo]
+            if len(missing) > 0:
+                stack.extend(missing)
+                continue
+            ev, th = self._build(current)
+            memo[id(current)] = (current, ev, th)
+            stack.pop()
+        _, ev, th = memo[id(node)]
+        return ev, th
+
+    def _build(self, node: tuple) -> Tuple[Callable, Callable]:
+        """compile one node, its children already compiled"""
+        tag = node[0]
+        if tag == _VAR:
+            lookup = _lookup_fn(node[1])
+            ev, th = (lambda env: lookup(env).force()), lookup
+        elif tag == _FREE:
+            thunk = _ready(_Neutral(node[1], ()))
+            ev, th = (lambda env: thunk.value), (lambda env: thunk)
+        elif tag == _LAM:
+            body = self._memo[id(node[1])][1]
+            eager, hint = node[2], node[3]
+            if node[-1] == 0:  # no loose indices, one value serves every environment
+                thunk = _ready(_Fun(body, None, eager, hint))
+                ev, th = (lambda env: thunk.value), (lambda env: thunk)
+            else:
+                ev = lambda env: _Fun(body, env, eager, hint)
+                th = lambda env: _ready(_Fun(body, env, eager, hint))
+        else:
+            # application spine: head and arguments, first argument first
+            head, args = _spine(node)
+            head_ev = self._memo[id(head)][1]
+            arg_ths = tuple(self._memo[id(a)][2] for a in args)
+            if len(arg_ths) == 1:
+                arg_th = arg_ths[0]
+                ev = lambda env: _apply(head_ev(env), arg_th(env))
+            else:
+                def ev(env):
+                    f = head_ev(env)
+                    for arg_th in arg_ths:
+                        f = _apply(f, arg_th(env))
+                    return f
+            if node[-1] == 0:  # closed, evaluated at most once and shared
+                thunk = _Thunk(ev, None)
+                ev, th = (lambda env: thunk.force()), (lambda env: thunk)
+            else:
+                th = lambda env: _Thunk(ev, env)
+        return ev, th
+
+
+def _spine(node: tuple) -> Tuple[tuple, List[tuple]]:
+    """head and arguments (first argument first) of an application"""
+    args: List[tuple] = []
+    head = node
+    while head[0] == _APP:
+        args.append(head[2])
+        head = head[1]
+    args.reverse()
+    return head, args
+
+
+def _children(node: tuple) -> List[tuple]:
+    """nodes _Compiler compiles separately for node"""
+    tag = node[0]
+    if tag == _LAM:
+        return [node[1]]
+    if tag == _APP:
+        head, args = _spine(node)
+        return [head] + args
+    return []
+
+
+def _quote(value) -> tuple:
+    """read a value back as a de Bruijn term in normal form"""
+    results: List[tuple] = []
+    # tasks: ("eval", value, depth), ("lam", eager, hint), ("app", n_args)
+    tasks = [("eval", value, 0)]
+    while len(tasks) > 0:
+        task = tasks.pop()
+        kind = task[0]
+        if kind == "eval":
+            _, value, depth = task
+            if type(value) is _Fun:
+                tasks.append(("lam", value.eager, value.hint))
+                body = value.body((_ready(_Neutral(depth, ())), value.env))
+                tasks.append(("eval", body, depth + 1))
+                continue
+            if type(value) is not _Neutral:
+                raise ValueError(f"cannot read back {type(value).__name__}")
+            head = value.head
+            if type(head) is int:
+                results.append(_var(depth - 1 - head))
+            elif type(head) is str:
+                results.append((_FREE, head, 0))
+            else:
+                raise ValueError("cannot read back a marker")
+            if len(value.args) > 0:
+                tasks.append(("app", len(value.args)))
+                for arg in reversed(value.args):
+                    tasks.append(("eval", arg.force(), depth))
+        elif kind == "lam":
+            _, eager, hint = task
+            results.append(_lam(results.pop(), eager, hint))
+        else:
+            n_args = task[1]
+            args = results[len(results) - n_args:]
+            del results[len(results) - n_args:]
+            res = results.pop()
+            for arg in args:
+                res = _app(res, arg)
+            results.append(res)
+    assert len(results) == 1
+    return results[0]
+
+
+def read_back(value) -> Term:
+    """normal form of a compiled value (as returned by CompiledTerm calls) as a Term"""
+    if isinstance(value, CompiledTerm):
+        value = value.value()
+    return from_debruijn(_quote(value))
+
+
+# heads for reading numerals and booleans back without building terms
+_F_MARK = object()
+_X_MARK = object()
+_TRUE_MARK = object()
+_FALSE_MARK = object()
+
+
+def to_int(value) -> int:
+    """k for a value equal to the Church numeral N(k)"""
+    if isinstance(value, CompiledTerm):
+        value = value.value()
+    try:
+        res = _apply(_apply(value, _ready(_Neutral(_F_MARK, ()))), _ready(_Neutral(_X_MARK, ())))
+    except ValueError:
+        raise ValueError("not a Church numeral")
+    k = 0
+    while type(res) is _Neutral:
+        if (res.head is _X_MARK) and (len(res.args) == 0):
+            return k
+        if (res.head is not _F_MARK) or (len(res.args) != 1):
+            break
+        k = k + 1
+        res = res.args[0].force()
+    raise ValueError("not a Church numeral")
+
+
+def to_bool(value) -> bool:
+    """True for a value equal to TRUE, False for FALSE"""
+    if isinstance(value, CompiledTerm):
+        value = value.value()
+    try:
+        res = _apply(_apply(value, _ready(_Neutral(_TRUE_MARK, ()))), _ready(_Neutral(_FALSE_MARK, ())))
+    except ValueError:
+        raise ValueError("not a Church boolean")
+    if (type(res) is _Neutral) and (len(res.args) == 0):
+        if res.head is _TRUE_MARK:
+            return True
+        if res.head is _FALSE_MARK:
+            return False
+    raise ValueError("not a Church boolean")
+
+
+def _numeral_f(env):
+    return _Fun(_numeral_x, env, False, "x")
+
+
+def _numeral_x(env):
+    """f applied k times to x, env is (x, (f, (k, None)))"""
+    x = env[0]
+    f = env[1][0]
+    k = env[1][1][0]
+    if k == 0:
+        return x.force()
+    fv = f.force()
+    if (type(fv) is _Fun) and fv.eager:
+        # f would force each argument anyway, iterate from the inside instead of recursing
+        for _ in range(k - 1):
+            x = _ready(_apply(fv, x))
+        return _apply(fv, x)
+    for _ in range(k - 1):
+        x = _Thunk(_apply_ev, (f, x))
+    return _apply(f.force(), x)
+
+
+def _numeral(k: int) -> _Fun:
+    """native Church numeral N(k), no term is built"""
+    return _Fun(_numeral_f, (k, None), False, "f")
+
+
+_booleans: Dict[bool, "CompiledTerm"] = dict()
+
+
+def _as_thunk(arg) -> _Thunk:
+    if isinstance(arg, CompiledTerm):
+        return arg._thunk
+    if isinstance(arg, bool):
+        compiled = _booleans.get(arg)
+        if compiled is None:
+            compiled = CompiledTerm(TRUE if arg else FALSE)
+            _booleans[arg] = compiled
+        return compiled._thunk
+    if isinstance(arg, int):
+        if arg < 0:
+            raise ValueError("Church numerals are non-negative")
+        return _ready(_numeral(arg))
+    if isinstance(arg, Term):
+        return CompiledTerm(arg)._thunk
+    if type(arg) in (_Fun, _Neutral):
+        return _ready(arg)
+    raise ValueError(f"cannot pass {type(arg).__name__} to a compiled term")
+
+
+class CompiledTerm:
+    """a term compiled to Python closures, for applying one term (such as GCD or EQ) to many arguments.
+    Calls take Terms, ints (as Church numerals), bools (as TRUE/FALSE), CompiledTerms or
+    values from earlier calls, and return values for read_back(), to_int() or to_bool().
+    Evaluation is lazy normal order, so it agrees with Term.nf() whenever that finds a normal form."""
+
+    def __init__(self, t: Term):
+        assert isinstance(t, Term)
+        self.term = t
+        ev, _ = _Compiler().compile(to_debruijn(t))
+        self._thunk = _Thunk(ev, None)
+
+    def value(self):
+        """the term itself evaluated to weak head normal form"""
+        try:
+            return self._thunk.force()
+        except RecursionError as ex:
+            raise _depth_error() from ex
+
+    def __call__(self, *args):
+        try:
+            f = self._thunk.force()
+            for arg in args:
+                f = _apply(f, _as_thunk(arg))
+            return f
+        except RecursionError as ex:
+            raise _depth_error() from ex
+
+    def nf(self, *args) -> Term:
+        """normal form of the term applied to args, as a Term"""
+        value = self(*args)
+        try:
+            return read_back(value)
+        except RecursionError as ex:
+            raise _depth_error() from ex
+
+
+def _depth_error() -> RecursionError:
+    return RecursionError(
+        "compiled evaluation nested deeper than the Python recursion limit"
+        " (no normal form, or a long chain of lazy arguments), use Term.nf() for this term"
+    )
+
+
+def compile_term(t: Term) -> CompiledTerm:
+    """compile t for fast repeated application (Term.nf() remains the reference semantics)"""
+    return CompiledTerm(t)
@@ -0,0 +1,372 @@
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from lambda_calc import (
+    MaxStepsExceeded,
+    NewNameSource,
+    Term,
+    _Abstraction,
+    _Variable,
+    _mk_abstraction,
+    _mk_composition,
+    _mk_var,
+)
+from TransitiveCache import TransitiveCache
+
+
+# de Bruijn nodes are tuples whose last entry is the number of loose index levels
+# (0 means no index escapes the node, so shifting and substitution can skip it)
+#   (_VAR, index, loose)
+#   (_FREE, name, 0)
+#   (_LAM, body, eager, name_hint, loose)
+#   (_APP, left, right, loose)
+_VAR = 0
+_FREE = 1
+_LAM = 2
+_APP = 3
+
+
+def _var(i: int) -> tuple:
+    return (_VAR, i, i + 1)
+
+
+def _lam(body: tuple, eager: bool, hint: Optional[str]) -> tuple:
+    loose = body[-1] - 1
+    return (_LAM, body, eager, hint, loose if loose > 0 else 0)
+
+
+def _app(left: tuple, right: tuple) -> tuple:
+    return (_APP, left, right, max(left[-1], right[-1]))
+
+
+def to_debruijn(t: Term, *, keep_hints: bool = True) -> tuple:
+    """convert a named term to de Bruijn form, keep_hints retains binder names for read back"""
+    assert isinstance(t, Term)
+    levels: Dict[str, List[int]] = dict()
+    closed: Dict[int, Tuple[Term, tuple]] = dict()  # id -> (term, node) for terms with no free names
+    values: List[tuple] = []
+    stack = [(t, 0, False)]  # explicit stack, terms can be deeper than the recursion limit
+    while len(stack) > 0:
+        node, depth, expanded = stack.pop()
+        if type(node) is _Variable:
+            binders = levels.get(node.name)
+            if binders:
+                values.append(_var(depth - 1 - binders[-1]))
+            else:
+                values.append((_FREE, node.name, 0))
+            continue
+        is_closed = len(node.free_names) == 0
+        if not expanded:
+            if is_closed:
+                found = closed.get(id(node))
+                if found is not None:
+                    values.append(found[1])
+                    continue
+            stack.append((node, depth, True))
+            if type(node) is _Abstraction:
+                levels.setdefault(node.variable.name, []).append(depth)
+                stack.append((node.term, depth + 1, False))
+            else:
+                stack.append((node.right, depth, False))
+                stack.append((node.left, depth, False))
+            continue
+        if type(node) is _Abstraction:
+            name = node.variable.name
+            levels[name].pop()
+            res = _lam(values.pop(), node.eager, name if keep_hints else None)
+        else:
+            right = values.pop()
+            res = _app(values.pop(), right)
+        if is_closed:
+            closed[id(node)] = (node, res)
+        values.append(res)
+    assert len(values) == 1
+    return values[0]
+
+
+def _loose_info(node: tuple, memo: Dict[int, tuple]) -> Tuple[FrozenSet[int], FrozenSet[str]]:
+    """(loose indices, free names) referenced by node"""
+    stack = [node]
+    while len(stack) > 0:
+        n = stack[-1]
+        if id(n) in memo:
+            stack.pop()
+            continue
+        tag = n[0]
+        if tag == _VAR:
+            res = (frozenset([n[1]]), frozenset())
+        elif tag == _FREE:
+            res = (frozenset(), frozenset([n[1]]))
+        elif tag == _LAM:
+            if id(n[1]) not in memo:
+                stack.append(n[1])
+                continue
+            indices, free = memo[id(n[1])][1]
+            res = (frozenset(i - 1 for i in indices if i > 0), free)
+        else:
+            if (id(n[1]) not in memo) or (id(n[2]) not in memo):
+                stack.append(n[2])
+                stack.append(n[1])
+                continue
+            l_indices, l_free = memo[id(n[1])][1]
+            r_indices, r_free = memo[id(n[2])][1]
+            res = (l_indices | r_indices, l_free | r_free)
+        memo[id(n)] = (n, res)  # node kept so id stays valid
+        stack.pop()
+    return memo[id(node)][1]
+
+
+def _all_names(node: tuple, acc: set, seen: set) -> None:
+    """collect binder hints and free names"""
+    stack = [node]
+    while len(stack) > 0:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        tag = node[0]
+        if tag == _FREE:
+            acc.add(node[1])
+        elif tag == _LAM:
+            if node[3] is not None:
+                acc.add(node[3])
+            stack.append(node[1])
+        elif tag == _APP:
+            stack.append(node[2])
+            stack.append(node[1])
+
+
+def from_debruijn(node: tuple) -> Term:
+    """convert de Bruijn form back to a named term, re-using binder hints where they cause no capture"""
+    names = set()
+    _all_names(node, names, set())
+    new_name_source = NewNameSource(names)
+    memo = dict()
+    closed: Dict[int, Tuple[tuple, Term]] = dict()
+    ctx: List[str] = []  # names of enclosing binders, innermost last
+    values: List[Term] = []
+    stack = [(node, False)]  # explicit stack, terms can be deeper than the recursion limit
+    while len(stack) > 0:
+        node, expanded = stack.pop()
+        tag = node[0]
+        if tag == _VAR:
+            values.append(_mk_var(ctx[-1 - node[1]]))
+            continue
+        if tag == _FREE:
+            values.append(_mk_var(node[1]))
+            continue
+        if not expanded:
+            if node[-1] == 0:
+                found = closed.get(id(node))
+                if found is not None:
+                    values.append(found[1])
+                    continue
+            stack.append((node, True))
+            if tag == _LAM:
+                indices, free = _loose_info(node[1], memo)
+                conflicts = set(free)
+                conflicts.update(ctx[-i] for i in indices if i > 0)
+                name = node[3]
+                if (name is None) or (name in conflicts):
+                    name = new_name_source.new_name()
+                ctx.append(name)
+                stack.append((node[1], False))
+            else:
+                stack.append((node[2], False))
+                stack.append((node[1], False))
+            continue
+        if tag == _LAM:
+            name = ctx.pop()
+            res = _mk_abstraction(variable=_mk_var(name), term=values.pop(), eager=node[2])
+        else:
+            right = values.pop()
+            res = _mk_composition(left=values.pop(), right=right)
+        if node[-1] == 0:
+            closed[id(node)] = (node, res)
+        values.append(res)
+    assert len(values) == 1
+    return values[0]
+
+
+def _nodes_equal(a: tuple, b: tuple) -> bool:
+    """a == b for de Bruijn nodes, with an explicit stack (tuple comparison recurses in C)"""
+    pairs = [(a, b)]
+    while len(pairs) > 0:
+        a, b = pairs.pop()
+        if a is b:
+            continue
+        if (a[0] != b[0]) or (len(a) != len(b)):
+            return False
+        if a[0] == _LAM:
+            if a[2:] != b[2:]:
+                return False
+            pairs.append((a[1], b[1]))
+        elif a[0] == _APP:
+            if a[3] != b[3]:
+                return False
+            pairs.append((a[2], b[2]))
+            pairs.append((a[1], b[1]))
+        elif a != b:
+            return False
+    return True
+
+
+def alpha_equivalent(a: Term, b: Term) -> bool:
+    """check if two terms differ only in the names of bound variables"""
+    return _nodes_equal(to_debruijn(a, keep_hints=False), to_debruijn(b, keep_hints=False))
+
+
+def _rebuild_loose(node: tuple, depth: int, on_var) -> tuple:
+    """
+    copy node, replacing each index at or above the binder depth it sits under by on_var(index, depth)
+    (sub-terms with no such index are shared, explicit stacks so deep terms don't hit the recursion limit)
+    """
+    values: List[tuple] = []
+    # tasks: (node, depth) to walk, (node, None) to rebuild node from the values of its children
+    tasks = [(node, depth)]
+    while len(tasks) > 0:
+        node, depth = tasks.pop()
+        tag = node[0]
+        if depth is None:
+            if tag == _LAM:
+                values.append(_lam(values.pop(), node[2], node[3]))
+            else:
+                right = values.pop()
+                values.append(_app(values.pop(), right))
+        elif node[-1] <= depth:
+            values.append(node)
+        elif tag == _VAR:
+            values.append(on_var(node[1], depth))
+        elif tag == _LAM:
+            tasks.append((node, None))
+            tasks.append((node[1], depth + 1))
+        else:
+            tasks.append((node, None))
+            tasks.append((node[2], depth))
+            tasks.append((node[1], depth))
+    assert len(values) == 1
+    return values[0]
+
+
+def _shift(node: tuple, d: int, cutoff: int = 0) -> tuple:
+    """add d to all indices at or above cutoff"""
+    return _rebuild_loose(node, cutoff, lambda i, depth: _var(i + d))
+
+
+def _instantiate(body: tuple, arg: tuple) -> tuple:
+    """beta contraction: replace index 0 in body by arg, lowering the other loose indices"""
+    shifted: Dict[int, tuple] = dict()  # arg shifted by depth, shared between occurrences
+
+    def on_var(i: int, depth: int) -> tuple:
+        if i != depth:
+            return _var(i - 1)
+        try:
+            return shifted[depth]
+        except KeyError:
+            res = _shift(arg, depth)
+            shifted[depth] = res
+            return res
+
+    return _rebuild_loose(body, 0, on_var)
+
+
+class _Reducer:
+    """normal order reduction over de Bruijn terms, remembering sub-terms known to be normal"""
+
+    def __init__(self):
+        self._normal: Dict[int, tuple] = dict()  # id -> node, keeps node alive so id stays valid
+
+    def step(self, node: tuple) -> Tuple[tuple, bool]:
+        """one leftmost outermost beta reduction"""
+        path: List[Tuple[tuple, int]] = []  # (ancestor, position of the child we went into), explicit for deep terms
+        current = node
+        while True:
+            res = None
+            if id(current) not in self._normal:
+                tag = current[0]
+                if tag == _LAM:
+                    path.append((current, 1))
+                    current = current[1]
+                    continue
+                if tag == _APP:
+                    left = current[1]
+                    if left[0] == _LAM:
+                        arg = current[2]
+                        if left[2]:
+                            arg = self.normalize(arg)[0]
+                        res = _instantiate(left[1], arg)
+                        if _nodes_equal(res, current):  # skip redexes that reproduce themselves, as Term.nf() does
+                            res = None
+                    if res is None:
+                        path.append((current, 1))
+                        current = left
+                        continue
+            if res is not None:
+                while len(path) > 0:
+                    parent, pos = path.pop()
+                    if parent[0] == _LAM:
+                        res = _lam(res, parent[2], parent[3])
+                    elif pos == 1:
+                        res = _app(res, parent[2])
+                    else:
+                        res = _app(parent[1], res)
+                return res, True
+            # current is normal, move on to the nearest right sibling still to look at
+            self._normal[id(current)] = current
+            while True:
+                if len(path) == 0:
+                    return node, False
+                parent, pos = path.pop()
+                if (parent[0] == _APP) and (pos == 1):
+                    path.append((parent, 2))
+                    current = parent[2]
+                    break
+                self._normal[id(parent)] = parent
+
+    def normalize(self, node: tuple, *, max_steps: Optional[int] = None) -> Tuple[tuple, int]:
+        """reduce to normal form, detecting cycles with Brent's algorithm"""
+        steps = 0
+        saved = node
+        horizon = 1
+        while True:
+            node, acted = self.step(node)
+            if not acted:
+                return node, steps
+            steps = steps + 1
+            if _nodes_equal(node, saved):
+                raise ValueError("cycle")
+            if steps == horizon:
+                saved = node
+                horizon = 2 * horizon
+            if (max_steps is not None) and (steps > max_steps):
+                raise MaxStepsExceeded()
+
+
+def term_nf(t: Term, *, max_steps: Optional[int] = None, tc: Optional[TransitiveCache] = None) -> Tuple[Term, int]:
+    """reduce to normal form through de Bruijn terms (tc, if given, is consulted and updated for the whole term only)"""
+    assert isinstance(t, Term)
+    assert isinstance(max_steps, int | None)
+    start = t
+    if (tc is not None) and (t in tc):
+        start = tc.lookup_result(t)
+    node, steps = _Reducer().normalize(to_debruijn(start), max_steps=max_steps)
+    res = from_debruijn(node) if steps > 0 else start
+    if tc is not None:
+        if res != t:
+            tc.store_transition(t, res)
+        tc.store_absorbing(res)
+    return res, steps
+
+
+def term_r(t: Term, *, n: int = 1, tc: Optional[TransitiveCache] = None) -> Term:
+    """run n beta reduction step(s) in normal order through de Bruijn terms"""
+    assert isinstance(t, Term)
+    assert isinstance(n, int)
+    reducer = _Reducer()
+    node = to_debruijn(t)
+    acted_any = False
+    for i in range(n):
+        node, acted = reducer.step(node)
+        acted_any = acted_any or acted
+    if not acted_any:
+        return t
+    return from_debruijn(node)
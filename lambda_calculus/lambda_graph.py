@@ -0,0 +1,387 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from lambda_calc import MaxStepsExceeded, Term, _Abstraction, _Variable
+import lambda_debruijn
+from TransitiveCache import TransitiveCache
+
+
+# call-by-need graph reduction: arguments are substituted as pointers to one shared
+# node, and a reduced application node is overwritten (as an indirection) by its
+# result, so every other reference to it sees the work already done
+_G_VAR = 0  # bound variable, occurrences point at the one node owned by its binder
+_G_FREE = 1
+_G_LAM = 2
+_G_APP = 3
+_G_IND = 4  # indirection left behind by an updated application
+
+_NO_VARS = frozenset()
+
+
+class _GNode:
+    """mutable graph node, fv is a superset of the bound variable nodes free in the sub-graph"""
+    __slots__ = ("kind", "a", "b", "eager", "name", "fv", "normal", "stuck")
+
+    def __init__(self, kind: int, *, a=None, b=None, eager: bool = False, name: Optional[str] = None, fv=_NO_VARS):
+        self.kind = kind
+        self.a = a
+        self.b = b
+        self.eager = eager
+        self.name = name
+        self.fv = fv
+        self.normal = False  # set once normalization of the node has been scheduled
+        self.stuck = False  # application whose contraction reproduces itself
+
+
+def _new_var(name: str) -> _GNode:
+    node = _GNode(_G_VAR, name=name)
+    node.fv = frozenset([node])
+    return node
+
+
+def _new_lam(var: _GNode, body: _GNode, eager: bool) -> _GNode:
+    fv = body.fv
+    if var in fv:
+        fv = fv - {var}
+    return _GNode(_G_LAM, a=var, b=body, eager=eager, fv=fv)
+
+
+def _new_app(left: _GNode, right: _GNode) -> _GNode:
+    if len(right.fv) == 0:
+        fv = left.fv
+    elif len(left.fv) == 0:
+        fv = right.fv
+    else:
+        fv = left.fv | right.fv
+    return _GNode(_G_APP, a=left, b=right, fv=fv)
+
+
+def _deref(node: _GNode) -> _GNode:
+    while node.kind == _G_IND:
+        node = node.a
+    return node
+
+
+def _to_graph(t: Term) -> _GNode:
+    """build a graph, closed sub-terms become shared nodes"""
+    scope: Dict[str, List[_GNode]] = dict()
+    closed: Dict[int, Tuple[Term, _GNode]] = dict()
+    values: List[_GNode] = []
+    stack = [(t, False)]  # explicit, so deep terms don't hit the recursion limit
+    while len(stack) > 0:
+        t, ready = stack.pop()
+        if not ready:
+            if isinstance(t, _Variable):
+                bound = scope.get(t.name)
+                values.append(bound[-1] if bound else _GNode(_G_FREE, name=t.name))
+                continue
+            if len(t.free_names) == 0:
+                found = closed.get(id(t))
+                if found is not None:
+                    values.append(found[1])
+                    continue
+            stack.append((t, True))
+            if isinstance(t, _Abstraction):
+                scope.setdefault(t.variable.name, []).append(_new_var(t.variable.name))
+                stack.append((t.term, False))
+            else:
+                stack.append((t.right, False))
+                stack.append((t.left, False))
+            continue
+        if isinstance(t, _Abstraction):
+            res = _new_lam(scope[t.variable.name].pop(), values.pop(), t.eager)
+        else:
+            right = values.pop()
+            res = _new_app(values.pop(), right)
+        if len(t.free_names) == 0:
+            closed[id(t)] = (t, res)
+        values.append(res)
+    assert len(values) == 1
+    return values[0]
+
+
+def _to_debruijn(root: _GNode, *, keep_hints: bool = True) -> tuple:
+    """read a graph back as a de Bruijn term (variables out of scope become free names)"""
+    levels: Dict[_GNode, int] = dict()
+    closed: Dict[int, tuple] = dict()
+    depth = 0
+    values = []
+    stack = [(root, False)]
+    while len(stack) > 0:
+        node, ready = stack.pop()
+        node = _deref(node)
+        if not ready:
+            kind = node.kind
+            if kind == _G_VAR:
+                level = levels.get(node)
+                if level is None:
+                    values.append((lambda_debruijn._FREE, f"{node.name}@{id(node)}", 0))
+                else:
+                    values.append(lambda_debruijn._var(depth - 1 - level))
+                continue
+            if kind == _G_FREE:
+                values.append((lambda_debruijn._FREE, node.name, 0))
+                continue
+            if len(node.fv) == 0:
+                found = closed.get(id(node))
+                if found is not None:
+                    values.append(found)
+                    continue
+            stack.append((node, True))
+            if kind == _G_LAM:
+                levels[node.a] = depth
+                depth = depth + 1
+                stack.append((node.b, False))
+            else:
+                stack.append((node.b, False))
+                stack.append((node.a, False))
+            continue
+        if node.kind == _G_LAM:
+            depth = depth - 1
+            del levels[node.a]
+            res = lambda_debruijn._lam(values.pop(), node.eager, node.a.name if keep_hints else None)
+        else:
+            right = values.pop()
+            res = lambda_debruijn._app(values.pop(), right)
+        if len(node.fv) == 0:
+            closed[id(node)] = res
+        values.append(res)
+    assert len(values) == 1
+    return values[0]
+
+
+def _graph_equal(a: _GNode, b: _GNode) -> bool:
+    """structural equality, matching binders pairwise"""
+    bound: Dict[_GNode, _GNode] = dict()
+    stack = [(a, b)]
+    while len(stack) > 0:
+        a, b = stack.pop()
+        a = _deref(a)
+        b = _deref(b)
+        if a is b:
+            continue
+        if a.kind != b.kind:
+            return False
+        kind = a.kind
+        if kind == _G_VAR:
+            if bound.get(a) is not b:
+                return False
+        elif kind == _G_FREE:
+            if a.name != b.name:
+                return False
+        elif kind == _G_LAM:
+            if a.eager != b.eager:
+                return False
+            bound[a.a] = b.a
+            stack.append((a.b, b.b))
+        else:
+            stack.append((a.b, b.b))
+            stack.append((a.a, b.a))
+    return True
+
+
+@dataclass
+class GraphReductionStats:
+    """work done by a graph reduction"""
+    steps: int = 0  # beta contractions
+    eager_steps: int = 0  # contractions made normalizing eager (Λ) arguments, Term.nf() does not count these
+    eager_memo_hits: int = 0  # eager arguments equal to one already normalized, not reduced again
+    shared_nodes: int = 0  # argument nodes substituted into more than one position
+    shared_references: int = 0  # references to arguments beyond the first (copies avoided)
+    updates: int = 0  # application nodes overwritten by their result
+
+
+class _GraphReducer:
+    """lazy normal order (call-by-need) reduction to full normal form"""
+
+    def __init__(self, *, max_steps: Optional[int] = None):
+        assert isinstance(max_steps, int | None)
+        self.max_steps = max_steps
+        self.stats = GraphReductionStats()
+        self._eager_depth = 0
+        # closed eager arguments already normalized, as ReductionContext does for Term.nf():
+        # hash of the de Bruijn form -> [(de Bruijn form, normalized node)], compared with _nodes_equal (deep terms)
+        self._eager_memo: Dict[int, List[Tuple[tuple, _GNode]]] = dict()
+
+    def _instantiate(self, lam: _GNode, arg: _GNode) -> _GNode:
+        """copy the abstraction body, sharing arg and every sub-graph that does not mention a replaced variable"""
+        var = lam.a
+        mapping: Dict[_GNode, _GNode] = {var: arg}
+        replaced = {var}
+        memo: Dict[int, _GNode] = dict()
+        occurrences = 0
+        root = _deref(lam.b)
+        stack = [(root, False)]
+        while len(stack) > 0:
+            node, ready = stack.pop()
+            key = id(node)
+            if not ready:
+                if key in memo:
+                    continue
+                if node.fv.isdisjoint(replaced):
+                    memo[key] = node
+                    continue
+                kind = node.kind
+                if kind == _G_VAR:
+                    memo[key] = mapping[node]
+                    continue
+                stack.append((node, True))
+                if kind == _G_LAM:
+                    new_var = _new_var(node.a.name)
+                    mapping[node.a] = new_var
+                    replaced.add(node.a)
+                    stack.append((_deref(node.b), False))
+                else:
+                    stack.append((_deref(node.b), False))
+                    stack.append((_deref(node.a), False))
+                continue
+            if node.kind == _G_LAM:
+                body = _deref(node.b)
+                occurrences = occurrences + (body is var)
+                res = _new_lam(mapping[node.a], memo[id(body)], node.eager)
+            else:
+                left = _deref(node.a)
+                right = _deref(node.b)
+                occurrences = occurrences + (left is var) + (right is var)
+                res = _new_app(memo[id(left)], memo[id(right)])
+            memo[key] = res
+        occurrences = occurrences + (root is var)
+        if occurrences > 1:
+            self.stats.shared_nodes = self.stats.shared_nodes + 1
+            self.stats.shared_references = self.stats.shared_references + occurrences - 1
+        return memo[id(root)]
+
+    def _eager_memo_get(self, key: tuple) -> Optional[_GNode]:
+        for k, v in self._eager_memo.get(hash(key), ()):
+            if lambda_debruijn._nodes_equal(k, key):
+                return v
+        return None
+
+    def _eager_nf(self, arg: _GNode) -> _GNode:
+        """normalize an eager argument in place, a closed argument equal to one seen before takes its normal form"""
+        key = None
+        if len(arg.fv) == 0:
+            key = _to_debruijn(arg, keep_hints=False)
+            found = self._eager_memo_get(key)
+            if found is not None:
+                self.stats.eager_memo_hits = self.stats.eager_memo_hits + 1
+                return found
+        self._eager_depth = self._eager_depth + 1
+        try:
+            self.normalize(arg)
+        finally:
+            self._eager_depth = self._eager_depth - 1
+        arg = _deref(arg)
+        if key is not None:
+            res_key = _to_debruijn(arg, keep_hints=False)
+            for k in (key, res_key):  # normal forms map to themselves
+                if self._eager_memo_get(k) is None:
+                    self._eager_memo.setdefault(hash(k), []).append((k, arg))
+        return arg
+
+    def whnf(self, node: _GNode) -> _GNode:
+        """reduce to weak head normal form in place, detecting cycles with Brent's algorithm"""
+        root = node
+        steps = 0
+        saved = None
+        horizon = 1
+        spine: List[_GNode] = []
+        node = _deref(node)
+        while True:
+            if node.kind == _G_APP:
+                spine.append(node)
+                node = _deref(node.a)
+                continue
+            if (node.kind != _G_LAM) or (len(spine) == 0) or spine[-1].stuck:
+                return _deref(root)
+            app = spine.pop()
+            arg = _deref(app.b)
+            if node.eager:
+                arg = self._eager_nf(arg)
+            res = self._instantiate(node, arg)
+            if _graph_equal(res, app):  # skip redexes that reproduce themselves, as Term.nf() does
+                app.stuck = True
+                return _deref(root)
+            app.kind = _G_IND
+            app.a = res
+            app.b = None
+            self.stats.updates = self.stats.updates + 1
+            self.stats.steps = self.stats.steps + 1
+            if self._eager_depth > 0:
+                self.stats.eager_steps = self.stats.eager_steps + 1
+            if (self.max_steps is not None) and (self.stats.steps > self.max_steps):
+                raise MaxStepsExceeded()
+            steps = steps + 1
+            if steps == horizon:
+                current = _to_debruijn(root, keep_hints=False)
+                if current == saved:
+                    raise ValueError("cycle")
+                saved = current
+                horizon = 2 * horizon
+            node = _deref(res)
+            if len(spine) > 0:
+                spine[-1].a = node
+
+    def normalize(self, root: _GNode) -> None:
+        """reduce to full normal form in place, head first then arguments left to right"""
+        todo = [root]
+        while len(todo) > 0:
+            node = _deref(todo.pop())
+            if node.normal:
+                continue
+            node = self.whnf(node)
+            node.normal = True
+            if node.kind == _G_LAM:
+                todo.append(node.b)
+            elif node.kind == _G_APP:
+                args = []
+                while node.kind == _G_APP:
+                    node.normal = True
+                    args.append(node.b)
+                    node = _deref(node.a)
+                todo.extend(args)  # innermost argument ends up on top
+                if node.kind == _G_LAM:  # head of a stuck redex
+                    todo.append(node)
+
+
+def graph_nf(t: Term, *, max_steps: Optional[int] = None) -> Tuple[Term, GraphReductionStats]:
+    """reduce to normal form by call-by-need graph reduction, also returning step and sharing counts"""
+    assert isinstance(t, Term)
+    reducer = _GraphReducer(max_steps=max_steps)
+    root = _to_graph(t)
+    reducer.normalize(root)
+    if reducer.stats.steps == 0:
+        return t, reducer.stats
+    return lambda_debruijn.from_debruijn(_to_debruijn(root)), reducer.stats
+
+
+def term_nf(t: Term, *, max_steps: Optional[int] = None, tc: Optional[TransitiveCache] = None) -> Tuple[Term, int]:
+    """reduce to normal form by graph reduction (tc, if given, is consulted and updated for the whole term only),
+    counting steps as Term.nf() does: contractions inside eager arguments are not counted"""
+    assert isinstance(t, Term)
+    start = t
+    if (tc is not None) and (t in tc):
+        start = tc.lookup_result(t)
+    res, stats = graph_nf(start, max_steps=max_steps)
+    if tc is not None:
+        if res != t:
+            tc.store_transition(t, res)
+        tc.store_absorbing(res)
+    return res, stats.steps - stats.eager_steps
+
+
+def term_r(t: Term, *, n: int = 1, tc: Optional[TransitiveCache] = None) -> Term:
+    """the term after n graph reduction steps (fewer if the normal form is reached first)"""
+    assert isinstance(t, Term)
+    assert isinstance(n, int)
+    if n <= 0:
+        return t
+    reducer = _GraphReducer(max_steps=n - 1)  # stops right after step n
+    root = _to_graph(t)
+    try:
+        reducer.normalize(root)
+    except MaxStepsExceeded:
+        pass
+    if reducer.stats.steps == 0:
+        return t
+    return lambda_debruijn.from_debruijn(_to_debruijn(root))
@@ -0,0 +1,219 @@
+from typing import List, Optional, Tuple
+
+from lambda_calc import MaxStepsExceeded, Term
+from lambda_debruijn import _APP, _FREE, _LAM, _VAR, _app, _lam, _nodes_equal, _var, from_debruijn, to_debruijn
+import lambda_debruijn
+from TransitiveCache import TransitiveCache
+
+
+# Krivine machine: terms are evaluated against environments of closures instead of
+# being rewritten by substitution.
+#   closure: (de Bruijn term, environment)
+#   environment: None or (closure, rest of environment), index 0 first
+# Full normalization goes under binders by binding them to neutral variables,
+# (_NEUTRAL, level, 0) nodes naming a binder by its absolute depth.
+_NEUTRAL = 4
+_FIRST_CHECKPOINT = 64  # weak head reductions shorter than this are not checked for cycles
+
+
+def _lookup(env, i: int):
+    """closure bound to de Bruijn index i"""
+    for _ in range(i):
+        env = env[1]
+    return env[0]
+
+
+def _neutral(level: int) -> tuple:
+    return ((_NEUTRAL, level, 0), None)
+
+
+class _Machine:
+    """normal order (call-by-name) evaluation with closures"""
+
+    def __init__(self, *, max_steps: Optional[int] = None):
+        assert isinstance(max_steps, int | None)
+        self.max_steps = max_steps
+        self.steps = 0
+        self._eager_depth = 0
+
+    def _quote(self, t: tuple, env, depth: int, base: int = 0) -> tuple:
+        """read a closure back as a de Bruijn term at depth, binders below base stay neutral"""
+        values: List[tuple] = []
+        # tasks: ("eval", term, env, depth), ("lam", eager, hint), ("app",), explicit so deep terms read back
+        tasks = [("eval", t, env, depth)]
+        while len(tasks) > 0:
+            task = tasks.pop()
+            kind = task[0]
+            if kind == "eval":
+                _, t, env, depth = task
+                while t[0] == _VAR:
+                    t, env = _lookup(env, t[1])
+                tag = t[0]
+                if tag == _NEUTRAL:
+                    level = t[1]
+                    values.append(t if level < base else _var(depth - 1 - level))
+                elif tag == _FREE:
+                    values.append(t)
+                elif tag == _LAM:
+                    tasks.append(("lam", t[2], t[3]))
+                    tasks.append(("eval", t[1], (_neutral(depth), env), depth + 1))
+                else:
+                    tasks.append(("app",))
+                    tasks.append(("eval", t[2], env, depth))
+                    tasks.append(("eval", t[1], env, depth))
+            elif kind == "lam":
+                values.append(_lam(values.pop(), task[1], task[2]))
+            else:
+                right = values.pop()
+                values.append(_app(values.pop(), right))
+        assert len(values) == 1
+        return values[0]
+
+    def _quote_state(self, t: tuple, env, stack: List[tuple], depth: int) -> tuple:
+        res = self._quote(t, env, depth)
+        for c_t, c_env in reversed(stack):
+            res = _app(res, self._quote(c_t, c_env, depth))
+        return res
+
+    def _same(self, a: tuple, b: tuple, depth: int) -> bool:
+        """compare two closures without reading them back, stopping at the first difference"""
+        pairs = [(a[0], a[1], b[0], b[1], depth)]
+        while len(pairs) > 0:
+            t1, e1, t2, e2, depth = pairs.pop()
+            while t1[0] == _VAR:
+                t1, e1 = _lookup(e1, t1[1])
+            while t2[0] == _VAR:
+                t2, e2 = _lookup(e2, t2[1])
+            if (t1 is t2) and (e1 is e2):
+                continue
+            tag = t1[0]
+            if tag != t2[0]:
+                return False
+            if tag == _LAM:
+                if (t1[2] != t2[2]) or (t1[3] != t2[3]):
+                    return False
+                n = _neutral(depth)
+                pairs.append((t1[1], (n, e1), t2[1], (n, e2), depth + 1))
+            elif tag == _APP:
+                pairs.append((t1[2], e1, t2[2], e2, depth))
+                pairs.append((t1[1], e1, t2[1], e2, depth))
+            elif t1[1] != t2[1]:  # free name or neutral level
+                return False
+        return True
+
+    def _reproduces(self, lam_t: tuple, lam_env, arg: tuple, new_env, depth: int) -> bool:
+        """check if contracting (lam_t, lam_env) applied to arg gives back the same redex"""
+        t, env = lam_t[1], new_env
+        while t[0] == _VAR:
+            t, env = _lookup(env, t[1])
+        if t[0] != _APP:
+            return False
+        return self._same((lam_t, lam_env), (t[1], env), depth) and self._same(arg, (t[2], env), depth)
+
+    def whnf(self, t: tuple, env, depth: int) -> Tuple[tuple, object, List[tuple], bool]:
+        """run to weak head normal form, returning (term, environment, argument stack, stuck)
+        stuck marks a head redex that reproduces itself, which Term.nf() treats as normal"""
+        stack: List[tuple] = []  # argument closures, next argument last
+        steps = 0
+        checkpoint = _FIRST_CHECKPOINT
+        saved = None
+        while True:
+            tag = t[0]
+            if tag == _APP:
+                stack.append((t[2], env))
+                t = t[1]
+                continue
+            if tag == _VAR:
+                t, env = _lookup(env, t[1])
+                continue
+            if (tag != _LAM) or (len(stack) == 0):
+                return t, env, stack, False
+            arg = stack.pop()
+            bound = arg
+            if t[2]:
+                self._eager_depth = self._eager_depth + 1
+                bound = (self.normalize(arg[0], arg[1], depth, base=depth), None)
+                self._eager_depth = self._eager_depth - 1
+            new_env = (bound, env)
+            if self._reproduces(t, env, arg, new_env, depth):  # skip, as Term.nf() does
+                stack.append(arg)
+                return t, env, stack, True
+            t, env = t[1], new_env
+            steps = steps + 1
+            if self._eager_depth == 0:
+                self.steps = self.steps + 1
+                if (self.max_steps is not None) and (self.steps > self.max_steps):
+                    raise MaxStepsExceeded()
+            if steps == checkpoint:  # longer cycles, compared at doubling intervals
+                current = self._quote_state(t, env, stack, depth)
+                if (saved is not None) and _nodes_equal(current, saved):
+                    raise ValueError("cycle")
+                saved = current
+                checkpoint = 2 * checkpoint
+
+    def normalize(self, t: tuple, env, depth: int, *, base: int = 0) -> tuple:
+        """full normal form as a de Bruijn term at depth (binders below base left as neutral nodes)"""
+        values: List[tuple] = []
+        # tasks: ("eval", term, env, depth), ("lam", eager, hint), ("app", n_args)
+        tasks = [("eval", t, env, depth)]
+        while len(tasks) > 0:
+            task = tasks.pop()
+            kind = task[0]
+            if kind == "eval":
+                _, t, env, depth = task
+                t, env, stack, stuck = self.whnf(t, env, depth)
+                if len(stack) > 0:
+                    tasks.append(("app", len(stack)))
+                    for c_t, c_env in stack:
+                        tasks.append(("eval", c_t, c_env, depth))
+                if t[0] == _LAM:
+                    tasks.append(("lam", t[2], t[3]))
+                    tasks.append(("eval", t[1], (_neutral(depth), env), depth + 1))
+                elif t[0] == _NEUTRAL:
+                    values.append(t if t[1] < base else _var(depth - 1 - t[1]))
+                else:
+                    values.append(t)
+            elif kind == "lam":
+                _, eager, hint = task
+                values.append(_lam(values.pop(), eager, hint))
+            else:
+                n_args = task[1]
+                args = values[len(values) - n_args:]
+                del values[len(values) - n_args:]
+                res = values.pop()
+                for arg in args:
+                    res = _app(res, arg)
+                values.append(res)
+        assert len(values) == 1
+        return values[0]
+
+
+def term_whnf(t: Term, *, max_steps: Optional[int] = None) -> Tuple[Term, int]:
+    """reduce to weak head normal form on the Krivine machine"""
+    assert isinstance(t, Term)
+    machine = _Machine(max_steps=max_steps)
+    head, env, stack, _ = machine.whnf(to_debruijn(t), None, 0)
+    if machine.steps == 0:
+        return t, 0
+    return from_debruijn(machine._quote_state(head, env, stack, 0)), machine.steps
+
+
+def term_nf(t: Term, *, max_steps: Optional[int] = None, tc: Optional[TransitiveCache] = None) -> Tuple[Term, int]:
+    """reduce to normal form on the Krivine machine (tc, if given, is consulted and updated for the whole term only)"""
+    assert isinstance(t, Term)
+    start = t
+    if (tc is not None) and (t in tc):
+        start = tc.lookup_result(t)
+    machine = _Machine(max_steps=max_steps)
+    node = machine.normalize(to_debruijn(start), None, 0)
+    res = from_debruijn(node) if machine.steps > 0 else start
+    if tc is not None:
+        if res != t:
+            tc.store_transition(t, res)
+        tc.store_absorbing(res)
+    return res, machine.steps
+
+
+def term_r(t: Term, *, n: int = 1, tc: Optional[TransitiveCache] = None) -> Term:
+    """the machine has no intermediate terms, single steps are taken by the de Bruijn engine"""
+    return lambda_debruijn.term_r(t, n=n, tc=tc)
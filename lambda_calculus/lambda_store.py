@@ -0,0 +1,289 @@
+from array import array
+from typing import Dict, FrozenSet, List
+
+from lambda_calc import Term, _Abstraction, _Variable, _mk_abstraction, _mk_composition, _mk_var
+
+
+# Struct of arrays node table: node i is (tags[i], a[i], b[i])
+#   _S_VAR: a = name id
+#   _S_LAM, _S_EAGER_LAM: a = binder name id, b = body node
+#   _S_APP: a = left node, b = right node
+# Nodes are hash consed (an open addressing table of node indices), so structurally equal
+# terms are the same index and shared sub-terms are stored once. A node costs about
+# 17 bytes, against several hundred for a Term with its names and free_names frozensets.
+# Free names are computed on demand as bitsets over name ids.
+_S_VAR = 0
+_S_LAM = 1
+_S_EAGER_LAM = 2
+_S_APP = 3
+_EMPTY = -1
+
+
+class TermStore:
+    """compact, hash consed storage for large terms, nodes are read through StoredTerm views"""
+
+    def __init__(self):
+        self.tags = array("b")
+        self.a = array("i")
+        self.b = array("i")
+        self.names: List[str] = []  # name id -> name
+        self._name_ids: Dict[str, int] = dict()
+        self._table = array("i", [_EMPTY]) * 16  # hash consing, node indices, at most half full
+        self._free: Dict[int, int] = dict()  # node -> free name bitset, for nodes asked about
+
+    def __len__(self) -> int:
+        return len(self.tags)
+
+    def nbytes(self) -> int:
+        """bytes held by the node arrays and hash consing table (names not included)"""
+        return sum(x.itemsize * len(x) for x in (self.tags, self.a, self.b, self._table))
+
+    def name_id(self, name: str) -> int:
+        res = self._name_ids.get(name)
+        if res is None:
+            res = len(self.names)
+            self.names.append(name)
+            self._name_ids[name] = res
+        return res
+
+    def _grow(self) -> None:
+        mask = 2 * len(self._table) - 1
+        table = array("i", [_EMPTY]) * (mask + 1)
+        tags, a, b = self.tags, self.a, self.b
+        for i in range(len(tags)):
+            h = hash((tags[i], a[i], b[i])) & mask
+            while table[h] != _EMPTY:
+                h = (h + 1) & mask
+            table[h] = i
+        self._table = table
+
+    def _node(self, tag: int, a: int, b: int) -> int:
+        """index of the node (tag, a, b), added if new"""
+        table = self._table
+        mask = len(table) - 1
+        h = hash((tag, a, b)) & mask
+        while True:
+            i = table[h]
+            if i == _EMPTY:
+                break
+            if (self.tags[i] == tag) and (self.a[i] == a) and (self.b[i] == b):
+                return i
+            h = (h + 1) & mask
+        i = len(self.tags)
+        self.tags.append(tag)
+        self.a.append(a)
+        self.b.append(b)
+        table[h] = i
+        if 2 * len(self.tags) > len(table):
+            self._grow()
+        return i
+
+    def var(self, name: str) -> int:
+        return self._node(_S_VAR, self.name_id(name), 0)
+
+    def lam(self, name: str, body: int, *, eager: bool = False) -> int:
+        assert 0 <= body < len(self.tags)
+        return self._node(_S_EAGER_LAM if eager else _S_LAM, self.name_id(name), body)
+
+    def app(self, left: int, right: int) -> int:
+        assert 0 <= left < len(self.tags)
+        assert 0 <= right < len(self.tags)
+        return self._node(_S_APP, left, right)
+
+    def add(self, t: Term) -> "StoredTerm":
+        """store a Term (and its sub-terms)"""
+        assert isinstance(t, Term)
+        memo: Dict[int, int] = dict()  # id of shared sub-term -> node
+        keep = []  # sub-terms in memo, so ids stay valid
+        values: List[int] = []
+        stack = [(t, False)]
+        while len(stack) > 0:
+            node, expanded = stack.pop()
+            found = memo.get(id(node))
+            if found is not None:
+                values.append(found)
+                continue
+            if type(node) is _Variable:
+                res = self.var(node.name)
+            elif not expanded:
+                stack.append((node, True))
+                if type(node) is _Abstraction:
+                    stack.append((node.term, False))
+                else:
+                    stack.append((node.right, False))
+                    stack.append((node.left, False))
+                continue
+            elif type(node) is _Abstraction:
+                res = self.lam(node.variable.name, values.pop(), eager=node.eager)
+            else:
+                right = values.pop()
+                res = self.app(values.pop(), right)
+            memo[id(node)] = res
+            keep.append(node)
+            values.append(res)
+        assert len(values) == 1
+        return StoredTerm(self, values[0])
+
+    def numeral(self, k: int) -> "StoredTerm":
+        """the Church numeral N(k), built in the store without making Terms"""
+        assert isinstance(k, int) and (k >= 0)
+        f = self.var("f")
+        node = self.var("x")
+        for _ in range(k):
+            node = self.app(f, node)
+        return StoredTerm(self, self.lam("f", self.lam("x", node)))
+
+    def to_term(self, index: int) -> Term:
+        """rebuild the Term for a node"""
+        memo: Dict[int, Term] = dict()  # node -> Term, shared sub-terms built once
+        stack = [index]
+        while len(stack) > 0:
+            i = stack[-1]
+            if i in memo:
+                stack.pop()
+                continue
+            tag = self.tags[i]
+            if tag == _S_VAR:
+                memo[i] = _mk_var(self.names[self.a[i]])
+                stack.pop()
+            elif tag == _S_APP:
+                left, right = self.a[i], self.b[i]
+                if (left in memo) and (right in memo):
+                    memo[i] = _mk_composition(left=memo[left], right=memo[right])
+                    stack.pop()
+                else:
+                    stack.append(right)
+                    stack.append(left)
+            else:
+                body = self.b[i]
+                if body in memo:
+                    memo[i] = _mk_abstraction(
+                        variable=_mk_var(self.names[self.a[i]]), term=memo[body], eager=(tag == _S_EAGER_LAM)
+                    )
+                    stack.pop()
+                else:
+                    stack.append(body)
+        return memo[index]
+
+    def free_bits(self, index: int) -> int:
+        """free names of a node as a bitset over name ids"""
+        res = self._free.get(index)
+        if res is not None:
+            return res
+        memo: Dict[int, int] = dict()
+        stack = [index]
+        while len(stack) > 0:
+            i = stack[-1]
+            if i in memo:
+                stack.pop()
+                continue
+            known = self._free.get(i)
+            if known is not None:
+                memo[i] = known
+                stack.pop()
+                continue
+            tag = self.tags[i]
+            if tag == _S_VAR:
+                memo[i] = 1 << self.a[i]
+                stack.pop()
+            elif tag == _S_APP:
+                left, right = self.a[i], self.b[i]
+                if (left in memo) and (right in memo):
+                    memo[i] = memo[left] | memo[right]
+                    stack.pop()
+                else:
+                    stack.append(right)
+                    stack.append(left)
+            else:
+                body = self.b[i]
+                if body in memo:
+                    memo[i] = memo[body] & ~(1 << self.a[i])
+                    stack.pop()
+                else:
+                    stack.append(body)
+        res = memo[index]
+        self._free[index] = res
+        return res
+
+    def free_names(self, index: int) -> FrozenSet[str]:
+        bits = self.free_bits(index)
+        return frozenset(self.names[i] for i in range(bits.bit_length()) if (bits >> i) & 1)
+
+    def view(self, index: int) -> "StoredTerm":
+        assert 0 <= index < len(self.tags)
+        return StoredTerm(self, index)
+
+
+class StoredTerm:
+    """view of a TermStore node, with the field names of the Term classes"""
+    __slots__ = ("store", "index")
+
+    def __init__(self, store: TermStore, index: int):
+        self.store = store
+        self.index = index
+
+    @property
+    def kind(self) -> str:
+        """"variable", "abstraction" or "composition\""""
+        tag = self.store.tags[self.index]
+        if tag == _S_VAR:
+            return "variable"
+        if tag == _S_APP:
+            return "composition"
+        return "abstraction"
+
+    def _expect(self, kind: str) -> None:
+        if self.kind != kind:
+            raise ValueError(f"{self.kind} node has no {kind} fields")
+
+    @property
+    def name(self) -> str:
+        self._expect("variable")
+        return self.store.names[self.store.a[self.index]]
+
+    @property
+    def variable(self) -> "StoredTerm":
+        self._expect("abstraction")
+        return StoredTerm(self.store, self.store.var(self.store.names[self.store.a[self.index]]))
+
+    @property
+    def term(self) -> "StoredTerm":
+        self._expect("abstraction")
+        return StoredTerm(self.store, self.store.b[self.index])
+
+    @property
+    def eager(self) -> bool:
+        self._expect("abstraction")
+        return self.store.tags[self.index] == _S_EAGER_LAM
+
+    @property
+    def left(self) -> "StoredTerm":
+        self._expect("composition")
+        return StoredTerm(self.store, self.store.a[self.index])
+
+    @property
+    def right(self) -> "StoredTerm":
+        self._expect("composition")
+        return StoredTerm(self.store, self.store.b[self.index])
+
+    @property
+    def free_names(self) -> FrozenSet[str]:
+        return self.store.free_names(self.index)
+
+    def to_term(self) -> Term:
+        return self.store.to_term(self.index)
+
+    def __eq__(self, other) -> bool:
+        """structural equality (nodes are hash consed, so this is an index comparison)"""
+        if not isinstance(other, StoredTerm):
+            return NotImplemented
+        return (self.store is other.store) and (self.index == other.index)
+
+    def __hash__(self):
+        return hash((id(self.store), self.index))
+
+    def __str__(self) -> str:
+        return str(self.to_term())
+
+    def __repr__(self) -> str:
+        return f"StoredTerm(index={self.index})"
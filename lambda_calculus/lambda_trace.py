@@ -0,0 +1,249 @@
+import csv
+import json
+import struct
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from lambda_calc import NewNameSource, Term, _Abstraction, _beta_step, _size_and_depth, text_aliases
+from TransitiveCache import TransitiveCache
+
+
+@dataclass
+class StepInfo:
+    """one traced reduction step"""
+    step: int
+    size: int  # nodes in the term after the step (0 if not measured this step)
+    depth: int
+    redex: Optional[str]  # alias name (or λ and binder name) of the abstraction applied, None for a cached step
+    seconds: float  # whole step
+    substitution_seconds: float
+    eager_seconds: float  # normalizing arguments of eager (Λ) abstractions
+    cache_hits: int  # TransitiveCache hits during the step
+
+    @property
+    def search_seconds(self) -> float:
+        """time finding the redex (and consulting the cache)"""
+        return max(0.0, self.seconds - self.substitution_seconds - self.eager_seconds)
+
+
+_fields = ("step", "size", "depth", "redex", "seconds", "substitution_seconds", "eager_seconds", "cache_hits")
+# binary log: a 1 byte record type then
+#   type 0 (label): uint16 label id, uint16 length, utf-8 text
+#   type 1 (step): _step_record, label id 0xFFFF for no redex
+_BINARY_MAGIC = b"LTRACE1\n"
+_label_header = struct.Struct("<HH")
+_step_record = struct.Struct("<IIIHfffI")
+_NO_LABEL = 0xFFFF
+
+
+def size_and_depth(t: Term) -> Tuple[int, int]:
+    """number of nodes and nesting depth of a term (shared sub-terms counted each time they occur)"""
+    return _size_and_depth(t)
+
+
+class ReductionTracer:
+    """pass as Term.nf(tracer=...) to record each normal order step: term size and depth,
+    which combinator was applied, time in redex search versus substitution, and cache hits.
+    Steps go to callback(info: StepInfo) and/or a log file (.csv text, anything else compact binary)."""
+
+    def __init__(
+        self,
+        *,
+        callback: Optional[Callable[[StepInfo], None]] = None,
+        log_path: Optional[str] = None,
+        measure_every: int = 1,
+    ):
+        """measure_every > 1 measures term size and depth only on every measure_every-th step (they cost a term walk)"""
+        assert isinstance(measure_every, int) and (measure_every >= 1)
+        self.callback = callback
+        self.log_path = log_path
+        self.measure_every = measure_every
+        self.steps = 0
+        self.seconds = 0.0
+        self.substitution_seconds = 0.0
+        self.eager_seconds = 0.0
+        self.cache_hits = 0
+        self.redex_counts: Counter = Counter()
+        self.size_histogram: Counter = Counter()  # power of 2 bucket -> measured steps
+        self.depth_histogram: Counter = Counter()
+        self.sizes_over_time: List[Tuple[int, int, int]] = []  # (step, size, depth) as measured
+        self._aliases = {t: name for name, t in text_aliases.items()}
+        self._redex = None
+        self._step_substitution = 0.0
+        self._step_eager = 0.0
+        self._file = None
+        self._writer = None
+        self._labels: Dict[str, int] = dict()
+        if log_path is not None:
+            if log_path.endswith(".csv"):
+                self._file = open(log_path, "w", newline="")
+                self._writer = csv.writer(self._file)
+                self._writer.writerow(_fields)
+            else:
+                self._file = open(log_path, "wb")
+                self._file.write(_BINARY_MAGIC)
+
+    def _label(self, lam: _Abstraction) -> str:
+        name = self._aliases.get(lam)
+        if name is not None:
+            return name
+        return ("Λ" if lam.eager else "λ") + lam.variable.name
+
+    def _on_redex(self, node: Term, eager_seconds: float, substitution_seconds: float, contracted: bool) -> None:
+        """called by _beta_step() at each redex it tries"""
+        self._step_eager = self._step_eager + eager_seconds
+        self._step_substitution = self._step_substitution + substitution_seconds
+        if contracted:
+            self._redex = self._label(node.left)
+
+    def _step(
+        self, t: Term, *, new_name_source: NewNameSource, tc: Optional[TransitiveCache], ctx=None
+    ) -> Tuple[Term, bool]:
+        """_beta_step() with measurements, called by Term.nf()"""
+        self._redex = None
+        self._step_substitution = 0.0
+        self._step_eager = 0.0
+        hits_before = 0 if tc is None else tc._hits
+        start = time.perf_counter()
+        res, acted = _beta_step(t, new_name_source=new_name_source, tc=tc, tracer=self, ctx=ctx)
+        seconds = time.perf_counter() - start
+        if not acted:
+            return res, acted
+        self.steps = self.steps + 1
+        size, depth = 0, 0
+        if self.steps % self.measure_every == 0:
+            size, depth = size_and_depth(res)
+            self.size_histogram[1 << (size.bit_length() - 1)] += 1
+            self.depth_histogram[1 << (depth.bit_length() - 1)] += 1
+            self.sizes_over_time.append((self.steps, size, depth))
+        info = StepInfo(
+            step=self.steps,
+            size=size,
+            depth=depth,
+            redex=self._redex,
+            seconds=seconds,
+            substitution_seconds=self._step_substitution,
+            eager_seconds=self._step_eager,
+            cache_hits=0 if tc is None else tc._hits - hits_before,
+        )
+        self.seconds = self.seconds + seconds
+        self.substitution_seconds = self.substitution_seconds + info.substitution_seconds
+        self.eager_seconds = self.eager_seconds + info.eager_seconds
+        self.cache_hits = self.cache_hits + info.cache_hits
+        if info.redex is not None:
+            self.redex_counts[info.redex] += 1
+        if self._file is not None:
+            self._log(info)
+        if self.callback is not None:
+            self.callback(info)
+        return res, acted
+
+    def _log(self, info: StepInfo) -> None:
+        if self._writer is not None:
+            self._writer.writerow([getattr(info, k) for k in _fields])
+            return
+        label_id = _NO_LABEL
+        if info.redex is not None:
+            label_id = self._labels.get(info.redex)
+            if label_id is None:
+                label_id = len(self._labels)
+                assert label_id < _NO_LABEL
+                self._labels[info.redex] = label_id
+                text = info.redex.encode("utf-8")
+                self._file.write(b"\x00" + _label_header.pack(label_id, len(text)) + text)
+        self._file.write(
+            b"\x01"
+            + _step_record.pack(
+                info.step, info.size, info.depth, label_id,
+                info.seconds, info.substitution_seconds, info.eager_seconds, info.cache_hits,
+            )
+        )
+
+    def most_reduced(self, n: int = 10) -> List[Tuple[str, int]]:
+        """combinators contracted most often"""
+        return self.redex_counts.most_common(n)
+
+    def summary(self) -> Dict:
+        """totals, time split, size and depth histograms (power of 2 buckets) and top redexes"""
+        return {
+            "steps": self.steps,
+            "seconds": self.seconds,
+            "search_seconds": max(0.0, self.seconds - self.substitution_seconds - self.eager_seconds),
+            "substitution_seconds": self.substitution_seconds,
+            "eager_seconds": self.eager_seconds,
+            "cache_hits": self.cache_hits,
+            "max_size": max((s for _, s, _ in self.sizes_over_time), default=0),
+            "max_depth": max((d for _, _, d in self.sizes_over_time), default=0),
+            "size_histogram": dict(sorted(self.size_histogram.items())),
+            "depth_histogram": dict(sorted(self.depth_histogram.items())),
+            "most_reduced": self.most_reduced(),
+        }
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def read_trace(path: str) -> Iterator[StepInfo]:
+    """read back a log written by ReductionTracer (.csv or binary)"""
+    if path.endswith(".csv"):
+        with open(path, newline="") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield StepInfo(
+                    step=int(row["step"]),
+                    size=int(row["size"]),
+                    depth=int(row["depth"]),
+                    redex=row["redex"] if row["redex"] != "" else None,
+                    seconds=float(row["seconds"]),
+                    substitution_seconds=float(row["substitution_seconds"]),
+                    eager_seconds=float(row["eager_seconds"]),
+                    cache_hits=int(row["cache_hits"]),
+                )
+        return
+    labels: Dict[int, str] = dict()
+    with open(path, "rb") as f:
+        if f.read(len(_BINARY_MAGIC)) != _BINARY_MAGIC:
+            raise ValueError(f"{path} is not a reduction trace")
+        while True:
+            kind = f.read(1)
+            if kind == b"":
+                return
+            if kind == b"\x00":
+                label_id, length = _label_header.unpack(f.read(_label_header.size))
+                labels[label_id] = f.read(length).decode("utf-8")
+            elif kind == b"\x01":
+                step, size, depth, label_id, seconds, subst, eager, hits = _step_record.unpack(f.read(_step_record.size))
+                yield StepInfo(
+                    step=step, size=size, depth=depth, redex=labels.get(label_id),
+                    seconds=seconds, substitution_seconds=subst, eager_seconds=eager, cache_hits=hits,
+                )
+            else:
+                raise ValueError(f"{path}: bad record type {kind!r}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="summarize a reduction trace log")
+    parser.add_argument("path")
+    args = parser.parse_args()
+    steps = list(read_trace(args.path))
+    redexes = Counter(s.redex for s in steps if s.redex is not None)
+    print(json.dumps({
+        "steps": len(steps),
+        "seconds": sum(s.seconds for s in steps),
+        "substitution_seconds": sum(s.substitution_seconds for s in steps),
+        "max_size": max((s.size for s in steps), default=0),
+        "most_reduced": redexes.most_common(10),
+    }, indent=2))
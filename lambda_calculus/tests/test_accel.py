@@ -0,0 +1,80 @@
+import pytest
+from lambda_calc import *
+import lambda_accel
+from lambda_accel import accelerated_nf, church_bool, church_value
+
+
+def test_recognizers():
+    assert church_value(N(0)) == 0
+    assert church_value(N(5)) == 5
+    assert church_value(λ["a", "b"]("a", ("a", "b"))) == 2
+    assert church_value(λ["a", "b"]("b", ("a", "b"))) is None
+    assert church_value(TRUE) is None
+    assert church_bool(TRUE) is True
+    assert church_bool(FALSE) is False
+    assert church_bool(N(0)) is False
+    assert church_bool(N(1)) is None
+
+
+def test_matches_nf():
+    previous = lambda_accel.enable_validation(True)
+    try:
+        for expr in [
+            SUCC | N(3),
+            PLUS | N(3) | N(4),
+            SUB | N(7) | N(3),
+            SUB | N(3) | N(7),
+            MULT | N(3) | N(4),
+            PRED | N(0),
+            isZERO | N(0),
+            LEQ | N(4) | N(2),
+            SUCC | (PLUS | N(2) | N(3)),
+            DIV | N(14) | N(3),
+            EQ | N(3) | N(3),
+            Y | FACTORIALstep | N(3),
+            λ["x"]("y") | (λ["z"]("z", "z"), λ["z"]("z", "z")),
+        ]:
+            res, stats = accelerated_nf(expr)
+            assert res == expr.nf()[0]
+            assert expr.nf(engine="accel") == (res, stats.steps + stats.primitive_steps)
+            assert stats.validations == stats.primitive_steps + stats.eager_primitive_steps
+    finally:
+        lambda_accel.enable_validation(previous)
+
+
+def test_fast_path():
+    res, stats = accelerated_nf(PLUS | N(300) | N(400))
+    assert res == N(700)
+    assert stats.steps == 0
+    assert stats.primitive_steps == 1
+    assert (FALSE | "a" | "b").nf(engine="accel") == (v("b"), 1)
+
+
+def test_eager_arguments():
+    # GCD's eager arguments are PRED/SUB/isZERO applications, accelerated inside the nested normalizations
+    expr = GCD | N(12) | N(18)
+    res, stats = accelerated_nf(expr)
+    assert res == N(6)
+    assert stats.eager_primitive_steps > 0
+    res, steps = expr.nf(engine="accel")
+    assert res == N(6)
+    assert steps == stats.steps + stats.primitive_steps
+
+
+def test_memo_bound(monkeypatch):
+    expr = DIV | N(14) | N(3)
+    unbounded = lambda_accel._AcceleratedReducer()
+    unbounded.normalize(expr)
+    monkeypatch.setattr(lambda_accel, "_MEMO_LIMIT", 50)
+    reducer = lambda_accel._AcceleratedReducer()
+    assert reducer.normalize(expr) == expr.nf()[0]
+    size = len(reducer._values) + len(reducer._clean)
+    assert size < len(unbounded._values) + len(unbounded._clean)
+
+
+def test_errors():
+    with pytest.raises(ValueError):
+        accelerated_nf(DIV | N(14) | N(3), max_steps=10)
+    a = λ["x", "y"]("y", "x", "y")
+    with pytest.raises(ValueError):
+        (a | a | a).nf(engine="accel")
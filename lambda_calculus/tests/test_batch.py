@@ -0,0 +1,100 @@
+import pickle
+
+from lambda_calc import *
+from lambda_batch import normalize_many
+
+
+def test_pickle_term():
+    t = DIV | N(300) | "q"
+    assert pickle.loads(pickle.dumps(t)) == t
+    assert len(pickle.dumps(N(300))) < 2000
+
+
+def test_normalize_many():
+    pairs = [(i, j) for i in range(3) for j in range(3)]
+    terms = [EQ | N(i) | N(j) for i, j in pairs]
+    for workers in (0, 2):
+        results = list(normalize_many(terms, workers=workers))
+        assert sorted(r.index for r in results) == list(range(len(terms)))
+        for r in results:
+            expect, steps = terms[r.index].nf()
+            assert r.error is None
+            assert r.result == expect
+            assert r.steps == steps
+    for r in normalize_many(terms + terms, workers=2, worker_cache=True):
+        assert r.result == terms[r.index % len(terms)].nf()[0]
+
+
+def test_normalize_many_errors():
+    grows = λ["x"]("x", "x", "x")
+    terms = [grows | grows, SUCC | N(2)]
+    results = {r.index: r for r in normalize_many(terms, workers=2, timeout=0.5)}
+    assert results[0].error == "timeout"
+    assert results[1].result == N(3)
+    results = {r.index: r for r in normalize_many(terms, workers=0, max_steps=20)}
+    assert results[0].error.startswith("max_steps exceeded, term size by step: 1: ")
+    assert results[1].result == N(3)
+
+
+def test_normalize_many_shared_cache(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    terms = [DIV | N(9) | N(k) for k in (2, 3, 2, 3)]
+    results = list(normalize_many(terms, workers=2, cache_path=path))
+    for r in results:
+        assert r.result == terms[r.index].nf()[0]
+
+
+def test_normalize_many_sees_concurrent_flushes(tmp_path):
+    import sqlite3
+    import time
+    from PersistentTransitiveCache import PersistentTransitiveCache
+
+    path = str(tmp_path / "cache.sqlite")
+    first = PLUS | N(2) | N(3)
+    second = PLUS | N(4) | N(4)
+    marker = v("from_other_worker")  # not the real normal form, shows the stored entry was used
+
+    def terms():
+        yield first
+        # wait for the running worker to flush the first term, so it opened the cache before this entry
+        deadline = time.time() + 60
+        while True:
+            with sqlite3.connect(path) as conn:
+                if conn.execute("SELECT COUNT(*) FROM transitions").fetchone()[0] > 0:
+                    break
+            assert time.time() < deadline
+            time.sleep(0.05)
+        with PersistentTransitiveCache(path, preload=False) as other:
+            other.store_transition(second, marker)
+        yield second
+
+    results = {r.index: r for r in normalize_many(terms(), workers=1, cache_path=path, timeout=30.0)}
+    assert results[0].result == N(5)
+    assert results[1].result == marker
+
+
+def test_cache_updates_hold_off_timeout():
+    import signal
+    import time
+    from lambda_batch import _Timeout, _alarm_blocked, _raise_timeout
+
+    finished = []
+
+    def update():
+        time.sleep(0.3)
+        finished.append(True)
+
+    previous = signal.signal(signal.SIGALRM, _raise_timeout)
+    try:
+        signal.setitimer(signal.ITIMER_REAL, 0.05)
+        try:
+            _alarm_blocked(update)()
+            time.sleep(1.0)
+            raised = False
+        except _Timeout:
+            raised = True
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+    assert finished == [True]  # the update completed
+    assert raised  # and the timeout was delivered after it
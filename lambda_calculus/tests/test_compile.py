@@ -0,0 +1,56 @@
+import pytest
+from lambda_calc import *
+from lambda_compile import compile_term, read_back, to_bool, to_int
+from lambda_debruijn import alpha_equivalent
+
+
+def test_matches_nf():
+    for expr in [
+        SUCC | N(3),
+        PLUS | N(3) | N(4),
+        SUB | N(7) | N(3),
+        MULT | N(3) | N(4),
+        PRED | N(5),
+        DIV | N(14) | N(3),
+        GCD | N(6) | N(9),
+        EQ | N(3) | N(3),
+        Y | FACTORIALstep | N(3),
+        Z | FACTORIALstep | N(3),
+        Θ | FACTORIALstep | N(3),
+        λ["x"](λ["x"]("x") | "q" | "y" | "x") | "N",
+        λ["x"]("y") | (λ["z"]("z", "z"), λ["z"]("z", "z")),
+        λ["x"](λ["y"]("x", λ["x"]("x") | "y")) | "z",
+        λ["x", "y"]("x", "y", "x") | "y",
+    ]:
+        res = expr.compile().nf()
+        assert alpha_equivalent(res, expr.nf()[0])
+
+
+def test_repeated_application():
+    gcd = compile_term(GCD)
+    for a, b in [(12, 18), (7, 5), (6, 9)]:
+        assert to_int(gcd(a, b)) == to_int(gcd(N(a), N(b)))
+        assert read_back(gcd(a, b)) == (GCD | N(a) | N(b)).nf()[0]
+    eq = compile_term(EQ)
+    assert to_bool(eq(3, 3))
+    assert not to_bool(eq(3, 4))
+    assert to_int(compile_term(MOD)(30, 4)) == 2
+    assert to_int(compile_term(CAR)(compile_term(DIV)(30, 4))) == 7
+    assert to_int(compile_term(Y | FACTORIALstep)(5)) == 120
+    assert to_int(compile_term(PLUS)(2000, 2000)) == 4000  # eager successor iterates
+    assert to_bool(compile_term(NOT)(False))
+    with pytest.raises(ValueError):
+        to_int(compile_term(DIV)(14, 3))
+    with pytest.raises(ValueError):
+        to_bool(compile_term(N(2)))
+    with pytest.raises(ValueError):
+        compile_term(SUCC)(-1)
+
+
+def test_deep_terms():
+    deep = N(3000)
+    assert deep.compile().nf() == deep
+    assert (SUCC | deep).compile().nf() == N(3001)
+    assert to_int(compile_term(SUCC)(deep)) == 3001
+    with pytest.raises(RecursionError, match="recursion limit"):
+        (PLUS | deep | deep).compile().nf()
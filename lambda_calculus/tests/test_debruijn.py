@@ -0,0 +1,75 @@
+import pytest
+from lambda_calc import *
+from lambda_debruijn import alpha_equivalent, from_debruijn, to_debruijn
+
+
+def test_round_trip():
+    for expr in [N(3), PLUS, DIV, GCD, FACTORIALstep, λ["x"]("x", "y")]:
+        assert from_debruijn(to_debruijn(expr)) == expr
+
+
+def test_alpha_equivalent():
+    assert alpha_equivalent(λ["x"]("x"), λ["y"]("y"))
+    assert not alpha_equivalent(λ["x"]("x", "z"), λ["z"]("z", "z"))
+    assert not alpha_equivalent(λ["x", "y"]("x"), λ["x", "y"]("y"))
+    assert not alpha_equivalent(λ["x"]("x"), Λ["x"]("x"))
+
+
+def test_capture_avoided_on_read_back():
+    # (λx.λy.x) y must not become λy.y
+    res, _ = (λ["x", "y"]("x") | "y").nf(engine="debruijn")
+    assert alpha_equivalent(res, λ["z"]("y"))
+    assert res.free_names == frozenset(["y"])
+
+
+def test_matches_named_engine():
+    for expr in [
+        SUCC | N(3),
+        PLUS | N(3) | N(4),
+        SUB | N(7) | N(3),
+        MULT | N(3) | N(4),
+        PRED | N(5),
+        DIV | N(14) | N(3),
+        GCD | N(6) | N(9),
+        EQ | N(3) | N(3),
+        Y | FACTORIALstep | N(3),
+        λ["x"]("x", "x") | λ["x"]("x", "x"),
+        λ["x"]("y") | (λ["z"]("z", "z"), λ["z"]("z", "z")),
+    ]:
+        named, named_steps = expr.nf()
+        res, steps = expr.nf(engine="debruijn")
+        assert res == named
+        assert steps == named_steps
+    named = FACTORIALstep.nf()[0]
+    assert alpha_equivalent(FACTORIALstep.nf(engine="debruijn")[0], named)
+
+
+def test_r():
+    expr = PLUS | N(1) | N(2)
+    assert expr.r(engine="debruijn") == expr.r()
+    assert expr.r(n=3, engine="debruijn") == expr.r(n=3)
+
+
+def test_engine_errors():
+    with pytest.raises(ValueError):
+        N(1).nf(engine="no such engine")
+    a = λ["x", "y"]("y", "x", "y")
+    with pytest.raises(ValueError):
+        (a | a | a).nf(engine="debruijn")
+    with pytest.raises(ValueError):
+        (DIV | N(14) | N(3)).nf(engine="debruijn", max_steps=10)
+
+
+def test_deep_round_trip():
+    deep = N(5000)
+    assert from_debruijn(to_debruijn(deep)) == deep
+    assert alpha_equivalent(deep, N(5000))
+    assert not alpha_equivalent(deep, N(5001))
+
+
+def test_deep_terms():
+    deep = N(3000)
+    assert deep.nf(engine="debruijn") == (deep, 0)
+    res, steps = (SUCC | deep).nf(engine="debruijn")
+    assert res == N(3001)
+    assert steps > 0
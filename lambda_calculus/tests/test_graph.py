@@ -0,0 +1,73 @@
+import pytest
+from lambda_calc import *
+from lambda_graph import graph_nf
+
+
+def test_matches_nf():
+    for expr in [
+        SUCC | N(3),
+        PLUS | N(3) | N(4),
+        SUB | N(7) | N(3),
+        MULT | N(3) | N(4),
+        PRED | N(5),
+        DIV | N(14) | N(3),
+        GCD | N(6) | N(9),
+        GCD | N(9) | N(6),
+        EQ | N(3) | N(3),
+        Y | FACTORIALstep | N(3),
+        λ["x"](λ["x"]("x") | "q" | "y" | "x") | "N",
+        λ["x"]("x", "x") | λ["x"]("x", "x"),
+        λ["z"](λ["x"]("x", "x") | λ["x"]("x", "x") | (λ["x"]("x") | "q")),
+        λ["x"]("y") | (λ["z"]("z", "z"), λ["z"]("z", "z")),
+    ]:
+        res, stats = graph_nf(expr)
+        assert res == expr.nf()[0]
+        assert expr.nf(engine="graph") == (res, stats.steps - stats.eager_steps)
+
+
+def test_sharing():
+    # normal order copies the redex into all four positions and reduces it four times
+    expr = λ["x"]("x", "x", "x", "x") | (λ["y"]("y") | "z")
+    res, steps = expr.nf()
+    assert steps == 5
+    g_res, stats = graph_nf(expr)
+    assert g_res == res
+    assert stats.steps == 2
+    assert stats.shared_nodes == 1
+    assert stats.shared_references == 3
+
+
+def test_steps_against_named():
+    # sharing (and the memo of eager arguments) never costs steps on a Y recursion
+    for expr in [Y | FACTORIALstep | N(3), DIV | N(14) | N(3), GCD | N(6) | N(9)]:
+        ctx = ReductionContext()
+        res, steps = expr.nf(context=ctx)
+        g_res, g_steps = expr.nf(engine="graph")
+        assert g_res == res
+        assert g_steps <= steps
+        assert graph_nf(expr)[1].steps <= ctx.steps
+    res, steps = (PLUS | N(20) | N(30)).nf(engine="graph")
+    assert (res, steps) == (PLUS | N(20) | N(30)).nf()
+
+
+def test_deep_terms():
+    deep = N(3000)
+    assert deep.nf(engine="graph") == (deep, 0)
+    res, steps = (SUCC | deep).nf(engine="graph")
+    assert res == N(3001)
+    assert steps > 0
+
+
+def test_r():
+    expr = λ["x"]("x", "x") | (λ["y"]("y") | "z")
+    assert expr.r(engine="graph") == v(λ["y"]("y") | "z", λ["y"]("y") | "z")
+    assert expr.r(n=2, engine="graph") == v("z", "z")
+    assert expr.r(n=0, engine="graph") == expr
+
+
+def test_errors():
+    a = λ["x", "y"]("y", "x", "y")
+    with pytest.raises(ValueError):
+        graph_nf(a | a | a)
+    with pytest.raises(ValueError):
+        graph_nf(DIV | N(14) | N(3), max_steps=10)
@@ -229,4 +229,167 @@ def test_notation():
     assert (Y | F | N(1)).nf()[0] == N(1)
     assert (Y | F | N(2)).nf()[0] == N(2)
     assert (Y | F | N(3)).nf()[0] == N(6)
-    
\ No newline at end of file
+    
+
+def test_interning():
+    previous = enable_interning(True)
+    try:
+        a = N(5)
+        b = N(5)
+        assert a is b
+        assert (λ["x"]("x") | "y") is (λ["x"]("x") | "y")
+        assert a != N(4)
+        res = (PLUS | N(2) | N(3)).nf()[0]
+        assert res is a
+        assert res == λ["f"](λ["x"](vr(["f"] * 5 + ["x"])))
+        assert interned_term_count() > 0
+    finally:
+        enable_interning(previous)
+    assert N(5) is not N(5)
+    assert N(5) == a
+
+
+def test_deep_terms():
+    # well past the Python recursion limit
+    k = 20000
+    a = N(k)
+    b = N(k)
+    assert a == b
+    assert not a < b
+    assert (a < N(k - 1)) != (N(k - 1) < a)
+    assert str(a).count("f") == k + 1
+    assert repr(a).count("'f'") == k + 1
+    res, steps = (SUCC | a).nf()
+    assert res == N(k + 1)
+    assert steps == 3
+
+
+def test_recursive_engine_agrees():
+    for expr in [PLUS | N(2) | N(3), DIV | N(7) | N(2), Y | FACTORIALstep | N(2)]:
+        assert expr.nf(engine="recursive") == expr.nf()
+        assert expr.r(engine="recursive") == expr.r()
+
+
+def test_fingerprint():
+    assert λ["x"]("x").alpha_fingerprint() == λ["y"]("y").alpha_fingerprint()
+    assert λ["x"]("x", λ["y"]("y", "x")).alpha_fingerprint() == λ["a"]("a", λ["b"]("b", "a")).alpha_fingerprint()
+    assert λ["x", "y"]("x").alpha_fingerprint() != λ["x", "y"]("y").alpha_fingerprint()
+    assert λ["x"]("x", "z").alpha_fingerprint() != λ["z"]("z", "z").alpha_fingerprint()
+    assert v("a", "b").alpha_fingerprint() != v("b", "a").alpha_fingerprint()
+    assert λ["x"]("x").alpha_fingerprint() != Λ["x"]("x").alpha_fingerprint()
+    # the low half is the (name sensitive) hash
+    assert λ["x"]("x").fingerprint() != λ["y"]("y").fingerprint()
+    assert λ["x"]("x").fingerprint() >> 64 == λ["y"]("y").fingerprint() >> 64
+    assert hash(N(3)) == hash(N(3).fingerprint() & ((1 << 64) - 1))
+    assert v("a", "b").fingerprint() != v("b", "a").fingerprint()
+    assert len({N(k).alpha_fingerprint() for k in range(200)}) == 200
+    assert len({hash(N(k)) for k in range(200)}) == 200
+    assert N(20000).alpha_fingerprint() != N(20001).alpha_fingerprint()
+
+
+def test_parse_l():
+    assert parse_l("vr('a', ('b', 'c'), 'd')") == vr("a", ("b", "c"), "d")
+    assert parse_l("v(['a', 'b']) | λ['x', 'y']('y')") == v("a", "b") | λ["x", "y"]("y")
+    assert parse_l("DIV(N(14), N(3))") == DIV(N(14), N(3))
+    check_expr(N(3000))  # deeper than Python's parser allows
+    for bad in ["__import__('os')", "v('a'", "v('a') + 'b'", "v('a').name", "v(3)", "λ"]:
+        with pytest.raises(ValueError):
+            parse_l(bad)
+    assert parse_l("λx y. x (y x)", syntax="lambda") == λ["x", "y"]("x", ("y", "x"))
+    assert parse_l("\\x. Λy. x y z", syntax="lambda") == λ["x"](Λ["y"]("x", "y", "z"))
+    assert parse_l("PLUS 2 3", syntax="lambda") == PLUS | N(2) | N(3)
+    assert parse_l("λPLUS. PLUS", syntax="lambda") == λ["PLUS"]("PLUS")
+    for bad in ["λ.x", "(a", "a)", "λx.", "()"]:
+        with pytest.raises(ValueError):
+            parse_l(bad, syntax="lambda")
+
+
+def test_numeral_reps():
+    import lambda_calc
+
+    previous = lambda_calc._numeral_reps
+    lambda_calc._numeral_reps = True
+    try:
+        assert str(N(5) | "a") == "N(5) a"
+        assert N(2000).to_latex() == "\\mathbf{2000}"
+        assert str(λ["g"](λ["x"]("g", "x"))) == "(λg . (λx . g x))"
+    finally:
+        lambda_calc._numeral_reps = previous
+
+
+def test_render_memo_and_truncation():
+    t = λ["q"]("z", "q") | "w"
+    assert str(t) == "(λq . z q) w"
+    assert str(t) == "(λq . z q) w"  # memoized
+    def_text_symbol(λ["q"]("z", "q"), "ZQ", add_reps=True)
+    try:
+        assert str(t) == "ZQ w"
+        assert t.to_latex() == "\\textbf{ZQ} \\; w"
+    finally:
+        del string_repr_map[λ["q"]("z", "q")]
+        del latex_repr_map[λ["q"]("z", "q")]
+    assert str(t) == "(λq . z q) w"
+    # re-assigning an alias (same number of entries) is seen too
+    key = λ["q"]("z", "q")
+    try:
+        string_repr_map[key] = "TWO"
+        assert str(t) == "TWO w"
+        string_repr_map[key] = "DEUX"
+        assert str(t) == "DEUX w"
+        string_repr_map.update({key: "ZWEI"})
+        assert str(t) == "ZWEI w"
+    finally:
+        string_repr_map.pop(key, None)
+    assert str(t) == "(λq . z q) w"
+    big = N(100000)
+    short = big.to_str(max_chars=50)
+    assert short.startswith("(λf . (λx . f (f") and short.endswith(" ...")
+    assert len(short) < 60
+    assert len(big.to_latex(max_chars=200)) < 220
+    assert len(str(big)) > 100000
+
+
+def test_max_steps_profile():
+    grows = λ["x"]("x", "x", "x")
+    with pytest.raises(MaxStepsExceeded) as ex:
+        (grows | grows).nf(max_steps=100)
+    assert [step for step, _ in ex.value.profile] == [1, 2, 4, 8, 16, 32, 64, 101]
+    sizes = [size for _, size in ex.value.profile]
+    assert sizes == sorted(sizes)
+    assert str(ex.value).startswith("max_steps exceeded, term size by step: 1: ")
+    assert isinstance(ex.value, ValueError)
+    with pytest.raises(ValueError, match="cycle"):
+        (Y | λ["f"]("f")).nf()
+
+
+def test_reduction_context():
+    expr = DIV | N(14) | N(3)
+    ctx = ReductionContext()
+    res, steps = expr.nf(context=ctx)
+    assert res == expr.nf()[0]
+    assert ctx.steps == steps + ctx.nested_steps
+    assert ctx.eager_args > 0
+    assert ctx.eager_memo_hits > 0
+    hits = ctx.eager_memo_hits
+    # a second normalization in the same context re-uses the eager argument normal forms
+    assert (MOD | N(14) | N(3)).nf(context=ctx)[0] == N(2)
+    assert ctx.eager_memo_hits > hits
+    assert (GCD | N(6) | N(9)).nf(engine="recursive", context=ReductionContext())[0] == N(3)
+    # the step budget covers eager arguments, which run without end here
+    with pytest.raises(MaxStepsExceeded):
+        (Λ["x"]("y") | (Y | SUCC)).nf(max_steps=50)
+
+
+def test_text_aliases_filled_at_import():
+    import os
+    import subprocess
+    import sys
+
+    # a fresh interpreter, so no earlier parse_l() call has touched the table
+    out = subprocess.run(
+        [sys.executable, "-c", "import lambda_calc; print(lambda_calc.text_aliases['DIV'] == lambda_calc.DIV)"],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    assert out.stdout.strip() == "True"
@@ -0,0 +1,52 @@
+import pytest
+from lambda_calc import *
+
+
+def test_matches_nf():
+    for expr in [
+        SUCC | N(3),
+        PLUS | N(3) | N(4),
+        SUB | N(7) | N(3),
+        MULT | N(3) | N(4),
+        PRED | N(5),
+        DIV | N(14) | N(3),
+        GCD | N(6) | N(9),
+        EQ | N(3) | N(3),
+        Y | FACTORIALstep | N(3),
+        λ["x"](λ["x"]("x") | "q" | "y" | "x") | "N",
+        λ["x"]("x", "x") | λ["x"]("x", "x"),
+        λ["z"](λ["x"]("x", "x") | λ["x"]("x", "x") | (λ["x"]("x") | "q")),
+        λ["x"]("y") | (λ["z"]("z", "z"), λ["z"]("z", "z")),
+    ]:
+        assert expr.nf(engine="machine") == expr.nf()
+
+
+def test_whnf():
+    assert (λ["x"]("x") | "y").whnf() == (v("y"), 1)
+    # reduction stops at the abstraction, the redex in its body is left alone
+    res, steps = (λ["x"](λ["y"]("x", λ["x"]("x") | "y")) | "z").whnf()
+    assert res == λ["y"]("z", λ["x"]("x") | "y")
+    assert steps == 1
+    assert λ["x"](λ["x"]("x") | "x").whnf() == (λ["x"](λ["x"]("x") | "x"), 0)
+    assert ("f" | (λ["x"]("x") | "y")).whnf() == ("f" | (λ["x"]("x") | "y"), 0)
+    res, _ = (SUCC | N(2)).whnf()
+    assert res.nf()[0] == N(3)
+
+
+def test_errors():
+    a = λ["x", "y"]("y", "x", "y")
+    with pytest.raises(ValueError):
+        (a | a | a).nf(engine="machine")
+    with pytest.raises(ValueError):
+        (DIV | N(14) | N(3)).nf(engine="machine", max_steps=10)
+    with pytest.raises(ValueError):
+        (λ["x"]("x", "x", "x") | λ["x"]("x", "x", "x")).whnf(max_steps=100)
+
+
+def test_deep_terms():
+    deep = N(3000)
+    assert deep.nf(engine="machine") == (deep, 0)
+    res, steps = (SUCC | deep).nf(engine="machine")
+    assert res == N(3001)
+    assert steps > 0
+    assert (SUCC | deep).whnf()[0] == λ["f"](λ["x"]("f", (deep, "f", "x")))
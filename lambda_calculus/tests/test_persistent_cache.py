@@ -0,0 +1,66 @@
+from lambda_calc import *
+from PersistentTransitiveCache import PersistentTransitiveCache, prepopulate
+
+
+def test_serialization_round_trip():
+    for expr in [N(3), DIV, GCD, Λ["x"]("x", "y"), N(5000)]:
+        assert loads_term(dumps_term(expr)) == expr
+
+
+def test_warm_start(tmp_path):
+    path = str(tmp_path / "nf_cache.sqlite")
+    expr = DIV | N(14) | N(3)
+    expected, cold_steps = expr.nf()
+    assert prepopulate(path, [expr]) > 0
+    with PersistentTransitiveCache(path) as tc:
+        res, steps = expr.nf(tc=tc)
+        assert res == expected
+        assert steps < cold_steps
+        assert tc.stats()["hits"] > 0
+
+
+def test_shared_between_caches(tmp_path):
+    path = str(tmp_path / "nf_cache.sqlite")
+    a = PersistentTransitiveCache(path)
+    b = PersistentTransitiveCache(path)
+    expr = PLUS | N(2) | N(3)
+    expr.nf(tc=a)
+    a.flush()
+    assert b.refresh() > 0
+    assert b.lookup_result(expr) == N(5)
+    a.close()
+    b.close()
+
+
+def test_fetch_on_demand(tmp_path):
+    path = str(tmp_path / "nf_cache.sqlite")
+    expr = DIV | N(14) | N(3)
+    expected, cold_steps = expr.nf()
+    prepopulate(path, [expr])
+    with PersistentTransitiveCache(path, preload=False) as tc:
+        assert tc.stats()["transitions"] == 0
+        res, steps = expr.nf(tc=tc)
+        assert res == expected
+        assert steps < cold_steps
+
+
+def test_misses_cost_no_query(tmp_path):
+    path = str(tmp_path / "nf_cache.sqlite")
+    prepopulate(path, [λ["a"]("a") | "b"])
+    with PersistentTransitiveCache(path, preload=False) as tc:
+        queries = []
+        tc._conn.set_trace_callback(queries.append)
+        expr = PLUS | N(20) | N(30)  # nothing stored for it
+        assert expr.nf(tc=tc)[0] == N(50)
+        assert tc.stats()["misses"] > 0
+        assert not any([q.startswith("SELECT") for q in queries])
+        # fingerprints are the structural hash, the alpha half is never computed
+        assert expr._positions is None
+        tc._conn.set_trace_callback(None)
+    # entries other caches write show up after refresh()
+    with PersistentTransitiveCache(path, preload=False) as tc:
+        prepopulate(path, [PLUS | N(2) | N(3)])
+        assert (PLUS | N(2) | N(3)) not in tc
+        assert tc.refresh() > 0
+        assert (PLUS | N(2) | N(3)) in tc
+        assert tc.lookup_result(PLUS | N(2) | N(3)) == N(5)
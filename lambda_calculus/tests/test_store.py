@@ -0,0 +1,36 @@
+import pytest
+from lambda_calc import *
+from lambda_store import TermStore
+
+
+def test_round_trip():
+    store = TermStore()
+    for t in [N(0), N(5), DIV | N(7) | N(2), Y | FACTORIALstep, λ["x"]("x", "y") | "z"]:
+        stored = store.add(t)
+        assert stored.to_term() == t
+        assert stored.free_names == t.free_names
+    # hash consed: equal terms are the same node, however built
+    assert store.add(N(300)) == store.numeral(300)
+    assert store.add(N(300)).index == store.numeral(300).index
+    assert store.add(N(3)) != store.add(N(4))
+    size = len(store)
+    store.add(N(300))
+    assert len(store) == size
+    deep = N(20000)
+    assert store.add(deep).to_term() == deep
+
+
+def test_views():
+    store = TermStore()
+    t = store.add(Λ["x"]("x", "y") | "z")
+    assert t.kind == "composition"
+    assert t.right.name == "z"
+    lam = t.left
+    assert lam.kind == "abstraction"
+    assert lam.eager
+    assert lam.variable.name == "x"
+    assert lam.term.free_names == frozenset(["x", "y"])
+    assert lam.free_names == frozenset(["y"])
+    with pytest.raises(ValueError):
+        t.name
+    assert str(t) == str(Λ["x"]("x", "y") | "z")
@@ -0,0 +1,32 @@
+from lambda_calc import *
+from lambda_trace import ReductionTracer, read_trace, size_and_depth
+from TransitiveCache import TransitiveCache
+
+
+def test_size_and_depth():
+    assert size_and_depth(v("x")) == (1, 1)
+    assert size_and_depth(N(2)) == (7, 5)
+
+
+def test_tracer(tmp_path):
+    t = PLUS | N(2) | N(3)
+    expect, steps = t.nf()
+    seen = []
+    tracer = ReductionTracer(callback=seen.append)
+    res, traced_steps = t.nf(tracer=tracer)
+    assert (res, traced_steps) == (expect, steps)
+    assert [info.step for info in seen] == list(range(1, steps + 1))
+    assert seen[-1].size == size_and_depth(expect)[0]
+    summary = tracer.summary()
+    assert summary["steps"] == steps
+    assert dict(tracer.most_reduced())["PLUS"] == 1
+    logged = []
+    for suffix in (".csv", ".bin"):
+        path = str(tmp_path / ("trace" + suffix))
+        with ReductionTracer(log_path=path) as tracer:
+            (DIV | N(7) | N(2)).nf(tc=TransitiveCache(), tracer=tracer)
+        rows = list(read_trace(path))
+        assert len(rows) == tracer.steps
+        assert rows[0].redex == "Y"
+        logged.append([(r.step, r.size, r.depth, r.redex, r.cache_hits) for r in rows])
+    assert logged[0] == logged[1]
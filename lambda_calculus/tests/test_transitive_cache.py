@@ -0,0 +1,95 @@
+import pytest
+from lambda_calc import *
+from lambda_calc import _AlphaKey
+from TransitiveCache import TransitiveCache, estimated_size
+
+
+def test_path_compression():
+    tc = TransitiveCache()
+    for i in range(10):
+        tc.store_transition(i, i + 1)
+    tc.store_absorbing(10)
+    assert tc.lookup_result(0) == 10
+    stats = tc.stats()
+    assert stats["max_chain_length"] == 10
+    assert stats["compressed_hops"] == 9
+    # second lookup follows one hop
+    assert tc.lookup_result(0) == 10
+    assert tc.stats()["chain_lengths"] == {1: 1, 10: 1}
+    assert 3 in tc
+    assert 11 not in tc
+    assert tc.stats()["hits"] == 1
+    assert tc.stats()["misses"] == 1
+
+
+def test_cycle():
+    tc = TransitiveCache()
+    tc.store_transition("a", "b")
+    tc.store_transition("b", "a")
+    with pytest.raises(ValueError):
+        tc.lookup_result("b")
+
+
+def test_budgets():
+    tc = TransitiveCache(max_size=3)
+    for i in range(5):
+        tc.store_absorbing(i)
+    assert (0 not in tc) and (4 in tc)
+    assert tc.stats()["evictions"] == 2
+    # a transition is charged for its start and its end
+    tc = TransitiveCache(max_bytes=17, size_fn=lambda item: 4)
+    for i in range(5):
+        tc.store_transition(i, 100 + i)
+    stats = tc.stats()
+    assert stats["transitions"] == 2
+    assert stats["bytes"] == 16
+    assert stats["evictions"] == 3
+
+
+def test_term_sizes():
+    small = N(2)
+    large = N(2000)
+    assert estimated_size(large) > 500 * estimated_size(small)
+    for cache_class in (TransitiveCache, AlphaTransitiveCache):
+        tc = cache_class(max_bytes=10**9)
+        tc.store_absorbing(small)
+        small_bytes = tc.stats()["bytes"]
+        tc.store_transition(PLUS | large | small, large)
+        # start and end both charged, each well beyond its top node
+        assert tc.stats()["bytes"] - small_bytes > 2 * estimated_size(large)
+        # a budget holding small terms can not hold the large one
+        tc = cache_class(max_bytes=100 * estimated_size(small))
+        tc.store_absorbing(large)
+        tc.store_absorbing(small)
+        assert (large not in tc) and (small in tc)
+        assert tc.stats()["bytes"] <= 100 * estimated_size(small)
+
+
+def test_nf_with_cache():
+    tc = TransitiveCache()
+    res, _ = (DIV | N(7) | N(2)).nf(tc=tc)
+    assert (DIV | N(7) | N(2)).nf(tc=tc)[0] == res
+    assert tc.stats()["hits"] > 0
+
+
+def test_alpha_cache():
+    t1 = λ["x"]("x", "y")
+    t2 = λ["z"]("z", "y")
+    assert t1 != t2
+    assert _AlphaKey(t1) == _AlphaKey(t2)
+    assert _AlphaKey(λ["x"]("x", "y")) != _AlphaKey(λ["y"]("y", "y"))
+    assert _AlphaKey(λ["x"]("x")) != _AlphaKey(Λ["x"]("x"))
+    assert _AlphaKey(λ["x", "y"]("x")) != _AlphaKey(λ["x", "y"]("y"))
+    tc = AlphaTransitiveCache()
+    a = λ["f", "x"]("f", "x") | N(2)
+    b = λ["g", "y"]("g", "y") | N(2)
+    res, _ = a.nf(tc=tc)
+    assert b in tc
+    assert tc.lookup_result(b) == res
+    # an alpha variant of a stored normal form is returned with its own names
+    res_b = λ["q"](λ["w"]("q", ("q", "w")))
+    assert tc.lookup_result(res_b) is res_b
+    assert b.nf(tc=tc)[0] == res
+    expect = (DIV | N(14) | N(3)).nf()[0]
+    assert (DIV | N(14) | N(3)).nf(tc=tc)[0] == expect
+    assert tc.stats()["hits"] > 0